@@ -0,0 +1,244 @@
+"""Scaling benchmarks of routing, spectrum occupancy, configuration generation and snapshots.
+
+Run the benchmarks and save the results:
+
+    python benchmark.py run --sizes 10 100 1000 10000 --output results.json
+
+Compare two runs and flag operations which got slower than the threshold:
+
+    python benchmark.py compare baseline.json results.json --threshold 1.25
+
+Check that `import src` stays within its time budget and loads no plotting libraries:
+
+    python benchmark.py import-time --budget 0.5
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src import Network, TerminalPoint, create_random_channels, generate_mesh, load_snapshot, save_snapshot
+
+DEGREE = 3
+DEVICES_PER_SITE = DEGREE + 2  # Line degrees, an add/drop device and a terminal point
+
+
+def measure(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Measure the duration of repeated calls of a function.
+
+    Args:
+        function (Callable[[], object]): The measured function.
+        repeat (int): The number of calls.
+
+    Returns:
+        Dict[str, float]: The number of calls and the median, minimal and mean duration of a call in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {"calls": repeat, "median": statistics.median(durations), "min": min(durations),
+            "mean": statistics.fmean(durations)}
+
+
+def build_network(num_devices: int, seed: int) -> Network:
+    """Generate a mesh network of about the requested size.
+
+    Args:
+        num_devices (int): The requested number of devices.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Network: The generated network.
+    """
+    num_sites = max(DEGREE + 1, round(num_devices / DEVICES_PER_SITE))
+    num_sites += num_sites * DEGREE % 2
+    return generate_mesh(num_sites, DEGREE, seed=seed)
+
+
+def benchmark_size(num_devices: int, repeat: int, seed: int) -> List[dict]:
+    """Run all benchmarks on a network of about the requested size.
+
+    Args:
+        num_devices (int): The requested number of devices.
+        repeat (int): The number of calls of every benchmarked operation.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[dict]: The result of every benchmark.
+    """
+    rng = random.Random(seed)
+    network = build_network(num_devices, seed)
+    size = len(network.devices)
+    terminals = [name for name, device in network.devices.items() if isinstance(device, TerminalPoint)]
+    pairs = [tuple(rng.sample(terminals, 2)) for _ in range(repeat)]
+    devices = rng.choices(list(network.devices.values()), k=repeat)
+
+    results = {"build_network": measure(lambda: build_network(num_devices, seed), 1)}
+
+    lookups = iter(pairs)
+    results["shortest_path"] = measure(lambda: network.shortest_path(*next(lookups)), repeat)
+    results["graph"] = measure(lambda: network.graph, min(repeat, 3))
+
+    devices_iter = iter(devices)
+    results["device_spectrum_occupancy"] = measure(lambda: next(devices_iter).spectrum_occupancy, repeat)
+
+    paths = [network.shortest_path(*pair) for pair in pairs]
+    paths_iter = iter(paths)
+    results["path_spectrum_occupancy"] = measure(lambda: next(paths_iter).spectrum_occupancy, repeat)
+
+    results["create_random_channels"] = measure(lambda: create_random_channels(4 * size, [50, 100], seed), 1)
+
+    channel = create_random_channels(1, seed=seed)[0]
+    paths_iter = iter(paths)
+    with tempfile.TemporaryDirectory() as directory:
+        results["generate_configuration"] = measure(
+            lambda: next(paths_iter).generate_configuration(channel, directory), repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results["save_snapshot"] = measure(lambda: save_snapshot(network, directory), 1)
+        results["load_snapshot"] = measure(lambda: load_snapshot(directory), 1)
+
+    return [dict(name=name, devices=size, **result) for name, result in results.items()]
+
+
+def run(sizes: List[int], repeat: int, seed: int) -> dict:
+    """Run the benchmarks on networks of all sizes.
+
+    Args:
+        sizes (List[int]): The requested numbers of devices.
+        repeat (int): The number of calls of every benchmarked operation.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: The environment and the results.
+    """
+    results = []
+    for size in sizes:
+        results.extend(benchmark_size(size, repeat, seed))
+
+    return {
+        "environment": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """Compare the median durations of two runs.
+
+    Results are matched by the benchmark name and the number of devices of the network.
+
+    Args:
+        baseline (dict): The results of the reference run.
+        current (dict): The results of the new run.
+        threshold (float): The ratio of the medians above which a benchmark is a regression.
+
+    Returns:
+        List[dict]: The benchmarks of both runs with the ratio of their medians and the regression flag.
+    """
+    reference = {(result["name"], result["devices"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = reference.get((result["name"], result["devices"]))
+        if old is None:
+            continue
+        ratio = result["median"] / old["median"] if old["median"] > 0 else float("inf")
+        rows.append({"name": result["name"], "devices": result["devices"], "baseline": old["median"],
+                     "current": result["median"], "ratio": ratio, "regression": ratio > threshold})
+    return rows
+
+
+# Modules which must not be loaded by `import src`
+HEADLESS_FORBIDDEN = ("matplotlib",)
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import src
+print(time.perf_counter() - start, *[module for module in sys.modules if module.split(".")[0] in sys.argv[1:]])
+"""
+
+
+def import_time(repeat: int) -> Dict[str, object]:
+    """Measure the duration of `import src` in fresh interpreters.
+
+    Args:
+        repeat (int): The number of measured interpreter starts.
+
+    Returns:
+        Dict[str, object]: The minimal and median import duration in seconds and the loaded forbidden modules.
+    """
+    durations, forbidden = [], set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, *HEADLESS_FORBIDDEN], capture_output=True,
+                                text=True, check=True).stdout.split()
+        durations.append(float(output[0]))
+        forbidden.update(output[1:])
+    return {"min": min(durations), "median": statistics.median(durations), "forbidden": sorted(forbidden)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                            help="numbers of devices of the benchmarked networks")
+    run_parser.add_argument("--repeat", type=int, default=20, help="calls of every benchmarked operation")
+    run_parser.add_argument("--seed", type=int, default=0, help="seed of the random generators")
+    run_parser.add_argument("--output", help="JSON file to save the results to")
+
+    compare_parser = commands.add_parser("compare", help="compare two runs")
+    compare_parser.add_argument("baseline", help="JSON results of the reference run")
+    compare_parser.add_argument("current", help="JSON results of the new run")
+    compare_parser.add_argument("--threshold", type=float, default=1.25,
+                                help="ratio of the median durations flagged as a regression")
+
+    import_parser = commands.add_parser("import-time", help="check the import time of the package")
+    import_parser.add_argument("--budget", type=float, default=0.5, help="maximal import time in seconds")
+    import_parser.add_argument("--repeat", type=int, default=5, help="measured interpreter starts")
+
+    args = parser.parse_args()
+
+    if args.command == "import-time":
+        result = import_time(args.repeat)
+        print(f"import src: {result['min'] * 1e3:.1f} ms (median {result['median'] * 1e3:.1f} ms), "
+              f"budget {args.budget * 1e3:.1f} ms")
+        for module in result["forbidden"]:
+            print(f"Forbidden module loaded: {module}")
+        return 1 if result["min"] > args.budget or result["forbidden"] else 0
+
+    if args.command == "run":
+        report = run(args.sizes, args.repeat, args.seed)
+        for result in report["results"]:
+            print(f"{result['name']:<28}{result['devices']:>8} devices {result['median'] * 1e3:>12.3f} ms")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=4)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<28}{row['devices']:>8} devices {row['baseline'] * 1e3:>12.3f} ms "
+              f"{row['current'] * 1e3:>12.3f} ms {row['ratio']:>7.2f}x {flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
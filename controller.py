@@ -0,0 +1,73 @@
+"""Controller service: set up and tear down connections and query routes and occupancy over a JSON-over-HTTP API.
+
+    python controller.py serve --topology topology.yaml --port 8080 --output config/connections
+    python controller.py load --url http://127.0.0.1:8080 --topology topology.yaml --requests 20000
+
+`load` sends a mix of setups, teardowns and queries between the terminal points of the topology and prints the
+throughput and the p50/p99 latency of every kind of request.
+"""
+import sys
+import asyncio
+import argparse
+
+from src import ControllerService, generate_load, load_snapshot, load_topology
+from src.assignment import POLICIES
+from src.routing import MAX_CANDIDATES
+from src.device import TerminalPoint
+
+
+def load_network(args: argparse.Namespace):
+    return load_topology(args.topology) if args.topology else load_snapshot(args.snapshot)
+
+
+def serve(args: argparse.Namespace) -> int:
+    service = ControllerService(load_network(args), args.host, args.port, args.policy, args.k, args.output)
+    print(f"Serving {len(service.network.devices)} devices on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def load(args: argparse.Namespace) -> int:
+    network = load_network(args)
+    terminals = sorted(name for name, device in network.devices.items() if isinstance(device, TerminalPoint))
+    report = asyncio.run(generate_load(args.url, terminals, args.requests, args.concurrency, args.write_ratio,
+                                       args.bandwidths, args.seed))
+    print(report.summary())
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("serve", "run the service"), ("load", "measure a running service")):
+        command = commands.add_parser(name, help=help_text)
+        source = command.add_mutually_exclusive_group(required=True)
+        source.add_argument("--topology", help="YAML or JSON topology file")
+        source.add_argument("--snapshot", help="snapshot directory")
+
+    serve_parser = commands.choices["serve"]
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    serve_parser.add_argument("--policy", choices=POLICIES, default="first-fit", help="spectrum assignment policy")
+    serve_parser.add_argument("--k", type=int, default=MAX_CANDIDATES,
+                              help="maximal number of candidate paths of a setup")
+    serve_parser.add_argument("--output", help="write the configuration of every connection to this directory")
+
+    load_parser = commands.choices["load"]
+    load_parser.add_argument("--url", default="http://127.0.0.1:8080", help="base URL of the service")
+    load_parser.add_argument("--requests", type=int, default=10000, help="total number of requests")
+    load_parser.add_argument("--concurrency", type=int, default=32, help="number of concurrent clients")
+    load_parser.add_argument("--write-ratio", type=float, default=0.1, help="share of setups and teardowns")
+    load_parser.add_argument("--bandwidths", type=float, nargs="+", default=[50], help="setup bandwidths in GHz")
+    load_parser.add_argument("--seed", type=int, help="seed of the random generator")
+
+    args = parser.parse_args()
+    return serve(args) if args.command == "serve" else load(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
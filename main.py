@@ -21,7 +21,7 @@ def test_1():
     channel_11 = Channel(195_950_000, 196_050_000)  # 60 (100GHz)
 
     ln_1 = CzechLightLineDegree("LN1_A")
-    ln_1.add_channels([channel_1, channel_3, channel_8, channel_9])
+    ln_1.add_channels([channel_1, channel_8, channel_9])  # channel_3 overlaps channel_8
     ln_2 = CzechLightLineDegree("LN2_A")
     ln_3 = CzechLightLineDegree("LN1_B")
     ln_3.add_channels([channel_5, channel_7, channel_11])
@@ -74,33 +74,33 @@ def test_2():
     tp_2 = "TP1_B"
 
     devices = [
-        CzechLightLineDegree("LN1_A", create_random_channels(4, [50, 100])),
-        CzechLightLineDegree("LN2_A", create_random_channels(4, [50, 100])),
-        CzechLightLineDegree("LN3_A", create_random_channels(4, [50, 100])),
-        CzechLightLineDegree("LN4_A", create_random_channels(4, [50, 100])),
-        CzechLightAddDrop("AD1_A", create_random_channels(4, [50, 100])),
+        CzechLightLineDegree("LN1_A", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightLineDegree("LN2_A", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightLineDegree("LN3_A", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightLineDegree("LN4_A", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightAddDrop("AD1_A", create_random_channels(4, [50, 100], disjoint=True)),
         TerminalPoint("TP1_A"),
 
-        CzechLightLineDegree("LN1_B", create_random_channels(4, [50, 100])),
-        CzechLightLineDegree("LN2_B", create_random_channels(4, [50, 100])),
-        CzechLightAddDrop("AD1_B", create_random_channels(4, [50, 100])),
+        CzechLightLineDegree("LN1_B", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightLineDegree("LN2_B", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightAddDrop("AD1_B", create_random_channels(4, [50, 100], disjoint=True)),
         TerminalPoint("TP1_B"),
 
-        CzechLightLineDegree("LN1_C", create_random_channels(4, [50, 100])),
-        CzechLightLineDegree("LN2_C", create_random_channels(4, [50, 100])),
-        CzechLightLineDegree("LN3_C", create_random_channels(4, [50, 100])),
-        CzechLightAddDrop("AD1_C", create_random_channels(4, [50, 100])),
+        CzechLightLineDegree("LN1_C", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightLineDegree("LN2_C", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightLineDegree("LN3_C", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightAddDrop("AD1_C", create_random_channels(4, [50, 100], disjoint=True)),
         TerminalPoint("TP1_C"),
 
-        CzechLightLineDegree("LN1_D", create_random_channels(4, [50, 100])),
-        CzechLightLineDegree("LN2_D", create_random_channels(4, [50, 100])),
-        CzechLightAddDrop("AD1_D", create_random_channels(4, [50, 100])),
-        CzechLightAddDrop("AD2_D", create_random_channels(4, [50, 100])),
+        CzechLightLineDegree("LN1_D", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightLineDegree("LN2_D", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightAddDrop("AD1_D", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightAddDrop("AD2_D", create_random_channels(4, [50, 100], disjoint=True)),
         TerminalPoint("TP1_D"),
         TerminalPoint("TP2_D"),
 
-        CzechLightLineDegree("LN1_E", create_random_channels(4, [50, 100])),
-        CzechLightAddDrop("AD1_E", create_random_channels(4, [50, 100])),
+        CzechLightLineDegree("LN1_E", create_random_channels(4, [50, 100], disjoint=True)),
+        CzechLightAddDrop("AD1_E", create_random_channels(4, [50, 100], disjoint=True)),
         TerminalPoint("TP1_E"),
     ]
 
@@ -0,0 +1,56 @@
+"""Headless planning: provision demands and write the device configuration without any plotting.
+
+The network is loaded from a topology file or a snapshot, the demands from a YAML or JSON list of
+[terminal A, terminal B, bandwidth] entries:
+
+    python plan.py --topology topology.yaml --demands demands.yaml --output config/generated
+    python plan.py --snapshot state --demands demands.yaml --output config/generated --save-snapshot state
+
+matplotlib is never imported, so the planner runs without a display backend.
+"""
+import sys
+import argparse
+
+import yaml
+
+from src import compile_configuration, load_snapshot, load_topology, save_snapshot
+from src.assignment import POLICIES
+from src.provisioning import ORDERINGS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--topology", help="YAML or JSON topology file")
+    source.add_argument("--snapshot", help="snapshot directory")
+    parser.add_argument("--demands", required=True, help="YAML or JSON list of [terminal A, terminal B, bandwidth]")
+    parser.add_argument("--output", required=True, help="directory to write the configuration to")
+    parser.add_argument("--policy", choices=POLICIES, default="first-fit", help="spectrum assignment policy")
+    parser.add_argument("--ordering", choices=ORDERINGS, default="as-given", help="order of assignment")
+    parser.add_argument("--processes", type=int, help="plan with this many worker processes")
+    parser.add_argument("--launch-power", type=float, help="fill in the powers with this 50 GHz launch power in dBm")
+    parser.add_argument("--compact", action="store_true", help="write compact JSON")
+    parser.add_argument("--save-snapshot", help="save the network with the new channels to this snapshot directory")
+
+    args = parser.parse_args()
+
+    network = load_topology(args.topology) if args.topology else load_snapshot(args.snapshot)
+    with open(args.demands) as f:
+        demands = [tuple(demand) for demand in yaml.safe_load(f)]
+
+    result = network.provision_demands(demands, args.policy, args.ordering, processes=args.processes)
+    power_model = network.power_model if args.launch_power is not None else None
+    report = compile_configuration(((allocation.path, allocation.channel) for allocation in result.allocations),
+                                   args.output, args.compact, power_model, args.launch_power or 0.0)
+    if args.save_snapshot:
+        save_snapshot(network, args.save_snapshot)
+
+    print(f"{len(result.allocations)} demands provisioned, {len(result.blocked)} blocked")
+    print(f"{report.files} files, {report.bytes} bytes written to {args.output} in {report.elapsed:.3f} s")
+    for demand in result.blocked:
+        print(f"Blocked: {demand.tp_a} - {demand.tp_b} ({demand.bandwidth} GHz)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,3 +3,20 @@ from .path import NetworkPath
 from .utils import condense_path
 from .channel import Channel, create_random_channels
 from .device import CzechLightAddDrop, CzechLightLineDegree, TerminalPoint
+from .assignment import assign_channel
+from .provisioning import Demand, Allocation, BatchResult
+from .restconf import RestconfPusher, MockRestconfServer, push_configuration
+from .delta import ConfigurationTracker, ConfigurationDelta, write_deltas
+from .compiler import ConfigurationCompiler, CompileReport, compile_configuration
+from .topology import load_topology, save_topology, generate_mesh
+from .metrics import METRICS, instrumented
+from .fragmentation import (FragmentationMetrics, Retune, fragmentation, device_fragmentation, path_fragmentation,
+                            network_fragmentation, plan_defragmentation, apply_defragmentation)
+from .power import PowerModel, set_power
+from .snapshot import save_snapshot, load_snapshot, load_occupancy
+from .parallel import ParallelPlanner, provision_parallel
+from .intervals import IntervalIndex, ChannelConflictError
+from .protection import ProtectionPlanner, ProtectedDemand, Restoration, FailureEvent
+from .service import ControllerService, OccupancySnapshot, ServiceError, LoadReport, generate_load
+from .transaction import ReservationManager, Transaction, ReservationExpiredError, PushFailedError
+from .telemetry import TelemetryStore, StubFeed, SpectrumMismatch, WindowStats, SAMPLE_DTYPE
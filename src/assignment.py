@@ -0,0 +1,112 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import spectrum
+from .path import NetworkPath
+from .channel import Channel, SPECTRUM
+
+# Channel constraints from czechlight-roadm-device.yang in GHz
+MIN_CHANNEL_WIDTH = 12.5
+MIN_ROUTED_CHANNEL_WIDTH = 50.0
+CHANNEL_WIDTH_STEP = 12.5
+
+POLICIES = ("first-fit", "best-fit", "exact-fit")
+
+
+def width_to_slots(bandwidth: float, routed: bool = True) -> int:
+    """Convert a channel width to the number of grid slots.
+
+    The width has to be a multiple of 12.5 GHz, so that a channel starting on the 6.25 GHz grid
+    also has its central frequency on the grid. A channel of a path is added and dropped on its end devices,
+    which reject such routed media channels narrower than 50 GHz.
+
+    Args:
+        bandwidth (float): The channel width in GHz.
+        routed (bool, optional): The channel is assigned on a path. Defaults to True.
+
+    Returns:
+        int: The number of 6.25 GHz slots of the channel.
+    """
+    min_width = MIN_ROUTED_CHANNEL_WIDTH if routed else MIN_CHANNEL_WIDTH
+    assert bandwidth >= min_width, f"Minimal channel width is {min_width} GHz"
+    assert bandwidth % CHANNEL_WIDTH_STEP == 0, f"Channel width must be a multiple of {CHANNEL_WIDTH_STEP} GHz"
+    return int(bandwidth / SPECTRUM["slot_width"])
+
+
+def free_blocks(slot_occupancy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Find all contiguous blocks of free slots.
+
+    Args:
+        slot_occupancy (np.ndarray): The occupancy of each grid slot.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The first slot and the length of every free block, in ascending order.
+    """
+    padded = np.concatenate(([True], slot_occupancy, [True]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts, stops = edges[0::2], edges[1::2]
+    return starts, stops - starts
+
+
+def find_free_slots(slot_occupancy: np.ndarray, num_slots: int, policy: str = "first-fit") -> Optional[int]:
+    """Find the first slot of a free contiguous range of slots.
+
+    Policies:
+        - first-fit: the lowest free block wide enough.
+        - best-fit: the narrowest free block wide enough, the lowest one on ties.
+        - exact-fit: the lowest free block of exactly the requested width, falls back to first-fit.
+
+    Args:
+        slot_occupancy (np.ndarray): The occupancy of each grid slot.
+        num_slots (int): The number of contiguous slots requested.
+        policy (str, optional): The assignment policy. Defaults to "first-fit".
+
+    Returns:
+        Optional[int]: The first slot of the range, None if no free range is wide enough.
+    """
+    assert policy in POLICIES, f"Invalid policy: {policy}"
+
+    starts, lengths = free_blocks(slot_occupancy)
+    fits = np.flatnonzero(lengths >= num_slots)
+    if len(fits) == 0:
+        return None
+
+    if policy == "best-fit":
+        return int(starts[fits[np.argmin(lengths[fits])]])
+    if policy == "exact-fit":
+        exact = fits[lengths[fits] == num_slots]
+        if len(exact) > 0:
+            return int(starts[exact[0]])
+    return int(starts[fits[0]])
+
+
+def slots_to_channel(start: int, num_slots: int) -> Channel:
+    """Create the channel covering a range of grid slots.
+
+    Args:
+        start (int): The first slot of the channel.
+        num_slots (int): The number of slots of the channel.
+
+    Returns:
+        Channel: The channel covering the slots.
+    """
+    return Channel.from_slots(start, num_slots)
+
+
+def assign_channel(path: NetworkPath, bandwidth: float, policy: str = "first-fit") -> Optional[Channel]:
+    """Assign a channel that is free on every directional port of the path.
+
+    Args:
+        path (NetworkPath): The path to assign the channel on.
+        bandwidth (float): The requested channel width in GHz.
+        policy (str, optional): The assignment policy, one of POLICIES. Defaults to "first-fit".
+
+    Returns:
+        Optional[Channel]: The assigned channel, None if the path has no free range wide enough.
+    """
+    num_slots = width_to_slots(bandwidth)
+    start = find_free_slots(spectrum.to_slots(path.occupancy_bitmap), num_slots, policy)
+    if start is None:
+        return None
+    return slots_to_channel(start, num_slots)
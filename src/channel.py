@@ -1,5 +1,4 @@
-import random
-from typing import Union, Tuple, List
+from typing import Dict, Union, Tuple, List
 
 import numpy as np
 
@@ -8,30 +7,109 @@ SPECTRUM = {
     "bandwidth": 4_800,
     "lower_bound": 191_325,
     "upper_bound": 196_125,
-    "name_offset": 190_000
+    "name_offset": 190_000,
+    "slot_width": 6.25,
+    "num_slots": 768
 }
 
 
 class Channel:
     """Representation of a communication channel within a frequency spectrum.
 
-    This class represents a communication channel within a specific frequency spectrum. It provides methods
-    to calculate the frequency band, channel name, and channel plan.
+    The channel is stored as a range of 6.25 GHz grid slots. Channels are immutable and interned: creating
+    a channel with the same slots as an existing one returns the existing instance, so identical channels
+    share a single object and can be compared by identity.
 
     Attributes:
-        lower_frequency (float): The lower frequency boundary of the channel.
-        upper_frequency (float): The upper frequency boundary of the channel.
+        start_slot (int): The first grid slot of the channel.
+        num_slots (int): The number of grid slots of the channel.
     """
 
-    def __init__(self, lower_frequency: Union[int, float, str], upper_frequency: Union[int, float, str]):
-        """Initialize a Channel instance.
+    __slots__ = ("start_slot", "num_slots")
+
+    _cache: Dict[Tuple[int, int], "Channel"] = {}
+
+    def __new__(cls, lower_frequency: Union[int, float, str], upper_frequency: Union[int, float, str]):
+        """Create a Channel instance or return the interned one.
 
         Args:
             lower_frequency (Union[int, float, str]): The lower frequency boundary of the channel.
             upper_frequency (Union[int, float, str]): The upper frequency boundary of the channel.
         """
-        self.spec_bounds = (SPECTRUM["lower_bound"], SPECTRUM["upper_bound"])
-        self.lower_frequency, self.upper_frequency = self.convert_units(lower_frequency, upper_frequency)
+        lower_frequency, upper_frequency = cls.convert_units(lower_frequency, upper_frequency)
+        start = (lower_frequency - SPECTRUM["lower_bound"]) / SPECTRUM["slot_width"]
+        stop = (upper_frequency - SPECTRUM["lower_bound"]) / SPECTRUM["slot_width"]
+        assert start == round(start) and stop == round(stop), "The frequencies must be aligned to the 6.25 GHz grid"
+        return cls.from_slots(round(start), round(stop - start))
+
+    @classmethod
+    def from_slots(cls, start_slot: int, num_slots: int) -> "Channel":
+        """Get the channel covering a range of grid slots.
+
+        Args:
+            start_slot (int): The first grid slot of the channel.
+            num_slots (int): The number of grid slots of the channel.
+
+        Returns:
+            Channel: The interned channel.
+        """
+        channel = cls._cache.get((start_slot, num_slots))
+        if channel is None:
+            assert num_slots > 0 and 0 <= start_slot and start_slot + num_slots <= SPECTRUM["num_slots"], \
+                "The frequencies are not in the correct range"
+            channel = object.__new__(cls)
+            object.__setattr__(channel, "start_slot", start_slot)
+            object.__setattr__(channel, "num_slots", num_slots)
+            cls._cache[start_slot, num_slots] = channel
+        return channel
+
+    @classmethod
+    def from_arrays(cls, start_slots: np.ndarray, num_slots: np.ndarray) -> List["Channel"]:
+        """Get the channels covering many ranges of grid slots.
+
+        Args:
+            start_slots (np.ndarray): The first grid slot of every channel.
+            num_slots (np.ndarray): The number of grid slots of every channel.
+
+        Returns:
+            List[Channel]: The interned channels.
+        """
+        start_slots, num_slots = np.broadcast_arrays(start_slots, num_slots)
+        from_slots = cls.from_slots
+        return [from_slots(start, count) for start, count in zip(start_slots.tolist(), num_slots.tolist())]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Channel is immutable")
+
+    def __reduce__(self):
+        return Channel.from_slots, (self.start_slot, self.num_slots)
+
+    @property
+    def lower_frequency(self) -> float:
+        """Get the lower frequency boundary of the channel in GHz.
+
+        Returns:
+            float: The lower frequency boundary.
+        """
+        return SPECTRUM["lower_bound"] + self.start_slot * SPECTRUM["slot_width"]
+
+    @property
+    def upper_frequency(self) -> float:
+        """Get the upper frequency boundary of the channel in GHz.
+
+        Returns:
+            float: The upper frequency boundary.
+        """
+        return SPECTRUM["lower_bound"] + (self.start_slot + self.num_slots) * SPECTRUM["slot_width"]
+
+    @property
+    def slot_range(self) -> Tuple[int, int]:
+        """Get the range of 6.25 GHz grid slots covered by the channel.
+
+        Returns:
+            Tuple[int, int]: The first slot and the slot after the last one covered by the channel.
+        """
+        return self.start_slot, self.start_slot + self.num_slots
 
     @property
     def frequency_band(self):
@@ -43,6 +121,18 @@ class Channel:
 
         return np.arange(self.lower_frequency, self.upper_frequency, dtype=int)
 
+    def overlaps(self, other: "Channel") -> bool:
+        """Check if the channel shares a grid slot with another channel.
+
+        Args:
+            other (Channel): The other channel.
+
+        Returns:
+            bool: True if the channels overlap, False otherwise.
+        """
+        return (self.start_slot < other.start_slot + other.num_slots
+                and other.start_slot < self.start_slot + self.num_slots)
+
     @property
     def name(self):
         """Generate a name for the channel.
@@ -74,7 +164,8 @@ class Channel:
                 }
         }
 
-    def convert_units(self, lower_frequency: Union[int, float, str], upper_frequency: Union[int, float, str]) \
+    @staticmethod
+    def convert_units(lower_frequency: Union[int, float, str], upper_frequency: Union[int, float, str]) \
             -> Tuple[float, float]:
         """Convert frequency units to GHz.
 
@@ -89,12 +180,12 @@ class Channel:
         low_freq, up_freq = float(lower_frequency), float(upper_frequency)
         assert low_freq < up_freq, "The lower frequency must be lower than the upper frequency"
 
-        if low_freq < self.spec_bounds[0]:
+        if low_freq < SPECTRUM["lower_bound"]:
             low_freq, up_freq = low_freq * 1e3, up_freq * 1e3
-        elif up_freq > self.spec_bounds[1]:
+        elif up_freq > SPECTRUM["upper_bound"]:
             low_freq, up_freq = low_freq * 1e-3, up_freq * 1e-3
 
-        assert low_freq >= self.spec_bounds[0] and up_freq <= self.spec_bounds[1], \
+        assert low_freq >= SPECTRUM["lower_bound"] and up_freq <= SPECTRUM["upper_bound"], \
             "The frequencies are not in the correct range"
 
         return low_freq, up_freq
@@ -106,25 +197,56 @@ class Channel:
         return self.__repr__()
 
 
-def create_random_channels(num_channels: int, bandwidths: List[int] = None) -> List[Channel]:
+def create_random_channels(num_channels: int, bandwidths: List[int] = None, seed: int = None,
+                           disjoint: bool = False) -> List[Channel]:
     """Create a list of randomly generated channels.
 
-    This function generates a list of random channels with specified bandwidths. The lower and upper frequency
-    boundaries for each channel are randomly selected within the specified frequency spectrum.
+    This function generates a list of random channels with specified bandwidths. Every channel is aligned to
+    a multiple of its own bandwidth above the lower bound of the spectrum.
 
     Args:
         num_channels (int): The number of random channels to create.
-        bandwidths (List[int], optional): List of bandwidths to randomly select from. Defaults to None.
+        bandwidths (List[int], optional): List of bandwidths in GHz to randomly select from. Defaults to None (50 GHz).
+        seed (int, optional): Seed of the random generator. Defaults to None.
+        disjoint (bool, optional): Create channels which do not overlap each other, so they can be added to a single
+            device. Defaults to False.
 
     Returns:
         List[Channel]: A list of randomly generated Channel instances.
     """
-    channels = []
+    rng = np.random.default_rng(seed)
+    widths = np.asarray(bandwidths if bandwidths is not None else [50]) / SPECTRUM["slot_width"]
+    assert np.all(widths == np.round(widths)), "The bandwidths must be multiples of the 6.25 GHz grid"
+
+    num_slots = rng.choice(widths.astype(int), size=num_channels)
+    start_slots = rng.integers(0, (SPECTRUM["num_slots"] - num_slots) // num_slots + 1) * num_slots
+    if disjoint:
+        start_slots = _separate(start_slots, num_slots, rng)
+    return Channel.from_arrays(start_slots, num_slots)
 
-    for _ in range(num_channels):
-        bandwidth = random.choice(bandwidths)
-        lower_bound = random.randrange(SPECTRUM["lower_bound"], SPECTRUM["upper_bound"] - bandwidth + 1, bandwidth)
-        upper_bound = lower_bound + bandwidth
-        channels.append(Channel(lower_bound, upper_bound))
 
-    return channels
+def _separate(start_slots: np.ndarray, num_slots: np.ndarray, rng: np.random.Generator,
+              max_attempts: int = 100) -> np.ndarray:
+    """Move random channels overlapping the earlier ones to other random aligned positions.
+
+    Args:
+        start_slots (np.ndarray): The first grid slot of every channel.
+        num_slots (np.ndarray): The number of grid slots of every channel.
+        rng (np.random.Generator): The random generator.
+        max_attempts (int, optional): The maximal number of positions tried per channel. Defaults to 100.
+
+    Returns:
+        np.ndarray: The first grid slot of every channel, no two channels overlap.
+    """
+    occupied = np.zeros(SPECTRUM["num_slots"], dtype=bool)
+    start_slots = start_slots.copy()
+    for i, (start, count) in enumerate(zip(start_slots.tolist(), num_slots.tolist())):
+        for _ in range(max_attempts):
+            if not occupied[start:start + count].any():
+                break
+            start = int(rng.integers(0, (SPECTRUM["num_slots"] - count) // count + 1)) * count
+        else:
+            raise ValueError(f"No free position for random channel {i} after {max_attempts} attempts")
+        occupied[start:start + count] = True
+        start_slots[i] = start
+    return start_slots
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+from .path import NetworkPath, merge_media_channel
+from .utils import write_atomic
+from .channel import Channel
+from .power import PowerModel, set_power
+
+
+@dataclass
+class CompileReport:
+    """Summary of the written configuration files.
+
+    Attributes:
+        files (int): The number of written files.
+        bytes (int): The total size of the written files.
+        elapsed (float): The time spent on merging, serializing and writing, in seconds.
+    """
+    files: int
+    bytes: int
+    elapsed: float
+
+
+class ConfigurationCompiler:
+    """Merge the configuration of many channels into one file per device.
+
+    The media channels of all channels are collected per device in memory and every file is written once, so
+    provisioning many demands does not rewrite the same device file over and over. With a power model, the power
+    fields of the media channels are planned for all added channels at once.
+
+    Attributes:
+        channel_plan (Dict[str, dict]): The channel plan entries, indexed by the channel names.
+        media_channels (Dict[str, Dict[str, dict]]): The media channels of every device, indexed by the device
+            names and the channel names.
+    """
+
+    def __init__(self, power_model: PowerModel = None, launch_power: float = 0.0):
+        """Initialize a ConfigurationCompiler instance.
+
+        Args:
+            power_model (PowerModel, optional): The power model to fill in the powers. Defaults to None (the powers
+                currently set on the path ports).
+            launch_power (float, optional): The launch power of a 50 GHz channel in dBm. Defaults to 0.
+        """
+        self.channel_plan: Dict[str, dict] = {}
+        self.media_channels: Dict[str, Dict[str, dict]] = {}
+        self._power_model = power_model
+        self._launch_power = launch_power
+        self._elapsed = 0.0
+
+    def add(self, path: NetworkPath, channel: Channel) -> None:
+        """Add the configuration of a channel on a path.
+
+        Args:
+            path (NetworkPath): The path of the channel.
+            channel (Channel): The channel.
+
+        Returns:
+            None
+        """
+        if self._power_model is not None:
+            self.add_all([(path, channel)])
+            return
+
+        self._add(path, channel)
+
+    def add_all(self, assignments: Iterable[Tuple[NetworkPath, Channel]]) -> None:
+        """Add the configuration of many channels.
+
+        Args:
+            assignments (Iterable[Tuple[NetworkPath, Channel]]): The (path, channel) pairs.
+
+        Returns:
+            None
+        """
+        assignments = list(assignments)
+        if self._power_model is None:
+            for path, channel in assignments:
+                self._add(path, channel)
+            return
+
+        start = time.perf_counter()
+        powers = self._power_model.plan(assignments, self._launch_power)
+        self._elapsed += time.perf_counter() - start
+        for (path, channel), (direction_1, direction_2) in zip(assignments, powers):
+            set_power(path, direction_1, direction_2)
+            self._add(path, channel)
+
+    def _add(self, path: NetworkPath, channel: Channel) -> None:
+        """Add the configuration of a channel with the powers currently set on the path ports.
+
+        Args:
+            path (NetworkPath): The path of the channel.
+            channel (Channel): The channel.
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        self.channel_plan[channel.name] = channel.channel_plan["channel-plan"]["channel"][0]
+        for device, config in path.device_configurations(channel).items():
+            media_channels = self.media_channels.setdefault(device, {})
+            if channel.name in media_channels:
+                merge_media_channel(media_channels[channel.name], config["media-channels"][0])
+            else:
+                media_channels[channel.name] = config["media-channels"][0]
+        self._elapsed += time.perf_counter() - start
+
+    def write(self, directory: str, compact: bool = False) -> CompileReport:
+        """Write the channel plan and the configuration of every device, each to a single file.
+
+        Every file is written to a temporary file first and renamed, so readers never see a partial file.
+
+        Args:
+            directory (str): The directory to save the files in.
+            compact (bool, optional): Write compact JSON instead of indented. Defaults to False.
+
+        Returns:
+            CompileReport: The number and size of the files and the time spent.
+        """
+        start = time.perf_counter()
+        os.makedirs(directory, exist_ok=True)
+        options = {"separators": (",", ":")} if compact else {"indent": 4}
+
+        documents = {"channel_plan": {"channel-plan": {"channel": list(self.channel_plan.values())}}}
+        for device, media_channels in self.media_channels.items():
+            documents[device] = {"media-channels": list(media_channels.values())}
+
+        size = 0
+        for name, document in documents.items():
+            data = json.dumps(document, **options).encode()
+            write_atomic(os.path.join(directory, f"{name}.json"), lambda f: f.write(data))
+            size += len(data)
+
+        return CompileReport(len(documents), size, self._elapsed + time.perf_counter() - start)
+
+
+def compile_configuration(assignments: Iterable[Tuple[NetworkPath, Channel]], directory: str,
+                          compact: bool = False, power_model: PowerModel = None,
+                          launch_power: float = 0.0) -> CompileReport:
+    """Write the configuration of many channels, one file per device.
+
+    Args:
+        assignments (Iterable[Tuple[NetworkPath, Channel]]): The (path, channel) pairs.
+        directory (str): The directory to save the files in.
+        compact (bool, optional): Write compact JSON instead of indented. Defaults to False.
+        power_model (PowerModel, optional): The power model to fill in the powers. Defaults to None.
+        launch_power (float, optional): The launch power of a 50 GHz channel in dBm. Defaults to 0.
+
+    Returns:
+        CompileReport: The number and size of the files and the time spent.
+    """
+    compiler = ConfigurationCompiler(power_model, launch_power)
+    compiler.add_all(assignments)
+    return compiler.write(directory, compact)
@@ -0,0 +1,258 @@
+import os
+import json
+from copy import deepcopy
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+from urllib.parse import quote
+
+from .path import NetworkPath
+from .channel import Channel
+from .restconf import RESTCONF_MODULE, PushResult, RestconfPusher, media_channel_config
+
+
+@dataclass
+class DeviceConfiguration:
+    """Configuration of the channels on a device.
+
+    Attributes:
+        channel_plan (Dict[str, dict]): The channel plan entries, indexed by the channel names.
+        media_channels (Dict[str, dict]): The media channels, indexed by the channel names.
+    """
+    channel_plan: Dict[str, dict] = field(default_factory=dict)
+    media_channels: Dict[str, dict] = field(default_factory=dict)
+
+
+@dataclass
+class ConfigurationDelta:
+    """Minimal change between the applied and the desired configuration of a device.
+
+    Attributes:
+        device (str): The name of the device.
+        added (Dict[str, dict]): The new media channels, indexed by the channel names.
+        modified (Dict[str, dict]): The changed media channels, indexed by the channel names.
+        removed (List[str]): The names of the removed media channels.
+        plan_added (Dict[str, dict]): The new channel plan entries, indexed by the channel names.
+        plan_removed (List[str]): The names of the removed channel plan entries.
+    """
+    device: str
+    added: Dict[str, dict] = field(default_factory=dict)
+    modified: Dict[str, dict] = field(default_factory=dict)
+    removed: List[str] = field(default_factory=list)
+    plan_added: Dict[str, dict] = field(default_factory=dict)
+    plan_removed: List[str] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        """Check if the delta contains no change.
+
+        Returns:
+            bool: True if there is nothing to apply, False otherwise.
+        """
+        return not (self.added or self.modified or self.removed or self.plan_added or self.plan_removed)
+
+    def to_dict(self) -> dict:
+        """Get the delta in the format of the generated configuration files.
+
+        Returns:
+            dict: The added, modified and removed channel plan entries and media channels.
+        """
+        return {
+            "channel-plan": {"added": list(self.plan_added.values()), "removed": self.plan_removed},
+            "media-channels": {"added": list(self.added.values()), "modified": list(self.modified.values()),
+                               "removed": self.removed},
+        }
+
+    def yang_patch(self, patch_id: str = None) -> dict:
+        """Get the delta as a YANG Patch (RFC 8072) applying all changes in a single request.
+
+        Media channels are removed before their channel plan entries and added after them, as they refer to
+        the channel plan.
+
+        Args:
+            patch_id (str, optional): The identifier of the patch. Defaults to None (the device name).
+
+        Returns:
+            dict: The YANG Patch document.
+        """
+        media_channel = f"/{RESTCONF_MODULE}:media-channels="
+        plan_channel = f"/{RESTCONF_MODULE}:channel-plan/channel="
+
+        edits = [("remove", media_channel, name, None) for name in self.removed]
+        edits += [("remove", plan_channel, name, None) for name in self.plan_removed]
+        edits += [("merge", plan_channel, name, {f"{RESTCONF_MODULE}:channel": [entry]})
+                  for name, entry in self.plan_added.items()]
+        edits += [("replace", media_channel, name, {f"{RESTCONF_MODULE}:media-channels": [entry]})
+                  for name, entry in self.modified.items()]
+        edits += [("merge", media_channel, name, {f"{RESTCONF_MODULE}:media-channels": [entry]})
+                  for name, entry in self.added.items()]
+
+        patch = []
+        for edit_id, (operation, target, name, value) in enumerate(edits, start=1):
+            edit = {"edit-id": str(edit_id), "operation": operation, "target": target + quote(name, safe="")}
+            if value is not None:
+                edit["value"] = value
+            patch.append(edit)
+
+        return {"ietf-yang-patch:yang-patch": {"patch-id": patch_id or self.device, "edit": patch}}
+
+
+def diff_configuration(device: str, applied: DeviceConfiguration, desired: DeviceConfiguration) \
+        -> ConfigurationDelta:
+    """Compute the minimal change from the applied to the desired configuration of a device.
+
+    Args:
+        device (str): The name of the device.
+        applied (DeviceConfiguration): The configuration applied on the device.
+        desired (DeviceConfiguration): The configuration the device should have.
+
+    Returns:
+        ConfigurationDelta: The change to apply.
+    """
+    delta = ConfigurationDelta(device)
+    for name, media_channel in desired.media_channels.items():
+        if name not in applied.media_channels:
+            delta.added[name] = media_channel
+        elif applied.media_channels[name] != media_channel:
+            delta.modified[name] = media_channel
+    delta.removed = [name for name in applied.media_channels if name not in desired.media_channels]
+
+    for name, entry in desired.channel_plan.items():
+        if applied.channel_plan.get(name) != entry:
+            delta.plan_added[name] = entry
+    delta.plan_removed = [name for name in applied.channel_plan if name not in desired.channel_plan]
+    return delta
+
+
+class ConfigurationTracker:
+    """Record of the configuration applied on every device and of the configuration it should have.
+
+    Provisioning operations change the desired configuration only. The minimal deltas towards it are
+    computed for the changed devices and, once delivered, committed as applied.
+
+    Attributes:
+        applied (Dict[str, DeviceConfiguration]): The last applied configuration, indexed by the device names.
+        desired (Dict[str, DeviceConfiguration]): The desired configuration, indexed by the device names.
+    """
+
+    def __init__(self):
+        self.applied: Dict[str, DeviceConfiguration] = {}
+        self.desired: Dict[str, DeviceConfiguration] = {}
+        self._changed = set()
+
+    def add(self, path: NetworkPath, channel: Channel) -> None:
+        """Add the configuration of a channel on a path.
+
+        A channel already configured on a device by a path in the opposite direction is merged into its media
+        channel.
+
+        Args:
+            path (NetworkPath): The path of the channel.
+            channel (Channel): The channel.
+
+        Returns:
+            None
+        """
+        plan_entry = channel.channel_plan["channel-plan"]["channel"][0]
+        for device, config in path.device_configurations(channel).items():
+            desired = self._desired(device)
+            desired.channel_plan[channel.name] = plan_entry
+            media_channel = media_channel_config(config["media-channels"][0])
+            if channel.name in desired.media_channels:
+                media_channel = {**desired.media_channels[channel.name], **media_channel}
+            desired.media_channels[channel.name] = media_channel
+            self._changed.add(device)
+
+    def remove(self, path: NetworkPath, channel: Channel) -> None:
+        """Remove the configuration of a channel on a path.
+
+        The add or drop port of a media channel shared with a path in the opposite direction is kept.
+
+        Args:
+            path (NetworkPath): The path of the channel.
+            channel (Channel): The channel.
+
+        Returns:
+            None
+        """
+        for device, config in path.device_configurations(channel).items():
+            desired = self._desired(device)
+            removed = media_channel_config(config["media-channels"][0])
+            media_channel = {key: value for key, value in desired.media_channels.get(channel.name, {}).items()
+                             if key == "channel" or removed.get(key) != value}
+            if "add" in media_channel or "drop" in media_channel:
+                desired.media_channels[channel.name] = media_channel
+            else:
+                desired.channel_plan.pop(channel.name, None)
+                desired.media_channels.pop(channel.name, None)
+            self._changed.add(device)
+
+    def pending(self) -> Dict[str, ConfigurationDelta]:
+        """Compute the deltas of the devices whose desired configuration differs from the applied one.
+
+        Returns:
+            Dict[str, ConfigurationDelta]: The non-empty deltas, indexed by the device names.
+        """
+        deltas = {}
+        for device in sorted(self._changed):
+            delta = diff_configuration(device, self.applied.get(device, DeviceConfiguration()), self.desired[device])
+            if not delta.empty:
+                deltas[device] = delta
+        return deltas
+
+    def commit(self, devices: Iterable[str] = None) -> None:
+        """Record the desired configuration as applied.
+
+        Args:
+            devices (Iterable[str], optional): The devices the deltas were delivered to. Defaults to None
+                (all changed devices).
+
+        Returns:
+            None
+        """
+        for device in list(self._changed if devices is None else devices):
+            self.applied[device] = deepcopy(self.desired[device])
+            self._changed.discard(device)
+
+    async def push(self, pusher: RestconfPusher) -> Dict[str, PushResult]:
+        """Push the pending deltas as YANG Patches and commit the devices which accepted them.
+
+        Args:
+            pusher (RestconfPusher): The pusher to deliver the deltas with.
+
+        Returns:
+            Dict[str, PushResult]: The outcome of every push, indexed by the device names. Devices without
+                changes are not contacted.
+        """
+        deltas = self.pending()
+        results = await pusher.push_patches({device: delta.yang_patch() for device, delta in deltas.items()})
+        self.commit([device for device in self._changed if device not in deltas or results[device].ok])
+        return results
+
+    def _desired(self, device: str) -> DeviceConfiguration:
+        """Get the desired configuration of a device, starting from the applied one.
+
+        Args:
+            device (str): The name of the device.
+
+        Returns:
+            DeviceConfiguration: The desired configuration.
+        """
+        if device not in self.desired:
+            self.desired[device] = deepcopy(self.applied.get(device, DeviceConfiguration()))
+        return self.desired[device]
+
+
+def write_deltas(deltas: Dict[str, ConfigurationDelta], directory: str) -> None:
+    """Write the deltas to one file per device.
+
+    Args:
+        deltas (Dict[str, ConfigurationDelta]): The deltas, indexed by the device names.
+        directory (str): The directory to save the files in.
+
+    Returns:
+        None
+    """
+    os.makedirs(directory, exist_ok=True)
+    for device, delta in deltas.items():
+        with open(os.path.join(directory, f"{device}.json"), "w") as f:
+            json.dump(delta.to_dict(), f, indent=4)
@@ -1,10 +1,12 @@
 from itertools import product
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Sequence, Tuple
 from dataclasses import dataclass
 
 import numpy as np
 
-from .channel import Channel, SPECTRUM
+from . import spectrum
+from .channel import Channel
+from .intervals import ChannelConflictError, IntervalIndex
 
 
 @dataclass
@@ -17,9 +19,11 @@ class NeighborInfo:
     Attributes:
         device (Device): The neighboring device.
         device_port (str): The port on the neighboring device.
+        loss (float): The loss of the span to the neighbor in dB. Default is 0.
     """
     device: 'Device'
     device_port: str
+    loss: float = 0.0
 
 
 @dataclass
@@ -95,38 +99,198 @@ class Device:
     Attributes:
         name (str): The name of the device.
         links (dict): A dictionary of links to other devices.
-        channels (List[Channel]): A list of channels on the device.
+        channels (List[Channel]): The channels on the device in the order of their frequencies.
+        intervals (IntervalIndex): The sorted index of the channels occupying the whole device, they never overlap.
+        port_intervals (Dict[Tuple[str, str], IntervalIndex]): The sorted index of the channels routed through each
+            (port, direction), they never overlap each other or a channel of the whole device.
+        device_bitmap (np.ndarray): Packed occupancy of the grid slots by the channels of the whole device.
+        port_bitmaps (Dict[Tuple[str, str], np.ndarray]): Packed occupancy of the grid slots of each (port,
+            direction) by its routed channels.
+        occupancy_bitmap (np.ndarray): Packed occupancy of the grid slots by any channel, kept in sync with the
+            channels.
+        insertion_loss (float): The loss of the signal passing through the device in dB. Default is 0.
+        gains (Dict[Tuple[str, str], float]): The gain of the amplifiers in dB, indexed by the (port, direction)
+            they amplify. Default is no amplifiers.
     """
 
     def __init__(self, name: str, channels: List[Channel] = None):
         self.name = name
         self.links = dict()
-        self.channels = channels if channels is not None else list()
-
-    def add_link(self, port: str, device: 'Device', device_port: str) -> None:
+        self.intervals = IntervalIndex()
+        self.port_intervals: Dict[Tuple[str, str], IntervalIndex] = {}
+        self.device_bitmap = spectrum.empty_bitmap()
+        self.port_bitmaps: Dict[Tuple[str, str], np.ndarray] = {}
+        self.occupancy_bitmap = spectrum.empty_bitmap()
+        self.insertion_loss = 0.0
+        self.gains: Dict[Tuple[str, str], float] = {}
+        if channels is not None:
+            self.add_channels(channels)
+
+    def add_link(self, port: str, device: 'Device', device_port: str, loss: float = 0.0) -> None:
         """Add a link to another device at the specified port.
 
         Args:
             port (str): The port to add the link to.
             device (Device): The device to link to.
             device_port (str): The port on the other device to link to.
+            loss (float, optional): The loss of the span in dB. Defaults to 0.
 
         Returns:
             None
         """
         assert port in self.links
-        self.links[port] = NeighborInfo(device, device_port)
+        self.links[port] = NeighborInfo(device, device_port, loss)
+
+    def remove_link(self, port: str) -> None:
+        """Remove the link at the specified port.
+
+        Args:
+            port (str): The port to remove the link from.
+
+        Returns:
+            None
+        """
+        assert port in self.links
+        self.links[port] = None
+
+    def spectrum_ports(self, ports: Sequence[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Get the directional ports whose spectrum is occupied by a channel routed through some ports of the device.
+
+        Args:
+            ports (Sequence[Tuple[str, str]]): The (port, direction) pairs the channel is routed through.
+
+        Returns:
+            List[Tuple[str, str]]: The occupied (port, direction) pairs, the routed ports themselves by default.
+        """
+        return list(dict.fromkeys(ports))
+
+    @property
+    def channels(self) -> List[Channel]:
+        """Get the channels on the device, both the ones occupying the whole device and the ones on its ports.
+
+        Returns:
+            List[Channel]: The channels in the order of their frequencies. Must not be modified by the caller.
+        """
+        if not self.port_intervals:
+            return self.intervals.channels
+        channels = {id(channel): channel for channel in self.intervals}
+        for index in self.port_intervals.values():
+            channels.update((id(channel), channel) for channel in index)
+        return sorted(channels.values(), key=lambda channel: channel.slot_range)
 
-    def add_channels(self, channels: List[Channel]) -> None:
-        """Add a channel to the device.
+    def add_channels(self, channels: List[Channel], ports: Sequence[Tuple[str, str]] = None) -> None:
+        """Add channels to the device, either to the whole device or to some of its directional ports.
+
+        A channel added to the whole device blocks its range on every port. A channel added to ports occupies only
+        them and the ports its signal reaches inside the device (see `spectrum_ports`), so channels routed through
+        disjoint ports of the device may overlap. The channels are added only if none of them overlaps a channel on
+        the same ports or another one of them.
 
         Args:
             channels (List[Channel]): A list of channels to add to the device.
+            ports (Sequence[Tuple[str, str]], optional): The (port, direction) pairs the channels pass. Defaults to
+                None (the whole device).
 
         Returns:
             None
+
+        Raises:
+            ChannelConflictError: If a channel overlaps a channel on the same ports or another added channel.
         """
-        self.channels.extend(channels)
+        batch = IntervalIndex(channels)
+        if ports is not None:
+            ports = self.spectrum_ports(ports)
+        for channel in batch:
+            conflicts = self.overlapping(*channel.slot_range, ports)
+            if conflicts:
+                raise ChannelConflictError(f"{channel} overlaps {conflicts[0]} on {self.name}")
+
+        for channel in batch:
+            if ports is None:
+                self.intervals.add(channel)
+                spectrum.set_range(self.device_bitmap, *channel.slot_range)
+            for key in ports or ():
+                self.port_intervals.setdefault(key, IntervalIndex()).add(channel)
+                spectrum.set_range(self.port_bitmaps.setdefault(key, spectrum.empty_bitmap()), *channel.slot_range)
+            spectrum.set_range(self.occupancy_bitmap, *channel.slot_range)
+
+    def remove_channels(self, channels: List[Channel], ports: Sequence[Tuple[str, str]] = None) -> None:
+        """Remove channels from the device.
+
+        Args:
+            channels (List[Channel]): A list of channels to remove from the device.
+            ports (Sequence[Tuple[str, str]], optional): The (port, direction) pairs the channels were added to.
+                Defaults to None (the whole device).
+
+        Returns:
+            None
+        """
+        if ports is not None:
+            ports = self.spectrum_ports(ports)
+        for channel in channels:
+            if ports is None:
+                self.intervals.remove(channel)
+                spectrum.clear_range(self.device_bitmap, *channel.slot_range)
+            for key in ports or ():
+                index = self.port_intervals[key]
+                index.remove(channel)
+                spectrum.clear_range(self.port_bitmaps[key], *channel.slot_range)
+                if not len(index):
+                    del self.port_intervals[key], self.port_bitmaps[key]
+
+        # Other ports may still carry an overlapping channel, the union is rebuilt in place as it may be a view
+        self.occupancy_bitmap[:] = self.port_bitmap(self.port_bitmaps)
+
+    def overlapping(self, start: int, stop: int, ports: Sequence[Tuple[str, str]] = None) -> List[Channel]:
+        """Find the channels overlapping a range of grid slots on some ports of the device.
+
+        Args:
+            start (int): The first slot of the range.
+            stop (int): The slot after the last one of the range.
+            ports (Sequence[Tuple[str, str]], optional): The (port, direction) pairs. Defaults to None (every port).
+
+        Returns:
+            List[Channel]: The overlapping channels, the ones occupying the whole device first.
+        """
+        conflicts = self.intervals.overlapping(start, stop)
+        for key in list(self.port_intervals) if ports is None else self.spectrum_ports(ports):
+            index = self.port_intervals.get(key)
+            if index is not None:
+                conflicts += index.overlapping(start, stop)
+        return conflicts
+
+    def is_free(self, start: int, stop: int, ports: Sequence[Tuple[str, str]] = None) -> bool:
+        """Check if a range of grid slots is free on some ports of the device.
+
+        Args:
+            start (int): The first slot of the range.
+            stop (int): The slot after the last one of the range.
+            ports (Sequence[Tuple[str, str]], optional): The (port, direction) pairs. Defaults to None (every port).
+
+        Returns:
+            bool: True if no channel occupies the range, False otherwise.
+        """
+        if not self.intervals.is_free(start, stop):
+            return False
+        indexes = self.port_intervals.values() if ports is None \
+            else map(self.port_intervals.get, self.spectrum_ports(ports))
+        return all(index is None or index.is_free(start, stop) for index in indexes)
+
+    def port_bitmap(self, ports: Iterable[Tuple[str, str]]) -> np.ndarray:
+        """Get the packed grid slot occupancy of some directional ports of the device.
+
+        Args:
+            ports (Iterable[Tuple[str, str]]): The (port, direction) pairs.
+
+        Returns:
+            np.ndarray: The occupancy bitmap of the channels of the whole device and of the ports.
+        """
+        bitmap = self.device_bitmap.copy()
+        for key in self.spectrum_ports(ports):
+            port_bitmap = self.port_bitmaps.get(key)
+            if port_bitmap is not None:
+                bitmap |= port_bitmap
+        return bitmap
 
     @property
     def spectrum_occupancy(self):
@@ -135,11 +299,7 @@ class Device:
         Returns:
             np.ndarray: The spectrum occupancy of the device.
         """
-        spectrum_occupancy = np.zeros(SPECTRUM["bandwidth"], dtype=bool)
-        for channel in self.channels:
-            shifted_band = channel.frequency_band - SPECTRUM["lower_bound"]
-            spectrum_occupancy[shifted_band] = True
-        return spectrum_occupancy
+        return spectrum.to_spectrum(self.occupancy_bitmap)
 
     @property
     def neighbors(self) -> List['Device']:
@@ -171,6 +331,17 @@ class Device:
             links.extend(self._generate_edges(port, info))
         return links
 
+    def port_edges(self, port: str) -> List[Tuple[DirectionalPort, DirectionalPort]]:
+        """Generate the external edges of a single port.
+
+        Args:
+            port (str): The port to generate edges for.
+
+        Returns:
+            List[Tuple[DirectionalPort, DirectionalPort]]: A list of external edges of the port.
+        """
+        return self._generate_edges(port, self.links[port])
+
     @property
     def graph_edges(self) -> List[Tuple[DirectionalPort, DirectionalPort]]:
         """Generate a list of graph edges for the device.
@@ -289,6 +460,25 @@ class CzechLightAddDrop(Device):
         self.links = {f"E{i}": None for i in range(1, self.num_express_ports + 1)}
         self.links.update({f"C{i}": None for i in range(1, self.num_client_ports + 1)})
 
+    def spectrum_ports(self, ports: Sequence[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Get the directional ports whose spectrum is occupied by a channel routed through some ports of the device.
+
+        The add/drop combines the signals of its input ports and broadcasts them to all output ports on the other
+        side, where the coherent receivers select their channel. A channel leaving an express or a client port is
+        therefore present on all output ports of that kind, and two channels overlap there whenever both are added,
+        or both dropped, on the device.
+
+        Args:
+            ports (Sequence[Tuple[str, str]]): The (port, direction) pairs the channel is routed through.
+
+        Returns:
+            List[Tuple[str, str]]: The routed ports and all output ports of the kinds the channel leaves through.
+        """
+        occupied = dict.fromkeys(ports)
+        for kind in {port[0] for port, direction in ports if direction == "TX"}:
+            occupied.update(dict.fromkeys((port, "TX") for port in self.links if port[0] == kind))
+        return list(occupied)
+
     @property
     def internal_edges(self) -> List[Tuple[DirectionalPort, DirectionalPort]]:
         """Generate internal edges for Czech Light Add Drop devices.
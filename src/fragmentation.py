@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from . import spectrum
+from .path import NetworkPath
+from .channel import Channel
+from .device import Device
+from .assignment import slots_to_channel
+from .provisioning import OccupancyMatrix
+
+
+@dataclass
+class FragmentationMetrics:
+    """Fragmentation of the free spectrum.
+
+    Attributes:
+        free_slots (int): The number of free grid slots.
+        num_blocks (int): The number of contiguous free blocks.
+        largest_block (int): The number of slots of the largest free block.
+        entropy (float): The entropy of the free block sizes normalized to [0, 1]. It is 0 for a single free block
+            and 1 when all free slots are isolated.
+    """
+    free_slots: int
+    num_blocks: int
+    largest_block: int
+    entropy: float
+
+
+def fragmentation_arrays(slot_occupancy: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compute the fragmentation metrics of many occupancy rows at once.
+
+    Args:
+        slot_occupancy (np.ndarray): The occupancy of each grid slot, one row per device or path.
+
+    Returns:
+        Dict[str, np.ndarray]: The "free_slots", "num_blocks", "largest_block" and "entropy" of every row.
+    """
+    occupancy = np.atleast_2d(slot_occupancy)
+    num_rows, num_slots = occupancy.shape
+
+    padded = np.ones((num_rows, num_slots + 2), dtype=bool)
+    padded[:, 1:-1] = occupancy
+    rows, edges = np.nonzero(padded[:, 1:] != padded[:, :-1])
+    rows, lengths = rows[0::2], edges[1::2] - edges[0::2]
+
+    free_slots = num_slots - occupancy.sum(axis=1)
+    num_blocks = np.bincount(rows, minlength=num_rows)
+    largest_block = np.zeros(num_rows, dtype=np.int64)
+    np.maximum.at(largest_block, rows, lengths)
+
+    shares = lengths / free_slots[rows]
+    entropy = np.bincount(rows, weights=shares * np.log(1 / shares), minlength=num_rows)
+    normalization = np.log(np.maximum(free_slots, 2))
+    entropy = np.where(free_slots > 1, np.minimum(entropy / normalization, 1.0), 0.0)
+
+    return {"free_slots": free_slots, "num_blocks": num_blocks, "largest_block": largest_block, "entropy": entropy}
+
+
+def fragmentation(slot_occupancy: np.ndarray) -> FragmentationMetrics:
+    """Compute the fragmentation metrics of a single occupancy row.
+
+    Args:
+        slot_occupancy (np.ndarray): The occupancy of each grid slot.
+
+    Returns:
+        FragmentationMetrics: The fragmentation metrics.
+    """
+    metrics = fragmentation_arrays(slot_occupancy)
+    return FragmentationMetrics(int(metrics["free_slots"][0]), int(metrics["num_blocks"][0]),
+                                int(metrics["largest_block"][0]), float(metrics["entropy"][0]))
+
+
+def device_fragmentation(device: Device) -> FragmentationMetrics:
+    """Compute the fragmentation of the free spectrum of a device.
+
+    Args:
+        device (Device): The device.
+
+    Returns:
+        FragmentationMetrics: The fragmentation metrics.
+    """
+    return fragmentation(spectrum.to_slots(device.occupancy_bitmap))
+
+
+def path_fragmentation(path: NetworkPath) -> FragmentationMetrics:
+    """Compute the fragmentation of the spectrum free on all devices of a path.
+
+    Args:
+        path (NetworkPath): The path.
+
+    Returns:
+        FragmentationMetrics: The fragmentation metrics.
+    """
+    return fragmentation(spectrum.to_slots(path.occupancy_bitmap))
+
+
+def network_fragmentation(devices: Iterable[Device]) -> Dict[str, FragmentationMetrics]:
+    """Compute the fragmentation of the free spectrum of many devices at once.
+
+    Args:
+        devices (Iterable[Device]): The devices, e.g. `network.devices.values()`.
+
+    Returns:
+        Dict[str, FragmentationMetrics]: The fragmentation metrics, indexed by the device names.
+    """
+    devices = list(devices)
+    if not devices:
+        return {}
+
+    metrics = fragmentation_arrays(spectrum.to_slots(np.stack([device.occupancy_bitmap for device in devices])))
+    rows = zip(metrics["free_slots"].tolist(), metrics["num_blocks"].tolist(), metrics["largest_block"].tolist(),
+               metrics["entropy"].tolist())
+    return {device.name: FragmentationMetrics(*row) for device, row in zip(devices, rows)}
+
+
+@dataclass
+class Retune:
+    """Move of a channel to another part of the spectrum on the same path.
+
+    The move is make-before-break: the new channel is free on the path while the old one is still in place, so
+    it is configured first and the old channel is removed once the traffic is switched over.
+
+    Attributes:
+        path (NetworkPath): The path of the channel.
+        old (Channel): The current channel.
+        new (Channel): The channel to move to.
+    """
+    path: NetworkPath
+    old: Channel
+    new: Channel
+
+
+def plan_defragmentation(devices: Iterable[Device], allocations: Iterable[Tuple[NetworkPath, Channel]],
+                         max_moves: int = None) -> List[Retune]:
+    """Plan make-before-break channel moves compacting the spectrum towards the lower frequencies.
+
+    The channels are visited from the lowest one up, each is moved to the lowest free range of its path below its
+    current position, if there is one not overlapping the current channel. A move is kept only if it reduces the
+    number of free blocks on the ports of the path, or keeps it and enlarges their largest free blocks, so every
+    move in the plan recovers contiguous space. The moves are applied in the plan order.
+
+    Args:
+        devices (Iterable[Device]): The devices with their current channels, e.g. `network.devices.values()`.
+        allocations (Iterable[Tuple[NetworkPath, Channel]]): The (path, channel) pairs which may be moved.
+        max_moves (int, optional): The maximal number of moves. Defaults to None (no limit).
+
+    Returns:
+        List[Retune]: The moves in the order of execution.
+    """
+    occupancy = OccupancyMatrix.from_devices(devices)
+    allocations = sorted(allocations, key=lambda allocation: allocation[1].start_slot)
+
+    moves = []
+    for path, channel in allocations:
+        if max_moves is not None and len(moves) >= max_moves:
+            break
+
+        rows = occupancy.rows(path)
+        start = occupancy.find(rows, channel.num_slots, "first-fit")
+        if start is None or start >= channel.start_slot:
+            continue
+
+        before = fragmentation_arrays(spectrum.to_slots(occupancy.matrix[rows]))
+        occupancy.occupy(rows, start, channel.num_slots)
+        occupancy.release(rows, channel.start_slot, channel.num_slots)
+        after = fragmentation_arrays(spectrum.to_slots(occupancy.matrix[rows]))
+
+        blocks_before, blocks_after = before["num_blocks"].sum(), after["num_blocks"].sum()
+        if blocks_after < blocks_before or (blocks_after == blocks_before and
+                                            after["largest_block"].sum() > before["largest_block"].sum()):
+            moves.append(Retune(path, channel, slots_to_channel(start, channel.num_slots)))
+        else:
+            occupancy.occupy(rows, channel.start_slot, channel.num_slots)
+            occupancy.release(rows, start, channel.num_slots)
+
+    return moves
+
+
+def apply_defragmentation(moves: List[Retune]) -> None:
+    """Execute planned moves on the devices, adding every new channel before removing the old one.
+
+    Args:
+        moves (List[Retune]): The moves in the order of execution.
+
+    Returns:
+        None
+    """
+    for move in moves:
+        move.path.add_channel(move.new)
+        move.path.remove_channel(move.old)
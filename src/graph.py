@@ -0,0 +1,324 @@
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .device import Device, DirectionalPort
+
+
+class PortGraph:
+    """Directed graph of device ports stored as integer CSR arrays.
+
+    Every (device, port) pair is interned to two consecutive node IDs, the TX direction to an even ID and
+    the RX direction to the following odd one, so the opposite direction of a node is ``node ^ 1``. Edges
+    follow the signal flow: from a TX port to the RX port of the linked device, and inside a device from
+    the RX port where the signal enters to the TX port where it leaves. The CSR arrays are rebuilt lazily
+    on the first search after a change.
+
+    Node IDs are stable, ports keep their IDs even when all their edges are removed.
+    """
+
+    def __init__(self):
+        self._index: Dict[Tuple[Device, str], int] = {}
+        self._devices: List[Device] = []
+        self._port_names: List[str] = []
+        self._edges: Set[Tuple[int, int]] = set()
+        self._csr: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._csc: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def num_nodes(self) -> int:
+        """Get the number of interned nodes.
+
+        Returns:
+            int: The number of nodes.
+        """
+        return 2 * len(self._devices)
+
+    @property
+    def edges(self) -> Set[Tuple[int, int]]:
+        """Get the directed edges of the graph.
+
+        Returns:
+            Set[Tuple[int, int]]: The (source, target) node pairs. Must not be modified by the caller.
+        """
+        return self._edges
+
+    def intern(self, port: DirectionalPort) -> int:
+        """Get the node ID of a directional port, interning the port on first use.
+
+        Args:
+            port (DirectionalPort): The directional port.
+
+        Returns:
+            int: The node ID.
+        """
+        key = (port.device, port.port)
+        if key not in self._index:
+            self._index[key] = self.num_nodes
+            self._devices.append(port.device)
+            self._port_names.append(port.port)
+        return self._index[key] + (port.direction == "RX")
+
+    def node_id(self, device: Device, port: str, direction: str) -> Optional[int]:
+        """Get the node ID of a directional port without interning it.
+
+        Args:
+            device (Device): The device of the port.
+            port (str): The name of the port.
+            direction (str): The direction of the port (TX or RX).
+
+        Returns:
+            Optional[int]: The node ID, None if the port was never interned.
+        """
+        node = self._index.get((device, port))
+        return None if node is None else node + (direction == "RX")
+
+    def port(self, node: int) -> DirectionalPort:
+        """Convert a node ID to a directional port.
+
+        Args:
+            node (int): The node ID.
+
+        Returns:
+            DirectionalPort: A new directional port object.
+        """
+        return DirectionalPort(self._devices[node >> 1], self._port_names[node >> 1], "RX" if node & 1 else "TX")
+
+    def ports(self, nodes: Iterable[int]) -> List[DirectionalPort]:
+        """Convert node IDs to directional ports.
+
+        Args:
+            nodes (Iterable[int]): The node IDs.
+
+        Returns:
+            List[DirectionalPort]: New directional port objects.
+        """
+        return [self.port(node) for node in nodes]
+
+    def export(self) -> Tuple[List[Tuple[Device, str]], np.ndarray]:
+        """Export the interned ports and the edges, e.g. to store them in a snapshot.
+
+        Returns:
+            Tuple[List[Tuple[Device, str]], np.ndarray]: The (device, port) pair of every even node ID in the node
+                ID order and the (source, target) node pairs as an array of shape (edges, 2).
+        """
+        edges = np.fromiter((node for edge in self._edges for node in edge), dtype=np.int64,
+                            count=2 * len(self._edges)).reshape(-1, 2)
+        return list(zip(self._devices, self._port_names)), edges
+
+    def restore(self, ports: List[Tuple[Device, str]], edges: np.ndarray) -> None:
+        """Replace the whole graph with exported ports and edges.
+
+        Args:
+            ports (List[Tuple[Device, str]]): The (device, port) pair of every even node ID in the node ID order.
+            edges (np.ndarray): The (source, target) node pairs as an array of shape (edges, 2).
+
+        Returns:
+            None
+        """
+        self._devices = [device for device, _ in ports]
+        self._port_names = [port for _, port in ports]
+        self._index = {key: 2 * i for i, key in enumerate(ports)}
+        self._edges = set(zip(edges[:, 0].tolist(), edges[:, 1].tolist()))
+        self._csr = self._csc = None
+
+    def add_edges(self, edges: Iterable[Tuple[int, int]]) -> None:
+        """Add directed edges to the graph.
+
+        Args:
+            edges (Iterable[Tuple[int, int]]): The (source, target) node pairs.
+
+        Returns:
+            None
+        """
+        self._edges.update(edges)
+        self._csr = self._csc = None
+
+    def remove_edges(self, edges: Iterable[Tuple[int, int]]) -> None:
+        """Remove directed edges from the graph.
+
+        Args:
+            edges (Iterable[Tuple[int, int]]): The (source, target) node pairs.
+
+        Returns:
+            None
+        """
+        self._edges.difference_update(edges)
+        self._csr = self._csc = None
+
+    def has_edge(self, source: int, target: int) -> bool:
+        """Check if the graph contains an edge.
+
+        Args:
+            source (int): The source node.
+            target (int): The target node.
+
+        Returns:
+            bool: True if the edge exists, False otherwise.
+        """
+        return (source, target) in self._edges
+
+    def adjacency(self, reverse: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the adjacency of the graph in the compressed sparse row format.
+
+        Args:
+            reverse (bool, optional): Get the predecessors instead of the successors. Defaults to False.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The index pointer and the neighbor arrays. The neighbors of the node
+                ``i`` are ``indices[indptr[i]:indptr[i + 1]]``.
+        """
+        if self._csr is None:
+            edges = np.fromiter((node for edge in self._edges for node in edge), dtype=np.int64,
+                                count=2 * len(self._edges)).reshape(-1, 2)
+            self._csr = self._compress(edges[:, 0], edges[:, 1])
+            self._csc = self._compress(edges[:, 1], edges[:, 0])
+        return self._csc if reverse else self._csr
+
+    def _compress(self, sources: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Build compressed sparse row arrays from edge lists.
+
+        Args:
+            sources (np.ndarray): The source node of every edge.
+            targets (np.ndarray): The target node of every edge.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The index pointer and the neighbor arrays.
+        """
+        order = np.lexsort((targets, sources))
+        indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.num_nodes), out=indptr[1:])
+        return indptr, targets[order].astype(np.int32)
+
+    def bfs(self, sources: Iterable[int], reverse: bool = False, target: int = None,
+            blocked_nodes: Iterable[int] = None, blocked_successors: Iterable[int] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Run a level-synchronous breadth-first search, expanding each level with array operations.
+
+        Args:
+            sources (Iterable[int]): The nodes to start from.
+            reverse (bool, optional): Follow the edges backwards. Defaults to False.
+            target (int, optional): Stop once this node is reached. Defaults to None.
+            blocked_nodes (Iterable[int], optional): Nodes the search must not enter. Defaults to None.
+            blocked_successors (Iterable[int], optional): Nodes the search must not enter directly from
+                the sources. Defaults to None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The hop distance and the parent of every node, -1 if not reached.
+        """
+        indptr, indices = self.adjacency(reverse)
+        dist = np.full(self.num_nodes, -1, dtype=np.int32)
+        parent = np.full(self.num_nodes, -1, dtype=np.int32)
+
+        seen = np.zeros(self.num_nodes, dtype=bool)
+        if blocked_nodes is not None:
+            seen[list(blocked_nodes)] = True
+
+        frontier = np.unique(np.fromiter(sources, dtype=np.int64))
+        seen[frontier] = True
+        dist[frontier] = 0
+
+        level = 0
+        while len(frontier) > 0 and (target is None or dist[target] < 0):
+            starts = indptr[frontier]
+            counts = indptr[frontier + 1] - starts
+            total = int(counts.sum())
+            if total == 0:
+                break
+
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            neighbors = indices[offsets]
+            origins = np.repeat(frontier, counts)
+
+            fresh = ~seen[neighbors]
+            if level == 0 and blocked_successors is not None:
+                fresh &= ~np.isin(neighbors, list(blocked_successors))
+
+            neighbors, first = np.unique(neighbors[fresh], return_index=True)
+            level += 1
+            seen[neighbors] = True
+            dist[neighbors] = level
+            parent[neighbors] = origins[fresh][first]
+            frontier = neighbors
+
+        return dist, parent
+
+    def shortest_path(self, source: int, target: int, blocked_nodes: Iterable[int] = None,
+                      blocked_successors: Iterable[int] = None) -> Optional[List[int]]:
+        """Find a shortest path by hop count.
+
+        Args:
+            source (int): The first node of the path.
+            target (int): The last node of the path.
+            blocked_nodes (Iterable[int], optional): Nodes the path must avoid. Defaults to None.
+            blocked_successors (Iterable[int], optional): Nodes which must not follow the source. Defaults to None.
+
+        Returns:
+            Optional[List[int]]: The nodes of the path, None if the target is not reachable.
+        """
+        dist, parent = self.bfs([source], target=target, blocked_nodes=blocked_nodes,
+                                blocked_successors=blocked_successors)
+        return self.reconstruct(parent, target) if dist[target] >= 0 else None
+
+    def dijkstra(self, source: int, weight: Callable[[int, int], float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute the weighted distances from a node with Dijkstra's algorithm.
+
+        Args:
+            source (int): The node to start from.
+            weight (Callable[[int, int], float]): The non-negative weight of an edge (source, target).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The distance of every node (np.inf if not reached) and its parent
+                (-1 if not reached).
+        """
+        indptr, indices = self.adjacency()
+        dist = np.full(self.num_nodes, np.inf)
+        parent = np.full(self.num_nodes, -1, dtype=np.int32)
+
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > dist[node]:
+                continue
+            for neighbor in indices[indptr[node]:indptr[node + 1]].tolist():
+                candidate = distance + weight(node, neighbor)
+                if candidate < dist[neighbor]:
+                    dist[neighbor] = candidate
+                    parent[neighbor] = node
+                    heapq.heappush(heap, (candidate, neighbor))
+
+        return dist, parent
+
+    @staticmethod
+    def reconstruct(parent: np.ndarray, target: int) -> List[int]:
+        """Reconstruct a path from the parents of a search.
+
+        Args:
+            parent (np.ndarray): The parent of every node, -1 for the sources.
+            target (int): The last node of the path.
+
+        Returns:
+            List[int]: The nodes of the path from a source to the target.
+        """
+        path = [target]
+        while parent[path[-1]] >= 0:
+            path.append(int(parent[path[-1]]))
+        return path[::-1]
+
+    def to_networkx(self, directed: bool = False):
+        """Export the graph to networkx with directional ports as nodes.
+
+        Args:
+            directed (bool, optional): Export the directed signal flow graph instead of the undirected graph
+                of (TX, RX) edges. Defaults to False.
+
+        Returns:
+            nx.Graph: The exported graph.
+        """
+        import networkx as nx
+
+        graph = nx.DiGraph() if directed else nx.Graph()
+        graph.add_edges_from((self.port(source), self.port(target)) for source, target in self._edges)
+        return graph
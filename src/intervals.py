@@ -0,0 +1,160 @@
+import bisect
+from typing import Iterable, Iterator, List, Optional
+
+from .channel import Channel, SPECTRUM
+
+
+class ChannelConflictError(ValueError):
+    """Raised when a channel overlaps a channel already present on a device."""
+
+
+class IntervalIndex:
+    """Sorted index of non-overlapping channels.
+
+    The channels are kept ordered by their first grid slot in parallel lists of start and stop slots. As the
+    channels do not overlap, the stop slots are sorted as well, so every query locates its position with a binary
+    search in O(log n). Inserting and removing shift the tail of the lists, which is a single memory move of at most
+    as many elements as there are grid slots.
+    """
+
+    def __init__(self, channels: Iterable[Channel] = ()):
+        """Initialize an IntervalIndex instance.
+
+        Args:
+            channels (Iterable[Channel], optional): The initial channels, in any order. Defaults to none.
+
+        Raises:
+            ChannelConflictError: If two of the channels overlap.
+        """
+        self._channels: List[Channel] = sorted(channels, key=lambda channel: channel.start_slot)
+        self._starts = [channel.start_slot for channel in self._channels]
+        self._stops = [channel.start_slot + channel.num_slots for channel in self._channels]
+        for i in range(1, len(self._channels)):
+            if self._starts[i] < self._stops[i - 1]:
+                raise ChannelConflictError(f"{self._channels[i]} overlaps {self._channels[i - 1]}")
+
+    @property
+    def channels(self) -> List[Channel]:
+        """Get the channels in the order of their frequencies.
+
+        Returns:
+            List[Channel]: The channels. Must not be modified by the caller.
+        """
+        return self._channels
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __iter__(self) -> Iterator[Channel]:
+        return iter(self._channels)
+
+    def __contains__(self, channel: Channel) -> bool:
+        i = bisect.bisect_left(self._starts, channel.start_slot)
+        return i < len(self._channels) and self._channels[i] is channel
+
+    def overlapping(self, start: int, stop: int) -> List[Channel]:
+        """Find the channels sharing a grid slot with a range of slots.
+
+        Args:
+            start (int): The first slot of the range.
+            stop (int): The slot after the last one of the range.
+
+        Returns:
+            List[Channel]: The overlapping channels in the order of their frequencies.
+        """
+        first = bisect.bisect_right(self._stops, start)
+        last = bisect.bisect_left(self._starts, stop)
+        return self._channels[first:last]
+
+    def is_free(self, start: int, stop: int) -> bool:
+        """Check if no channel occupies a range of slots.
+
+        Args:
+            start (int): The first slot of the range.
+            stop (int): The slot after the last one of the range.
+
+        Returns:
+            bool: True if the whole range is free, False otherwise.
+        """
+        return bisect.bisect_right(self._stops, start) == bisect.bisect_left(self._starts, stop)
+
+    def add(self, channel: Channel) -> None:
+        """Insert a channel.
+
+        Args:
+            channel (Channel): The channel.
+
+        Returns:
+            None
+
+        Raises:
+            ChannelConflictError: If the channel overlaps a channel of the index.
+        """
+        start, stop = channel.slot_range
+        conflicts = self.overlapping(start, stop)
+        if conflicts:
+            raise ChannelConflictError(f"{channel} overlaps {conflicts[0]}")
+
+        i = bisect.bisect_left(self._starts, start)
+        self._channels.insert(i, channel)
+        self._starts.insert(i, start)
+        self._stops.insert(i, stop)
+
+    def remove(self, channel: Channel) -> None:
+        """Remove a channel.
+
+        Args:
+            channel (Channel): The channel.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the channel is not in the index.
+        """
+        i = bisect.bisect_left(self._starts, channel.start_slot)
+        if i == len(self._channels) or self._channels[i] is not channel:
+            raise ValueError(f"{channel} is not in the index")
+
+        del self._channels[i], self._starts[i], self._stops[i]
+
+    def nearest_free(self, slot: int, num_slots: int) -> Optional[int]:
+        """Find the free range of slots of the requested width starting closest to a slot.
+
+        The search starts in the gap around the slot and visits the gaps on both sides in the order of their
+        distance, stopping as soon as no further gap can be closer than the best range found.
+
+        Args:
+            slot (int): The preferred first slot.
+            num_slots (int): The number of contiguous slots requested.
+
+        Returns:
+            Optional[int]: The first slot of the closest free range, None if no gap is wide enough.
+        """
+        # Gap i lies between channel i - 1 and channel i, gap 0 starts at slot 0 and the last gap ends at the top
+        num_gaps = len(self._channels) + 1
+
+        def gap(i: int):
+            return (self._stops[i - 1] if i > 0 else 0,
+                    self._starts[i] if i < len(self._channels) else SPECTRUM["num_slots"])
+
+        best, best_distance = None, None
+        left = bisect.bisect_right(self._stops, slot)
+        right = left + 1
+        while left >= 0 or right < num_gaps:
+            left_distance = slot - gap(left)[1] + num_slots if left >= 0 else None
+            right_distance = gap(right)[0] - slot if right < num_gaps else None
+            if left_distance is not None and (right_distance is None or left_distance <= right_distance):
+                i, distance, left = left, left_distance, left - 1
+            else:
+                i, distance, right = right, right_distance, right + 1
+
+            if best_distance is not None and distance >= best_distance:
+                break
+            low, high = gap(i)
+            if high - low >= num_slots:
+                start = min(max(slot, low), high - num_slots)
+                if best_distance is None or abs(start - slot) < best_distance:
+                    best, best_distance = start, abs(start - slot)
+
+        return best
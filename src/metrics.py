@@ -0,0 +1,225 @@
+import os
+import copy
+import time
+import bisect
+import logging
+import functools
+import threading
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+METRICS_CONFIG = os.path.join(os.path.dirname(__file__), os.pardir, "config", "metrics.yaml")
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+
+@dataclass
+class OperationStats:
+    """Statistics of an instrumented operation.
+
+    Attributes:
+        calls (int): The number of calls.
+        total (float): The total duration of the calls in seconds.
+        maximum (float): The duration of the slowest call in seconds.
+        buckets (List[int]): The number of calls in every latency bucket, the last one counts the calls slower than
+            all bounds.
+        retained (int): The memory allocated by the calls and still held on return, in bytes. Memory freed before
+            the return is not counted. Tracked only when allocation tracking is enabled.
+        slow (int): The number of calls slower than the threshold of the operation.
+    """
+    calls: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    retained: int = 0
+    slow: int = 0
+
+
+class Metrics:
+    """Switchable counters and latency histograms of the planning operations.
+
+    Instrumentation is disabled by default, the instrumented functions then only check a flag. Calls slower than
+    the threshold of their operation are logged as warnings by the `src.metrics` logger. Calls are recorded under a
+    lock, so operations may run in several threads.
+
+    Attributes:
+        enabled (bool): Record the instrumented calls.
+        thresholds (Dict[str, float]): The slow call thresholds in seconds, indexed by the operation names.
+        stats (Dict[str, OperationStats]): The statistics, indexed by the operation names.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.thresholds: Dict[str, float] = {}
+        self.stats: Dict[str, OperationStats] = {}
+        self._track_allocations = False
+        self._lock = threading.Lock()
+
+    def enable(self, track_allocations: bool = False, thresholds: Dict[str, float] = None) -> None:
+        """Start recording the instrumented calls.
+
+        Args:
+            track_allocations (bool, optional): Track the memory retained by the calls with tracemalloc, which
+                slows down the whole program. Defaults to False.
+            thresholds (Dict[str, float], optional): Slow call thresholds in seconds, indexed by the operation
+                names. Defaults to None.
+
+        Returns:
+            None
+        """
+        self.enabled = True
+        self._track_allocations = track_allocations
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if thresholds is not None:
+            self.thresholds.update(thresholds)
+
+    def configure(self, filename: str = METRICS_CONFIG) -> None:
+        """Enable or disable the instrumentation and set the slow call thresholds from a YAML file.
+
+        Args:
+            filename (str, optional): The configuration file. Defaults to config/metrics.yaml.
+
+        Returns:
+            None
+        """
+        with open(filename) as f:
+            config = yaml.safe_load(f)
+
+        self.thresholds.update(config.get("thresholds") or {})
+        if config.get("enabled", False):
+            self.enable(config.get("track_allocations", False))
+        else:
+            self.disable()
+
+    def disable(self) -> None:
+        """Stop recording the instrumented calls. The recorded statistics are kept.
+
+        Returns:
+            None
+        """
+        self.enabled = False
+        if self._track_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._track_allocations = False
+
+    def reset(self) -> None:
+        """Clear the recorded statistics.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.stats.clear()
+
+    def record(self, operation: str, duration: float, retained: int = 0) -> None:
+        """Record a call of an operation.
+
+        Args:
+            operation (str): The name of the operation.
+            duration (float): The duration of the call in seconds.
+            retained (int, optional): The memory allocated by the call and still held on return, in bytes.
+                Defaults to 0.
+
+        Returns:
+            None
+        """
+        threshold = self.thresholds.get(operation)
+        slow = threshold is not None and duration > threshold
+        with self._lock:
+            stats = self.stats.get(operation)
+            if stats is None:
+                stats = self.stats[operation] = OperationStats()
+            stats.calls += 1
+            stats.total += duration
+            stats.maximum = max(stats.maximum, duration)
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+            stats.retained += retained
+            stats.slow += slow
+
+        if slow:
+            logger.warning(f"Slow {operation}: {duration * 1e3:.3f} ms (threshold {threshold * 1e3:.3f} ms)")
+
+    def instrument(self, operation: str) -> Callable[[Callable], Callable]:
+        """Create a decorator recording the calls of a function as an operation.
+
+        Args:
+            operation (str): The name of the operation.
+
+        Returns:
+            Callable[[Callable], Callable]: The decorator.
+        """
+
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+
+                memory = tracemalloc.get_traced_memory()[0] if self._track_allocations else 0
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    duration = time.perf_counter() - start
+                    retained = tracemalloc.get_traced_memory()[0] - memory if self._track_allocations else 0
+                    self.record(operation, duration, max(retained, 0))
+
+            return wrapper
+
+        return decorator
+
+    def prometheus(self, prefix: str = "czechlight") -> str:
+        """Dump the statistics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str, optional): The prefix of the metric names. Defaults to "czechlight".
+
+        Returns:
+            str: The metrics.
+        """
+        with self._lock:
+            recorded = copy.deepcopy(self.stats)
+
+        lines = [f"# HELP {prefix}_operation_duration_seconds Duration of the planning operations.",
+                 f"# TYPE {prefix}_operation_duration_seconds histogram"]
+        for operation, stats in sorted(recorded.items()):
+            label = f'operation="{operation}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'{prefix}_operation_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_operation_duration_seconds_bucket{{{label},le="+Inf"}} {stats.calls}')
+            lines.append(f"{prefix}_operation_duration_seconds_sum{{{label}}} {stats.total}")
+            lines.append(f"{prefix}_operation_duration_seconds_count{{{label}}} {stats.calls}")
+
+        counters = [("slow_calls_total", "slow", "Calls slower than the threshold of the operation."),
+                    ("retained_bytes_total", "retained", "Memory allocated by the operations and held on return.")]
+        for name, attribute, description in counters:
+            lines.append(f"# HELP {prefix}_operation_{name} {description}")
+            lines.append(f"# TYPE {prefix}_operation_{name} counter")
+            for operation, stats in sorted(recorded.items()):
+                lines.append(f'{prefix}_operation_{name}{{operation="{operation}"}} {getattr(stats, attribute)}')
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def instrumented(operation: str) -> Callable[[Callable], Callable]:
+    """Create a decorator recording the calls of a function in the global metrics.
+
+    Args:
+        operation (str): The name of the operation.
+
+    Returns:
+        Callable[[Callable], Callable]: The decorator.
+    """
+    return METRICS.instrument(operation)
@@ -1,10 +1,18 @@
-from typing import Dict, List
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import networkx as nx
-import matplotlib.pyplot as plt
 
+from .channel import Channel
 from .device import Device, DirectionalPort
+from .graph import PortGraph
+from .metrics import instrumented
+from .power import PowerModel
 from .path import NetworkPath
+from .assignment import assign_channel
+from .routing import CandidatePaths, RouteTable, signal_flow, MAX_CANDIDATES
+from .provisioning import provision, BatchResult
+from .parallel import provision_parallel
 
 
 class Network:
@@ -13,12 +21,24 @@ class Network:
     This class manages the devices in the network and provides methods for adding devices,
     creating bidirectional links, finding paths, and visualizing the network.
 
+    The graph of directional ports is owned by the network and updated in place whenever a device or a link
+    is added or removed, so path queries do not have to rebuild it.
+
     Attributes:
         devices (dict): A dictionary containing devices in the network, indexed by their names.
+        port_graph (PortGraph): The integer indexed graph of directional ports.
+        version (int): Topology version, incremented on every change of the port graph.
+        route_table (RouteTable): Shortest routes between the termination points, updated with the topology.
+        power_model (PowerModel): The optical power budget of the ports.
     """
 
     def __init__(self):
         self.devices = {}
+        self.version = 0
+        self.port_graph = PortGraph()
+        self._candidates: Dict[Tuple[str, str], CandidatePaths] = {}
+        self.route_table = RouteTable(self.port_graph, self.devices)
+        self.power_model = PowerModel(self)
 
     def add_device(self, device: Device) -> None:
         """Add a device to the network.
@@ -30,9 +50,49 @@ class Network:
             None
         """
 
-        self.devices[device.name] = device
+        self.add_devices([device])
+
+    def add_devices(self, devices: Iterable[Device]) -> None:
+        """Add many devices to the network with a single update of the port graph.
+
+        Args:
+            devices (Iterable[Device]): The devices to add to the network.
+
+        Returns:
+            None
+        """
+
+        devices = list(devices)
+        assert len({device.name for device in devices}) == len(devices), "Device names must be unique"
+        for device in devices:
+            if device.name in self.devices:
+                self.remove_device(device.name)
+
+        new_edges = []
+        for device in devices:
+            self.devices[device.name] = device
+            new_edges.extend(device.graph_edges)
+        self._update_graph([], new_edges)
+
+    def remove_device(self, name: str) -> None:
+        """Remove a device and all its links from the network.
+
+        Args:
+            name (str): The name of the device to remove.
+
+        Returns:
+            None
+        """
+
+        device = self.devices[name]
+        for port, info in device.links.items():
+            if info is not None:
+                self._unlink(device, port)
+
+        del self.devices[name]
+        self._update_graph(device.graph_edges, [])
 
-    def add_bidi_link(self, device_a: str, port_a: str, device_b: str, port_b: str) -> None:
+    def add_bidi_link(self, device_a: str, port_a: str, device_b: str, port_b: str, loss: float = 0.0) -> None:
         """Add a bidirectional link between two devices.
 
         Args:
@@ -40,13 +100,122 @@ class Network:
             port_a (str): The port on the first device to link.
             device_b (str): The name of the second device to link.
             port_b (str): The port on the second device to link.
+            loss (float, optional): The loss of the span in dB, the same in both directions. Defaults to 0.
+
+        Returns:
+            None
+        """
+
+        self.add_bidi_links([(device_a, port_a, device_b, port_b, loss)])
+
+    def add_bidi_links(self, links: Iterable[tuple]) -> None:
+        """Add many bidirectional links with a single update of the port graph.
+
+        The internal edges of every linked device are regenerated once for the whole batch instead of once
+        per link.
+
+        Args:
+            links (Iterable[tuple]): The (device A, port A, device B, port B) links, optionally followed by the loss
+                of the span in dB.
+
+        Returns:
+            None
+        """
+
+        links = [(self.devices[device_a], port_a, self.devices[device_b], port_b, loss[0] if loss else 0.0)
+                 for device_a, port_a, device_b, port_b, *loss in links]
+        ends = [end for dev_a, port_a, dev_b, port_b, _ in links for end in ((dev_a, port_a), (dev_b, port_b))]
+        assert len(set(ends)) == len(ends), "A port can be linked only once in a batch"
+
+        # A port holds a single fiber, so relinking a port first detaches its previous neighbor
+        for device, port in ends:
+            if device.links.get(port) is not None:
+                self._unlink(device, port)
+
+        linked = list(dict.fromkeys(device for device, _ in ends))
+        stale_edges = [edge for device in linked for edge in device.internal_edges]
+        for dev_a, port_a, dev_b, port_b, loss in links:
+            dev_a.add_link(port_a, dev_b, port_b, loss)
+            dev_b.add_link(port_b, dev_a, port_a, loss)
+
+        new_edges = [edge for device in linked for edge in device.internal_edges]
+        for dev_a, port_a, _, _, _ in links:
+            new_edges.extend(dev_a.port_edges(port_a))
+        self._update_graph(stale_edges, new_edges)
+
+    def remove_bidi_link(self, device: str, port: str) -> None:
+        """Remove the bidirectional link attached to a port of a device.
+
+        Args:
+            device (str): The name of the device on either end of the link.
+            port (str): The port on the device to unlink.
+
+        Returns:
+            None
+        """
+
+        if self.devices[device].links[port] is not None:
+            self._unlink(self.devices[device], port)
+
+    def _unlink(self, device: Device, port: str) -> None:
+        """Detach the link at the given port on both of its ends and update the port graph.
+
+        Args:
+            device (Device): The device on one end of the link.
+            port (str): The port on the device to unlink.
+
+        Returns:
+            None
+        """
+
+        neighbor = device.links[port]
+        stale_edges = device.internal_edges + neighbor.device.internal_edges + device.port_edges(port)
+
+        device.remove_link(port)
+        back_link = neighbor.device.links.get(neighbor.device_port)
+        if back_link is not None and back_link.device is device and back_link.device_port == port:
+            neighbor.device.remove_link(neighbor.device_port)
+
+        self._update_graph(stale_edges, device.internal_edges + neighbor.device.internal_edges)
+
+    def _update_graph(self, stale_edges: List[Tuple[DirectionalPort, DirectionalPort]],
+                      new_edges: List[Tuple[DirectionalPort, DirectionalPort]]) -> None:
+        """Replace edges of the port graph and bump the topology version.
+
+        Args:
+            stale_edges (List[Tuple[DirectionalPort, DirectionalPort]]): Edges to remove.
+            new_edges (List[Tuple[DirectionalPort, DirectionalPort]]): Edges to add.
 
         Returns:
             None
         """
 
-        self.devices[device_a].add_link(port_a, self.devices[device_b], port_b)
-        self.devices[device_b].add_link(port_b, self.devices[device_a], port_a)
+        stale_flows = {self._flow(edge) for edge in stale_edges}
+        new_flows = {self._flow(edge) for edge in new_edges}
+
+        # Edges kept by the change are neither removed nor added
+        removed = [edge for edge in stale_flows - new_flows if self.port_graph.has_edge(*edge)]
+        added = [edge for edge in new_flows if not self.port_graph.has_edge(*edge)]
+
+        self.port_graph.remove_edges(removed)
+        self.route_table.update(removed, added)
+        self.port_graph.add_edges(added)
+
+        self.version += 1
+        self._candidates.clear()
+
+    def _flow(self, edge: Tuple[DirectionalPort, DirectionalPort]) -> Tuple[int, int]:
+        """Convert a device edge to a directed edge of the port graph.
+
+        Args:
+            edge (Tuple[DirectionalPort, DirectionalPort]): The (TX, RX) device edge.
+
+        Returns:
+            Tuple[int, int]: The edge in the signal flow direction.
+        """
+
+        source, target = signal_flow(edge)
+        return self.port_graph.intern(source), self.port_graph.intern(target)
 
     @property
     def device_graph(self) -> nx.Graph:
@@ -63,38 +232,110 @@ class Network:
         return graph
 
     @property
+    @instrumented("network.graph")
     def graph(self) -> nx.Graph:
-        """Create a graph of devices and their links.
+        """Export the graph of directional ports and their links to networkx.
+
+        The network routes over `port_graph`, the exported graph is built on every access.
 
         Returns:
             nx.Graph: A graph of devices and their links.
         """
 
-        graph = nx.Graph()
-        for device in self.devices.values():
-            graph.add_edges_from(device.graph_edges)
-        return graph
+        return self.port_graph.to_networkx()
 
+    @instrumented("network.shortest_path")
     def shortest_path(self, tp_a: str, tp_b: str) -> NetworkPath:
         """Find the shortest path between two termination points.
 
+        The path is served from the route table, which is computed on first use and kept up to date with
+        the topology.
+
+        Args:
+            tp_a (str): The name of the first termination point.
+            tp_b (str): The name of the second termination point.
+
+        Returns:
+            NetworkPath: The shortest paths in both directions.
+        """
+
+        return self.route_table.lookup(tp_a, tp_b)
+
+    def precompute_routes(self) -> None:
+        """Compute the shortest paths between all pairs of termination points in advance.
+
+        Returns:
+            None
+        """
+
+        self.route_table.precompute()
+
+    def k_shortest_paths(self, tp_a: str, tp_b: str, k: Optional[int] = MAX_CANDIDATES) -> Iterator[NetworkPath]:
+        """Generate candidate paths between two termination points in the order of increasing length.
+
+        The candidates are generated lazily and cached per termination point pair until the topology changes.
+        The second direction of every candidate uses the same links as the first one.
+
+        Args:
+            tp_a (str): The name of the first termination point.
+            tp_b (str): The name of the second termination point.
+            k (Optional[int], optional): The maximal number of candidates, None for all simple paths. Their number
+                grows exponentially with the size of the network. Defaults to MAX_CANDIDATES.
+
+        Returns:
+            Iterator[NetworkPath]: The candidate paths.
+        """
+
+        if (tp_a, tp_b) not in self._candidates:
+            source = self.port_graph.node_id(self.devices[tp_a], 'C', "TX")
+            target = self.port_graph.node_id(self.devices[tp_b], 'C', "RX")
+            self._candidates[tp_a, tp_b] = CandidatePaths(self.port_graph, source, target)
+
+        return islice(self._candidates[tp_a, tp_b], k)
+
+    def find_path_with_spectrum(self, tp_a: str, tp_b: str, bandwidth: float, policy: str = "first-fit",
+                                k: Optional[int] = MAX_CANDIDATES) -> Optional[Tuple[NetworkPath, Channel]]:
+        """Find the shortest candidate path with a free channel of the requested width.
+
         Args:
             tp_a (str): The name of the first termination point.
             tp_b (str): The name of the second termination point.
+            bandwidth (float): The requested channel width in GHz.
+            policy (str, optional): The spectrum assignment policy. Defaults to "first-fit".
+            k (Optional[int], optional): The maximal number of candidates to try, None for all simple paths.
+                Defaults to MAX_CANDIDATES.
 
         Returns:
-            Dict[str, List[DirectionalPort]]: A dictionary containing the shortest paths in both directions.
+            Optional[Tuple[NetworkPath, Channel]]: The path and the assigned channel, None if no candidate has
+                free spectrum.
         """
 
-        node_a_rx = DirectionalPort(self.devices[tp_a], 'C', "RX")
-        node_a_tx = DirectionalPort(self.devices[tp_a], 'C', "TX")
-        node_b_rx = DirectionalPort(self.devices[tp_b], 'C', "RX")
-        node_b_tx = DirectionalPort(self.devices[tp_b], 'C', "TX")
+        for path in self.k_shortest_paths(tp_a, tp_b, k):
+            channel = assign_channel(path, bandwidth, policy)
+            if channel is not None:
+                return path, channel
+        return None
 
-        direction_ab = nx.shortest_path(self.graph, node_a_tx, node_b_rx)
-        direction_ba = nx.shortest_path(self.graph, node_b_tx, node_a_rx)
+    def provision_demands(self, demands: List[Tuple[str, str, float]], policy: str = "first-fit",
+                          ordering: str = "as-given", commit: bool = True, processes: int = None) -> BatchResult:
+        """Route and assign channels to a batch of demands between termination points.
 
-        return NetworkPath(direction_ab, direction_ba)
+        Args:
+            demands (List[Tuple[str, str, float]]): The (termination point A, termination point B, bandwidth) demands.
+            policy (str, optional): The spectrum assignment policy. Defaults to "first-fit".
+            ordering (str, optional): The order of assignment ("as-given", "longest-first" or "widest-first").
+                Defaults to "as-given".
+            commit (bool, optional): Add the assigned channels to the devices. Defaults to True.
+            processes (int, optional): Spread the route searches over this many worker processes, see
+                `ParallelPlanner`. The result is the same. Defaults to None (sequential).
+
+        Returns:
+            BatchResult: The paths and channels of the provisioned demands and the blocked demands.
+        """
+
+        if processes is not None:
+            return provision_parallel(self, demands, policy, ordering, commit, processes)
+        return provision(self, demands, policy, ordering, commit)
 
     def draw(self) -> None:
         """Draw the device graph.
@@ -103,5 +344,6 @@ class Network:
             None
         """
 
-        nx.draw(self.device_graph, with_labels=True)
-        plt.show()
+        from .plotting import draw_network
+
+        draw_network(self)
@@ -0,0 +1,301 @@
+import os
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import spectrum
+from .path import NetworkPath
+from .graph import PortGraph
+from .assignment import free_blocks
+from .provisioning import BatchResult, Demand, OccupancyMatrix, assign_routes
+
+# Name, shape and dtype of an array placed in shared memory
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+# Shared memory blocks mapped by a worker process and their arrays, indexed by the block names
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+class SharedArrays:
+    """NumPy arrays placed in shared memory blocks, so worker processes can map them instead of unpickling copies.
+
+    The creating process owns the blocks and unlinks them in `close`.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """Copy arrays to new shared memory blocks.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): The arrays, indexed by their keys.
+        """
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.specs: Dict[str, ArraySpec] = {}
+        for key, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self._blocks.append(block)
+            self.arrays[key] = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            self.arrays[key][...] = array
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        """Release and remove the shared memory blocks.
+
+        Returns:
+            None
+        """
+        self.arrays.clear()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+
+def _attach(specs: Dict[str, ArraySpec]) -> Dict[str, np.ndarray]:
+    """Map the shared arrays of a batch in a worker process.
+
+    The mappings are reused by the later tasks of the batch, the mappings of earlier batches are released.
+
+    Args:
+        specs (Dict[str, ArraySpec]): The name, shape and dtype of every array, indexed by the array keys.
+
+    Returns:
+        Dict[str, np.ndarray]: The mapped arrays, indexed by their keys.
+    """
+    names = {name for name, _, _ in specs.values()}
+    for name in [name for name in _attached if name not in names]:
+        block, _ = _attached.pop(name)
+        block.close()
+
+    arrays = {}
+    for key, (name, shape, dtype) in specs.items():
+        if name not in _attached:
+            block = shared_memory.SharedMemory(name=name)
+            _attached[name] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+        arrays[key] = _attached[name][1]
+    return arrays
+
+
+class _SharedPortGraph(PortGraph):
+    """Read-only port graph searching the CSR arrays of the parent process mapped from shared memory."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        """Initialize a _SharedPortGraph instance.
+
+        Args:
+            indptr (np.ndarray): The index pointer array of the successors.
+            indices (np.ndarray): The successor array.
+        """
+        super().__init__()
+        self._adjacency = (indptr, indices)
+
+    @property
+    def num_nodes(self) -> int:
+        """Get the number of nodes.
+
+        Returns:
+            int: The number of nodes.
+        """
+        return len(self._adjacency[0]) - 1
+
+    def adjacency(self, reverse: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the shared successor arrays.
+
+        Args:
+            reverse (bool, optional): Must be False, the predecessors are not shared. Defaults to False.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The index pointer and the neighbor arrays.
+        """
+        assert not reverse, "Only the successors are shared"
+        return self._adjacency
+
+
+def _route_source(task: Tuple[Dict[str, ArraySpec], int, List[int]]) -> List[Optional[np.ndarray]]:
+    """Find the shortest routes from a node to many nodes with a single search. Runs in a worker process.
+
+    The routes are the same as the ones of the route table, which reconstructs them from a full search as well.
+
+    Args:
+        task (Tuple[Dict[str, ArraySpec], int, List[int]]): The shared arrays, the source node and the target nodes.
+
+    Returns:
+        List[Optional[np.ndarray]]: The node IDs of the route to every target, None if it is not reachable.
+    """
+    specs, source, targets = task
+    arrays = _attach(specs)
+    graph = _SharedPortGraph(arrays["indptr"], arrays["indices"])
+    dist, parent = graph.bfs([source])
+    return [np.array(graph.reconstruct(parent, target), dtype=np.int32) if dist[target] >= 0 else None
+            for target in targets]
+
+
+def _largest_free(task: Tuple[Dict[str, ArraySpec], np.ndarray]) -> int:
+    """Find the largest free block of the spectrum of a path. Runs in a worker process.
+
+    Args:
+        task (Tuple[Dict[str, ArraySpec], np.ndarray]): The shared arrays and the occupancy rows of the path.
+
+    Returns:
+        int: The number of slots of the largest free block.
+    """
+    specs, rows = task
+    _, lengths = free_blocks(spectrum.to_slots(np.bitwise_or.reduce(_attach(specs)["occupancy"][rows])))
+    return int(lengths.max(initial=0))
+
+
+class ParallelPlanner:
+    """Provision batches of demands with the route searches and the spectrum evaluation spread over processes.
+
+    For every batch, the CSR arrays of the port graph and the occupancy matrix are placed in shared memory, so the
+    workers receive only node IDs and row indices. The workers find the routes, one search per source terminal
+    point, and the largest free block of every path. The spectrum is then assigned in the parent process one demand
+    at a time, in the same order and with the same routes as `provision`, so the results match the sequential mode
+    exactly. The free blocks computed in parallel only let demands which cannot fit be blocked without a search.
+
+    Use it as a context manager, or call `close` to stop the workers.
+    """
+
+    def __init__(self, network, processes: int = None):
+        """Initialize a ParallelPlanner instance and start the worker processes.
+
+        Args:
+            network (Network): The network to provision the demands in.
+            processes (int, optional): The number of worker processes. Defaults to None (the number of CPUs).
+        """
+        self._network = network
+        self._processes = processes or os.cpu_count()
+
+        # Workers must share the resource tracker of this process, otherwise their own trackers report the shared
+        # memory blocks they mapped as leaked
+        resource_tracker.ensure_running()
+        self._pool = multiprocessing.Pool(self._processes)
+
+    def __enter__(self) -> "ParallelPlanner":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker processes.
+
+        Returns:
+            None
+        """
+        self._pool.close()
+        self._pool.join()
+
+    def _map(self, function, tasks: list) -> list:
+        """Run tasks in the pool in chunks, keeping the order of the results.
+
+        Args:
+            function (Callable): The task function.
+            tasks (list): The tasks.
+
+        Returns:
+            list: The results of the tasks.
+        """
+        return self._pool.map(function, tasks, chunksize=max(1, len(tasks) // (4 * self._processes)))
+
+    def _routes(self, pairs: List[Tuple[str, str]], specs: Dict[str, ArraySpec]) -> Dict[Tuple[str, str], tuple]:
+        """Find the shortest routes of terminal point pairs in both directions.
+
+        Args:
+            pairs (List[Tuple[str, str]]): The (terminal A, terminal B) pairs.
+            specs (Dict[str, ArraySpec]): The shared arrays.
+
+        Returns:
+            Dict[Tuple[str, str], tuple]: The route from A to B and the route from B to A of every pair, None
+                instead of the pair of routes if A and B are not connected.
+        """
+        port_graph = self._network.port_graph
+
+        def terminal_node(name: str, direction: str) -> Optional[int]:
+            device = self._network.devices.get(name)
+            return None if device is None else port_graph.node_id(device, 'C', direction)
+
+        targets: Dict[str, List[str]] = {}
+        for tp_a, tp_b in pairs:
+            targets.setdefault(tp_a, []).append(tp_b)
+            targets.setdefault(tp_b, []).append(tp_a)
+
+        tasks, keys = [], []
+        for source, names in targets.items():
+            names = [name for name in dict.fromkeys(names) if terminal_node(name, "RX") is not None]
+            if terminal_node(source, "TX") is not None and names:
+                tasks.append((specs, terminal_node(source, "TX"), [terminal_node(name, "RX") for name in names]))
+                keys.append((source, names))
+
+        found = {}
+        for (source, names), routes in zip(keys, self._map(_route_source, tasks)):
+            found.update(((source, name), route) for name, route in zip(names, routes))
+
+        result = {}
+        for tp_a, tp_b in pairs:
+            forward, backward = found.get((tp_a, tp_b)), found.get((tp_b, tp_a))
+            result[tp_a, tp_b] = None if forward is None or backward is None else (forward, backward)
+        return result
+
+    def provision(self, demands: List[Tuple[str, str, float]], policy: str = "first-fit",
+                  ordering: str = "as-given", commit: bool = True) -> BatchResult:
+        """Route and assign spectrum to a batch of demands.
+
+        Args:
+            demands (List[Tuple[str, str, float]]): The (terminal A, terminal B, bandwidth) demands.
+            policy (str, optional): The assignment policy. Defaults to "first-fit".
+            ordering (str, optional): The order of assignment, one of ORDERINGS. Defaults to "as-given".
+            commit (bool, optional): Add the assigned channels to the devices. Defaults to True.
+
+        Returns:
+            BatchResult: The allocations and the blocked demands, the same as the ones of `provision`.
+        """
+        network = self._network
+        demands = [Demand(*demand) for demand in demands]
+        occupancy = OccupancyMatrix(network.port_graph.export()[0])
+        indptr, indices = network.port_graph.adjacency()
+        shared = SharedArrays({"indptr": indptr, "indices": indices, "occupancy": occupancy.matrix})
+        occupancy.matrix = shared.arrays["occupancy"]
+
+        try:
+            pairs = list(dict.fromkeys((demand.tp_a, demand.tp_b) for demand in demands))
+            routes = self._routes(pairs, shared.specs)
+
+            paths = {}
+            for pair in pairs:
+                if routes[pair] is not None:
+                    forward, backward = routes[pair]
+                    path = NetworkPath(network.port_graph.ports(forward.tolist()),
+                                       network.port_graph.ports(backward.tolist()))
+                    paths[pair] = (path, occupancy.rows(path))
+
+            largest = self._map(_largest_free, [(shared.specs, rows) for _, rows in paths.values()])
+            largest_free = dict(zip(paths, largest))
+            result = assign_routes(demands, {pair: paths.get(pair) for pair in pairs}, occupancy, policy, ordering,
+                                   commit, largest_free)
+        finally:
+            # The views of the shared blocks must be gone before the blocks are released
+            occupancy.matrix = None
+            shared.close()
+        return result
+
+
+def provision_parallel(network, demands: List[Tuple[str, str, float]], policy: str = "first-fit",
+                       ordering: str = "as-given", commit: bool = True, processes: int = None) -> BatchResult:
+    """Route and assign spectrum to a batch of demands with a temporary pool of worker processes.
+
+    Args:
+        network (Network): The network to provision the demands in.
+        demands (List[Tuple[str, str, float]]): The (terminal A, terminal B, bandwidth) demands.
+        policy (str, optional): The assignment policy. Defaults to "first-fit".
+        ordering (str, optional): The order of assignment, one of ORDERINGS. Defaults to "as-given".
+        commit (bool, optional): Add the assigned channels to the devices. Defaults to True.
+        processes (int, optional): The number of worker processes. Defaults to None (the number of CPUs).
+
+    Returns:
+        BatchResult: The allocations and the blocked demands, the same as the ones of `provision`.
+    """
+    with ParallelPlanner(network, processes) as planner:
+        return planner.provision(demands, policy, ordering, commit)
@@ -1,13 +1,13 @@
 import os
 import json
-from typing import List
-from copy import deepcopy
+import math
+from typing import Dict, List, Tuple, Union
 
-import numpy as np
-from matplotlib import pyplot as plt
-
-from .device import DirectionalPort
+from . import spectrum
+from .device import Device, DirectionalPort
 from .channel import Channel, SPECTRUM
+from .intervals import ChannelConflictError
+from .metrics import instrumented
 
 MC_TEMPLATE = {
     "channel": None,
@@ -27,6 +27,45 @@ MC_TEMPLATE = {
 }
 
 
+def new_media_channel(channel_name: str) -> dict:
+    """Create an empty media channel configuration from the template.
+
+    Args:
+        channel_name (str): The name of the channel.
+
+    Returns:
+        dict: A new media channel configuration.
+    """
+    media_channel = {key: dict(value) if isinstance(value, dict) else value for key, value in MC_TEMPLATE.items()}
+    media_channel["channel"] = channel_name
+    return media_channel
+
+
+def merge_media_channel(media_channel: dict, other: dict) -> None:
+    """Merge the configuration of the same channel routed through a device by another path. This method changes the
+    media_channel dictionary in place.
+
+    Paths crossing a device in opposite directions may use the same channel, one adds it and the other drops it, so
+    both are configured by a single media channel.
+
+    Args:
+        media_channel (dict): The media channel configuration.
+        other (dict): The media channel configuration of the other path.
+
+    Returns:
+        None
+
+    Raises:
+        ChannelConflictError: If both configurations add or both drop the channel.
+    """
+    for direction in ("add", "drop"):
+        if other[direction]["port"] is not None:
+            if media_channel[direction]["port"] is not None:
+                raise ChannelConflictError(f"Channel {media_channel['channel']} has two {direction} ports")
+            media_channel[direction]["port"] = other[direction]["port"]
+    media_channel["power"].update((key, power) for key, power in other["power"].items() if power is not None)
+
+
 class NetworkPath:
     """Representation of a network path connecting two directional ports.
 
@@ -72,19 +111,97 @@ class NetworkPath:
         return list(set(all_devices))
 
     @property
+    def device_ports(self) -> Dict[Device, List[Tuple[str, str]]]:
+        """Get the (port, direction) pairs the path passes on each of its devices.
+
+        Returns:
+            Dict[Device, List[Tuple[str, str]]]: The non-terminal directional ports, indexed by their devices.
+        """
+        device_ports = {}
+        for device, port, direction in {(node.device, node.port, node.direction) for node in self.ports}:
+            device_ports.setdefault(device, []).append((port, direction))
+        return device_ports
+
+    @property
+    def occupancy_bitmap(self):
+        """Get the packed grid slot occupancy of the path.
+
+        Only the directional ports the path passes are taken into account, a channel routed through other ports
+        of the same devices does not block the path.
+
+        Returns:
+            np.ndarray: The occupancy bitmap of the path.
+        """
+        occupancy_bitmap = spectrum.empty_bitmap()
+
+        for device, ports in self.device_ports.items():
+            occupancy_bitmap |= device.port_bitmap(ports)
+
+        return occupancy_bitmap
+
+    @property
+    @instrumented("path.spectrum_occupancy")
     def spectrum_occupancy(self):
         """Get the spectrum occupancy of the path.
 
         Returns:
             np.ndarray: The spectrum occupancy of the path.
         """
-        spectrum_occupancy = np.zeros(SPECTRUM["bandwidth"], dtype=bool)
+        return spectrum.to_spectrum(self.occupancy_bitmap)
 
-        for device in self.devices:
-            spectrum_occupancy |= device.spectrum_occupancy
+    def is_free(self, lower_frequency: Union[int, float, str], upper_frequency: Union[int, float, str]) -> bool:
+        """Check if a frequency range is free on every directional port of the path.
+
+        The devices are queried through their channel indexes, no occupancy array is created. Every grid slot
+        touched by the range has to be free.
 
-        return spectrum_occupancy
+        Args:
+            lower_frequency (Union[int, float, str]): The lower frequency boundary of the range.
+            upper_frequency (Union[int, float, str]): The upper frequency boundary of the range.
+
+        Returns:
+            bool: True if no port of the path has a channel in the range, False otherwise.
+        """
+        lower_frequency, upper_frequency = Channel.convert_units(lower_frequency, upper_frequency)
+        start = math.floor((lower_frequency - SPECTRUM["lower_bound"]) / SPECTRUM["slot_width"])
+        stop = math.ceil((upper_frequency - SPECTRUM["lower_bound"]) / SPECTRUM["slot_width"])
+        return all(device.is_free(start, stop, ports) for device, ports in self.device_ports.items())
 
+    def add_channel(self, channel: Channel) -> None:
+        """Occupy the channel on every directional port of the path.
+
+        The channel is added to the ports of all devices or, if it overlaps a channel on any of them, to none.
+
+        Args:
+            channel (Channel): The channel to add.
+
+        Returns:
+            None
+
+        Raises:
+            ChannelConflictError: If the channel overlaps a channel on a port of the path.
+        """
+        device_ports = self.device_ports
+        for device, ports in device_ports.items():
+            conflicts = device.overlapping(*channel.slot_range, ports)
+            if conflicts:
+                raise ChannelConflictError(f"{channel} overlaps {conflicts[0]} on {device.name}")
+        for device, ports in device_ports.items():
+            device.add_channels([channel], ports)
+
+    def remove_channel(self, channel: Channel) -> None:
+        """Release the channel on every directional port of the path.
+
+        Args:
+            channel (Channel): The channel to remove.
+
+        Returns:
+            None
+        """
+        for device, ports in self.device_ports.items():
+            device.remove_channels([channel], ports)
+
+    @instrumented("path.generate_configuration")
     def generate_configuration(self, channel: Channel, directory: str):
         """Generate configuration files for the network path.
 
@@ -105,16 +222,28 @@ class NetworkPath:
             json.dump(channel.channel_plan, f, indent=4)
 
         # Create media channel files
-        mc_template = deepcopy(MC_TEMPLATE)
-        mc_template["channel"] = channel.name
-        device_media_channels = {device.name: {"media-channels": [deepcopy(mc_template)]} for device in self.devices}
+        device_media_channels = self.device_configurations(channel)
+        for device in self.devices:
+            with open(os.path.join(directory, f"{device.name}.json"), "w") as f:
+                json.dump(device_media_channels[device.name], f, indent=4)
+
+    def device_configurations(self, channel: Channel) -> Dict[str, dict]:
+        """Generate the media channel configuration of every device in the path.
+
+        Args:
+            channel (Channel): The channel to configure in the path.
+
+        Returns:
+            Dict[str, dict]: The media channel configuration, indexed by the device names.
+        """
+
+        device_media_channels = {device.name: {"media-channels": [new_media_channel(channel.name)]}
+                                 for device in self.devices}
 
         for port in self.ports:
             port.add_port_config(device_media_channels[port.device.name])
 
-        for device in self.devices:
-            with open(os.path.join(directory, f"{device.name}.json"), "w") as f:
-                json.dump(device_media_channels[device.name], f, indent=4)
+        return device_media_channels
 
     def visualize_occupancy(self):
         """Visualize the spectrum occupancy of the path.
@@ -122,12 +251,6 @@ class NetworkPath:
         Returns:
             None
         """
-        int_array = self.spectrum_occupancy.astype(int)
-        plt.figure(figsize=(10, 5))
-        plt.step(np.arange(len(int_array)) + SPECTRUM["lower_bound"], int_array, where='mid')
-        plt.xlabel('Frequency (GHz)')
-        plt.ylabel('Occupied (True or False)')
-        plt.title('Spectrum Occupancy')
-        plt.ylim(-0.1, 1.1)  # Set y-axis limits to show only 0 and 1 values
-        plt.grid()
-        plt.show()
+        from .plotting import plot_occupancy
+
+        plot_occupancy(self)
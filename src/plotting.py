@@ -0,0 +1,44 @@
+"""Visualization of networks and spectrum occupancy.
+
+This module is the only one importing matplotlib. It is loaded on the first call of `Network.draw` or
+`NetworkPath.visualize_occupancy`, so planning and configuration generation never pay the matplotlib startup cost
+and need no display backend.
+"""
+import numpy as np
+import networkx as nx
+from matplotlib import pyplot as plt
+
+from .channel import SPECTRUM
+
+
+def draw_network(network) -> None:
+    """Draw the device graph of a network.
+
+    Args:
+        network (Network): The network.
+
+    Returns:
+        None
+    """
+    nx.draw(network.device_graph, with_labels=True)
+    plt.show()
+
+
+def plot_occupancy(path) -> None:
+    """Plot the spectrum occupancy of a path.
+
+    Args:
+        path (NetworkPath): The path.
+
+    Returns:
+        None
+    """
+    int_array = path.spectrum_occupancy.astype(int)
+    plt.figure(figsize=(10, 5))
+    plt.step(np.arange(len(int_array)) + SPECTRUM["lower_bound"], int_array, where='mid')
+    plt.xlabel('Frequency (GHz)')
+    plt.ylabel('Occupied (True or False)')
+    plt.title('Spectrum Occupancy')
+    plt.ylim(-0.1, 1.1)  # Set y-axis limits to show only 0 and 1 values
+    plt.grid()
+    plt.show()
@@ -0,0 +1,122 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from .path import NetworkPath
+from .channel import Channel, SPECTRUM
+
+# Width of the channel launched with the reference launch power, in GHz
+REFERENCE_WIDTH = 50.0
+
+
+class PowerModel:
+    """Optical power budget of the network, stored per node of the port graph.
+
+    The power of a channel changes only at the directional ports of its path. A signal entering a device at an RX
+    port has lost the loss of the span it arrives over, a signal leaving at a TX port has lost the insertion loss
+    of the device, and the amplifier of the port, if any, adds its gain. With the gain and the incoming loss of
+    every node in two arrays, the power at every port of every path is a segmented cumulative sum, computed for
+    all channels at once.
+
+    The arrays are rebuilt automatically when the topology changes. Changed loss or gain parameters of existing
+    devices and links are picked up by `refresh`.
+    """
+
+    def __init__(self, network):
+        """Initialize a PowerModel instance.
+
+        Args:
+            network (Network): The network.
+        """
+        self._network = network
+        self._version = None
+        self._gain = np.zeros(0)
+        self._loss = np.zeros(0)
+
+    def refresh(self) -> None:
+        """Rebuild the gain and loss arrays from the devices and their links.
+
+        Returns:
+            None
+        """
+        port_graph = self._network.port_graph
+        self._gain = np.zeros(port_graph.num_nodes)
+        self._loss = np.zeros(port_graph.num_nodes)
+
+        for node in range(0, port_graph.num_nodes, 2):
+            port = port_graph.port(node)
+            device, link = port.device, port.device.links.get(port.port)
+            self._gain[node] = device.gains.get((port.port, "TX"), 0.0)
+            self._gain[node + 1] = device.gains.get((port.port, "RX"), 0.0)
+            self._loss[node] = device.insertion_loss
+            self._loss[node + 1] = link.loss if link is not None else 0.0
+
+        self._version = self._network.version
+
+    def plan(self, assignments: Sequence[Tuple[NetworkPath, Channel]], launch_power: float = 0.0) \
+            -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Compute the power of the channels at every port of their paths.
+
+        The launch power is scaled with the channel width, so that all channels have the same power spectral
+        density.
+
+        Args:
+            assignments (Sequence[Tuple[NetworkPath, Channel]]): The (path, channel) pairs.
+            launch_power (float, optional): The power of a 50 GHz channel at the first port of a path in dBm.
+                Defaults to 0.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: The power in dBm at the ports of both directions of every path.
+        """
+        if self._version != self._network.version:
+            self.refresh()
+        if not assignments:
+            return []
+
+        port_graph = self._network.port_graph
+        directions = [direction for path, _ in assignments for direction in (path.direction_1, path.direction_2)]
+        lengths = np.array([len(direction) for direction in directions])
+        nodes = np.array([port_graph.node_id(port.device, port.port, port.direction)
+                          for direction in directions for port in direction], dtype=np.int64)
+
+        # The first port of a path is where the channel is launched, nothing is lost before it
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        steps = self._gain[nodes] - self._loss[nodes]
+        steps[starts] = self._gain[nodes[starts]]
+
+        totals = np.cumsum(steps)
+        offsets = np.concatenate(([0.0], totals[starts[1:] - 1]))
+        widths = np.array([channel.num_slots for _, channel in assignments]).repeat(2) * SPECTRUM["slot_width"]
+        launch = launch_power + 10 * np.log10(widths / REFERENCE_WIDTH) - offsets
+
+        powers = np.split(totals + np.repeat(launch, lengths), starts[1:])
+        return list(zip(powers[0::2], powers[1::2]))
+
+    def apply(self, path: NetworkPath, channel: Channel, launch_power: float = 0.0) -> None:
+        """Set the power of the ports of a path for a channel, so its configuration contains the powers.
+
+        Args:
+            path (NetworkPath): The path.
+            channel (Channel): The channel.
+            launch_power (float, optional): The power of a 50 GHz channel at the first port in dBm. Defaults to 0.
+
+        Returns:
+            None
+        """
+        set_power(path, *self.plan([(path, channel)], launch_power)[0])
+
+
+def set_power(path: NetworkPath, direction_1: np.ndarray, direction_2: np.ndarray) -> None:
+    """Set the power of the ports of a path.
+
+    Args:
+        path (NetworkPath): The path.
+        direction_1 (np.ndarray): The power at the ports of the first direction in dBm.
+        direction_2 (np.ndarray): The power at the ports of the second direction in dBm.
+
+    Returns:
+        None
+    """
+    for ports, powers in ((path.direction_1, direction_1), (path.direction_2, direction_2)):
+        for port, power in zip(ports, powers.tolist()):
+            port.power = round(power, 2)
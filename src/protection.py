@@ -0,0 +1,448 @@
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from .path import NetworkPath
+from .channel import Channel
+from .device import Device
+from .routing import mirror_path, MAX_CANDIDATES
+from .provisioning import Demand
+from .assignment import assign_channel, width_to_slots
+
+DISJOINTNESS = ("link", "node")
+SHARING = ("dedicated", "shared")
+
+# A bidirectional fiber link, identified by its two (device name, port) ends in sorted order
+Link = Tuple[Tuple[str, str], Tuple[str, str]]
+
+# A channel on a directional port, identified by the device, the port, the direction and the channel
+Reservation = Tuple[Device, str, str, Channel]
+
+
+def link_key(device_a: str, port_a: str, device_b: str, port_b: str) -> Link:
+    """Get the key of a link, which is the same from both of its ends.
+
+    Args:
+        device_a (str): The name of the device on one end.
+        port_a (str): The port on that device.
+        device_b (str): The name of the device on the other end.
+        port_b (str): The port on that device.
+
+    Returns:
+        Link: The sorted pair of the (device name, port) ends.
+    """
+    return tuple(sorted(((device_a, port_a), (device_b, port_b))))
+
+
+def path_links(path: NetworkPath) -> FrozenSet[Link]:
+    """Get the links between the devices of a path in both directions.
+
+    The links connecting the terminal points to their add/drop devices are left out, a terminal point has a single
+    port, so no path can avoid them.
+
+    Args:
+        path (NetworkPath): The path.
+
+    Returns:
+        FrozenSet[Link]: The links used by the path.
+    """
+    return frozenset(link for link, terminal in _device_links(path) if not terminal)
+
+
+def access_links(path: NetworkPath) -> FrozenSet[Link]:
+    """Get the links connecting the terminal points of a path to their add/drop devices.
+
+    Args:
+        path (NetworkPath): The path.
+
+    Returns:
+        FrozenSet[Link]: The links of the terminal points, shared by every path between them.
+    """
+    return frozenset(link for link, terminal in _device_links(path) if terminal)
+
+
+def _device_links(path: NetworkPath) -> Iterator[Tuple[Link, bool]]:
+    """Generate the links between the devices of a path in both directions.
+
+    Args:
+        path (NetworkPath): The path.
+
+    Returns:
+        Iterator[Tuple[Link, bool]]: The links, each with a flag telling if it connects a terminal point.
+    """
+    for ports in (path.direction_1, path.direction_2):
+        for port, next_port in zip(ports, ports[1:]):
+            if port.device is not next_port.device:
+                yield (link_key(port.device.name, port.port, next_port.device.name, next_port.port),
+                       port.is_terminal or next_port.is_terminal)
+
+
+@dataclass(eq=False)
+class ProtectedDemand:
+    """A demand provisioned with a working path and a disjoint backup path.
+
+    Attributes:
+        demand (Demand): The demand.
+        working (NetworkPath): The working path.
+        channel (Channel): The channel occupied on the working path.
+        backup (NetworkPath): The backup path, disjoint from the working path.
+        backup_channel (Channel): The channel reserved on the backup path.
+        shared (bool): The backup channel may be shared with demands whose working paths are disjoint from this one.
+        links (FrozenSet[Link]): The links of the working path.
+        backup_links (FrozenSet[Link]): The links of the backup path.
+        access_links (FrozenSet[Link]): The links of the terminal points, used by both paths.
+        active (str): The path carrying the traffic, "working" or "backup".
+    """
+    demand: Demand
+    working: NetworkPath
+    channel: Channel
+    backup: NetworkPath
+    backup_channel: Channel
+    shared: bool
+    links: FrozenSet[Link]
+    backup_links: FrozenSet[Link]
+    access_links: FrozenSet[Link]
+    active: str = "working"
+
+
+def backup_reservations(protected: ProtectedDemand) -> List[Reservation]:
+    """Get the directional ports of the backup path of a demand together with its backup channel.
+
+    Args:
+        protected (ProtectedDemand): The demand.
+
+    Returns:
+        List[Reservation]: The (device, port, direction, backup channel) of every non-terminal backup port.
+    """
+    return [(device, port, direction, protected.backup_channel)
+            for device, ports in protected.backup.device_ports.items() for port, direction in ports]
+
+
+@dataclass
+class Restoration:
+    """A demand switched to its backup path.
+
+    Attributes:
+        protected (ProtectedDemand): The restored demand.
+        path (NetworkPath): The backup path now carrying the traffic.
+        channel (Channel): The channel of the backup path.
+    """
+    protected: ProtectedDemand
+    path: NetworkPath
+    channel: Channel
+
+
+@dataclass
+class FailureEvent:
+    """Demands affected by a link failure.
+
+    Attributes:
+        link (Link): The failed link.
+        restorations (List[Restoration]): Demands which lost their working path and were switched to the backup.
+        lost (List[ProtectedDemand]): Demands which lost the active path and could not be restored, because the
+            backup path is down as well, its shared channel carries another demand or the failed link connects
+            one of their terminal points.
+        unprotected (List[ProtectedDemand]): Demands which still run on the working path but lost their backup.
+    """
+    link: Link
+    restorations: List[Restoration] = field(default_factory=list)
+    lost: List[ProtectedDemand] = field(default_factory=list)
+    unprotected: List[ProtectedDemand] = field(default_factory=list)
+
+
+class ProtectionPlanner:
+    """Provision demands with precomputed disjoint backup paths and switch them over on link failures.
+
+    The backup path and its channel are chosen when the demand is provisioned. A dedicated backup channel is
+    occupied on the backup ports by this demand alone. A shared backup channel may be reused by demands whose
+    working paths have no link in common, as a single link failure never needs it for two of them at once.
+    Either way the reserved spectrum is held on the ports, so later demands cannot take it.
+
+    Every link is indexed with the demands routed over it, so a failure finds the affected demands and their
+    restorations with dictionary lookups, without any route search. The links of the terminal points are indexed
+    as well, but kept out of the disjointness, as both paths use them. Their failure loses the demands.
+    """
+
+    def __init__(self, network):
+        """Initialize a ProtectionPlanner instance.
+
+        Args:
+            network (Network): The network to provision the demands in.
+        """
+        self._network = network
+        self.demands: List[ProtectedDemand] = []
+
+        # Demands indexed by the links of their working and backup paths
+        self._working: Dict[Link, Dict[int, ProtectedDemand]] = {}
+        self._backup: Dict[Link, Dict[int, ProtectedDemand]] = {}
+
+        # Demands sharing a backup channel on a directional port, and the demand using it after a failure
+        self._reservations: Dict[Reservation, Dict[int, ProtectedDemand]] = {}
+        self._active: Dict[Reservation, ProtectedDemand] = {}
+
+        # Failed links with their loss, so they can be repaired
+        self.failed: Dict[Link, float] = {}
+
+    def provision(self, tp_a: str, tp_b: str, bandwidth: float, policy: str = "first-fit",
+                  disjoint: str = "link", sharing: str = "dedicated",
+                  k: Optional[int] = MAX_CANDIDATES) -> Optional[ProtectedDemand]:
+        """Provision a demand with a working path and a disjoint backup path.
+
+        The candidate working paths are tried in the order of increasing length, each with the shortest disjoint
+        backup path, until both paths have free spectrum.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+            bandwidth (float): The requested channel width in GHz.
+            policy (str, optional): The spectrum assignment policy. Defaults to "first-fit".
+            disjoint (str, optional): The backup path avoids the links ("link") or also the devices ("node") of the
+                working path, except the add/drop devices of the terminal points. Defaults to "link".
+            sharing (str, optional): Reserve a "dedicated" or a "shared" backup channel. Defaults to "dedicated".
+            k (Optional[int], optional): The maximal number of working paths to try, None for all simple paths.
+                Defaults to MAX_CANDIDATES.
+
+        Returns:
+            Optional[ProtectedDemand]: The provisioned demand, None if no working path has a disjoint backup path
+                with free spectrum.
+        """
+        assert disjoint in DISJOINTNESS, f"Invalid disjointness: {disjoint}"
+        assert sharing in SHARING, f"Invalid sharing: {sharing}"
+
+        for working in self._network.k_shortest_paths(tp_a, tp_b, k):
+            channel = assign_channel(working, bandwidth, policy)
+            if channel is None:
+                continue
+
+            links = path_links(working)
+            backup = self._backup_path(tp_a, tp_b, working, links, disjoint)
+            if backup is None:
+                continue
+
+            # The working channel is added first, the backup must avoid it on the ports shared by both paths
+            working.add_channel(channel)
+            if sharing == "shared":
+                backup_channel = self._shared_channel(backup, links, bandwidth, policy)
+            else:
+                backup_channel = assign_channel(backup, bandwidth, policy)
+            if backup_channel is None:
+                working.remove_channel(channel)
+                continue
+
+            protected = ProtectedDemand(Demand(tp_a, tp_b, bandwidth), working, channel, backup, backup_channel,
+                                        sharing == "shared", links, path_links(backup), access_links(working))
+            self._reserve(protected)
+            return protected
+        return None
+
+    def _backup_path(self, tp_a: str, tp_b: str, working: NetworkPath, links: FrozenSet[Link],
+                     disjoint: str) -> Optional[NetworkPath]:
+        """Find the shortest path avoiding the links or the devices of a working path.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+            working (NetworkPath): The working path.
+            links (FrozenSet[Link]): The links of the working path.
+            disjoint (str): "link" or "node".
+
+        Returns:
+            Optional[NetworkPath]: The backup path, its second direction uses the same links as the first one.
+                None if there is no disjoint path.
+        """
+        network = self._network
+        port_graph = network.port_graph
+
+        # Every port holds a single link, so blocking the receiving ports on both ends blocks the whole link
+        blocked = {port_graph.node_id(network.devices[name], port, "RX") for link in links for name, port in link}
+        if disjoint == "node":
+            ends = {working.direction_1[1].device, working.direction_1[-2].device}
+            for device in working.devices:
+                if device not in ends:
+                    blocked.update(port_graph.node_id(device, port, direction)
+                                   for port in device.links for direction in ("TX", "RX"))
+        blocked.discard(None)
+
+        source = port_graph.node_id(network.devices[tp_a], 'C', "TX")
+        target = port_graph.node_id(network.devices[tp_b], 'C', "RX")
+        nodes = port_graph.shortest_path(source, target, blocked_nodes=blocked)
+        if nodes is None:
+            return None
+        return NetworkPath(port_graph.ports(nodes), port_graph.ports(mirror_path(nodes)))
+
+    def _shared_channel(self, backup: NetworkPath, links: FrozenSet[Link], bandwidth: float,
+                        policy: str) -> Optional[Channel]:
+        """Find a backup channel, reusing a shared reservation when possible.
+
+        A reserved channel can be reused if, on every directional port of the backup path, it is either free or
+        reserved only by shared backups of demands whose working paths have no link in common with the new one.
+
+        Args:
+            backup (NetworkPath): The backup path.
+            links (FrozenSet[Link]): The links of the working path.
+            bandwidth (float): The requested channel width in GHz.
+            policy (str): The spectrum assignment policy for a new reservation.
+
+        Returns:
+            Optional[Channel]: The backup channel, None if the backup path has no free spectrum.
+        """
+        num_slots = width_to_slots(bandwidth)
+        ports = [(device, port, direction) for device, device_ports in backup.device_ports.items()
+                 for port, direction in device_ports]
+
+        def shareable(device: Device, port: str, direction: str, channel: Channel) -> bool:
+            sharers = self._reservations.get((device, port, direction, channel))
+            if sharers is None:
+                return device.is_free(*channel.slot_range, [(port, direction)])
+            return all(protected.shared and links.isdisjoint(protected.links) for protected in sharers.values())
+
+        candidates = {channel for device, port, direction in ports
+                      for channel in device.port_intervals.get((port, direction), ())
+                      if channel.num_slots == num_slots and (device, port, direction, channel) in self._reservations}
+        for channel in sorted(candidates, key=lambda channel: channel.start_slot):
+            if all(shareable(*key, channel) for key in ports):
+                return channel
+        return assign_channel(backup, bandwidth, policy)
+
+    def _reserve(self, protected: ProtectedDemand) -> None:
+        """Occupy the backup channel and index the links of a new protected demand.
+
+        Args:
+            protected (ProtectedDemand): The demand, with its working channel already occupied.
+
+        Returns:
+            None
+        """
+        added: Dict[Device, List[Tuple[str, str]]] = {}
+        for key in backup_reservations(protected):
+            if key not in self._reservations:
+                added.setdefault(key[0], []).append(key[1:3])
+                self._reservations[key] = {}
+            self._reservations[key][id(protected)] = protected
+        for device, ports in added.items():
+            device.add_channels([protected.backup_channel], ports)
+
+        for link in protected.links | protected.access_links:
+            self._working.setdefault(link, {})[id(protected)] = protected
+        for link in protected.backup_links | protected.access_links:
+            self._backup.setdefault(link, {})[id(protected)] = protected
+        self.demands.append(protected)
+
+    def release(self, protected: ProtectedDemand) -> None:
+        """Remove a protected demand and free its working and backup channels.
+
+        Args:
+            protected (ProtectedDemand): The demand.
+
+        Returns:
+            None
+        """
+        protected.working.remove_channel(protected.channel)
+        removed: Dict[Device, List[Tuple[str, str]]] = {}
+        for key in backup_reservations(protected):
+            if self._active.get(key) is protected:
+                del self._active[key]
+            sharers = self._reservations[key]
+            del sharers[id(protected)]
+            if not sharers:
+                del self._reservations[key]
+                removed.setdefault(key[0], []).append(key[1:3])
+        for device, ports in removed.items():
+            device.remove_channels([protected.backup_channel], ports)
+
+        for link in protected.links | protected.access_links:
+            del self._working[link][id(protected)]
+        for link in protected.backup_links | protected.access_links:
+            del self._backup[link][id(protected)]
+        self.demands.remove(protected)
+
+    def fail_link(self, device: str, port: str) -> FailureEvent:
+        """Take a link down and switch the affected demands to their backup paths.
+
+        The link is removed from the network, which updates the port graph and the route table incrementally. The
+        affected demands are looked up in the link index, and each of them is switched to its precomputed backup
+        path if the backup is up and its channel is not carrying another demand. The channels are not moved, the
+        backup channel is already occupied on the backup ports.
+
+        Args:
+            device (str): The name of the device on either end of the link.
+            port (str): The port of the link on the device.
+
+        Returns:
+            FailureEvent: The restored, lost and unprotected demands.
+        """
+        neighbor = self._network.devices[device].links[port]
+        assert neighbor is not None, f"No link at {device}:{port}"
+        link = link_key(device, port, neighbor.device.name, neighbor.device_port)
+        self.failed[link] = neighbor.loss
+        self._network.remove_bidi_link(device, port)
+
+        event = FailureEvent(link)
+        for protected in self._working.get(link, {}).values():
+            if link in protected.access_links:
+                event.lost.append(protected)  # Both paths start or end on the failed link
+            elif protected.active == "working" and self._activate(protected):
+                event.restorations.append(Restoration(protected, protected.backup, protected.backup_channel))
+            elif protected.active == "working":
+                event.lost.append(protected)
+        for protected in self._backup.get(link, {}).values():
+            if link in protected.access_links:
+                continue
+            if protected.active == "backup":
+                event.lost.append(protected)
+            elif self.failed.keys().isdisjoint(protected.links):
+                event.unprotected.append(protected)
+        return event
+
+    def _activate(self, protected: ProtectedDemand) -> bool:
+        """Switch a demand to its backup path if the path is up and its channel is not used by another demand.
+
+        Args:
+            protected (ProtectedDemand): The demand.
+
+        Returns:
+            bool: True if the demand was switched, False otherwise.
+        """
+        if not self.failed.keys().isdisjoint(protected.backup_links | protected.access_links):
+            return False
+        keys = backup_reservations(protected)
+        if any(self._active.get(key, protected) is not protected for key in keys):
+            return False
+
+        for key in keys:
+            self._active[key] = protected
+        protected.active = "backup"
+        return True
+
+    def repair_link(self, device: str, port: str, neighbor: str, neighbor_port: str) -> None:
+        """Bring a failed link up again.
+
+        The demands stay on their backup paths until they are reverted.
+
+        Args:
+            device (str): The name of the device on one end of the link.
+            port (str): The port of the link on the device.
+            neighbor (str): The name of the device on the other end.
+            neighbor_port (str): The port of the link on that device.
+
+        Returns:
+            None
+        """
+        loss = self.failed.pop(link_key(device, port, neighbor, neighbor_port))
+        self._network.add_bidi_link(device, port, neighbor, neighbor_port, loss)
+
+    def revert(self, protected: ProtectedDemand) -> bool:
+        """Switch a demand back to its working path once all its links are up.
+
+        Args:
+            protected (ProtectedDemand): The demand.
+
+        Returns:
+            bool: True if the demand runs on the working path, False if the working path is still down.
+        """
+        if not self.failed.keys().isdisjoint(protected.links | protected.access_links):
+            return False
+        if protected.active == "backup":
+            for key in backup_reservations(protected):
+                del self._active[key]
+            protected.active = "working"
+        return True
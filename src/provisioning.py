@@ -0,0 +1,279 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from . import spectrum
+from .path import NetworkPath
+from .device import Device
+from .channel import Channel
+from .assignment import width_to_slots, find_free_slots, slots_to_channel
+
+ORDERINGS = ("as-given", "longest-first", "widest-first")
+
+
+@dataclass
+class Demand:
+    """A connection demand between two terminal points.
+
+    Attributes:
+        tp_a (str): The name of the first terminal point.
+        tp_b (str): The name of the second terminal point.
+        bandwidth (float): The requested channel width in GHz.
+    """
+    tp_a: str
+    tp_b: str
+    bandwidth: float
+
+
+@dataclass
+class Allocation:
+    """A provisioned demand.
+
+    Attributes:
+        demand (Demand): The provisioned demand.
+        path (NetworkPath): The path connecting the terminal points.
+        channel (Channel): The channel assigned on the path.
+    """
+    demand: Demand
+    path: NetworkPath
+    channel: Channel
+
+
+@dataclass
+class BatchResult:
+    """Result of a batch provisioning.
+
+    Attributes:
+        allocations (List[Allocation]): The provisioned demands, in the input order.
+        blocked (List[Demand]): The demands without a route or free spectrum, in the input order.
+    """
+    allocations: List[Allocation] = field(default_factory=list)
+    blocked: List[Demand] = field(default_factory=list)
+
+
+class OccupancyMatrix:
+    """Occupancy of the grid slots of all directional ports in a single bitmap matrix.
+
+    Port ``i`` of the port list has the rows ``2 * i`` for TX and ``2 * i + 1`` for RX, the same numbering as the
+    nodes of the port graph. Every row holds the channels routed through its port together with the channels of
+    the whole device, so paths crossing a device on disjoint ports do not block each other.
+
+    Attributes:
+        index (Dict[Tuple[Device, str], int]): Position of each (device, port) in the port list.
+        matrix (np.ndarray): The (2 * ports, words) matrix of the occupancy bitmaps.
+    """
+
+    def __init__(self, ports: List[Tuple[Device, str]]):
+        """Initialize the matrix from the current channels of the devices.
+
+        Args:
+            ports (List[Tuple[Device, str]]): The (device, port) pairs, e.g. `network.port_graph.export()[0]`.
+        """
+        self.index = {key: i for i, key in enumerate(ports)}
+        bitmaps = [device.device_bitmap for device, _ in ports]
+        self.matrix = np.stack(bitmaps).repeat(2, axis=0) if bitmaps \
+            else np.zeros((0, spectrum.NUM_WORDS), dtype=np.uint64)
+        for i, (device, port) in enumerate(ports):
+            if device.port_bitmaps:
+                for row, direction in enumerate(("TX", "RX"), 2 * i):
+                    port_bitmap = device.port_bitmaps.get((port, direction))
+                    if port_bitmap is not None:
+                        self.matrix[row] |= port_bitmap
+
+    def refresh(self, devices: Iterable[Device]) -> None:
+        """Reload the rows of all ports of some devices from their current channels.
+
+        Args:
+            devices (Iterable[Device]): The devices.
+
+        Returns:
+            None
+        """
+        for device in devices:
+            for port in device.links:
+                i = self.index.get((device, port))
+                if i is not None:
+                    self.matrix[2 * i:2 * i + 2] = device.device_bitmap
+                    for row, direction in enumerate(("TX", "RX"), 2 * i):
+                        port_bitmap = device.port_bitmaps.get((port, direction))
+                        if port_bitmap is not None:
+                            self.matrix[row] |= port_bitmap
+
+    @classmethod
+    def from_devices(cls, devices: Iterable[Device]) -> "OccupancyMatrix":
+        """Create the matrix of all linked ports of some devices.
+
+        Args:
+            devices (Iterable[Device]): The devices.
+
+        Returns:
+            OccupancyMatrix: The occupancy of the linked ports.
+        """
+        return cls([(device, port) for device in devices for port, info in device.links.items() if info is not None])
+
+    def rows(self, path: NetworkPath) -> np.ndarray:
+        """Get the rows of the directional ports whose spectrum a channel on a path occupies.
+
+        Args:
+            path (NetworkPath): The path.
+
+        Returns:
+            np.ndarray: The row indices of the non-terminal path ports and of the ports their signal reaches.
+        """
+        rows = set()
+        for device, ports in path.device_ports.items():
+            for port, direction in device.spectrum_ports(ports):
+                i = self.index.get((device, port))
+                if i is not None:
+                    rows.add(2 * i + (direction == "RX"))
+        return np.array(sorted(rows), dtype=np.intp)
+
+    def find(self, rows: np.ndarray, num_slots: int, policy: str) -> Optional[int]:
+        """Find a range of slots free on all the given rows.
+
+        Args:
+            rows (np.ndarray): The row indices of the ports.
+            num_slots (int): The number of contiguous slots requested.
+            policy (str): The assignment policy.
+
+        Returns:
+            Optional[int]: The first slot of the range, None if there is no free range wide enough.
+        """
+        return find_free_slots(spectrum.to_slots(np.bitwise_or.reduce(self.matrix[rows])), num_slots, policy)
+
+    def occupy(self, rows: np.ndarray, start: int, num_slots: int) -> None:
+        """Mark a range of slots as occupied on the given rows.
+
+        Args:
+            rows (np.ndarray): The row indices of the ports.
+            start (int): The first slot of the range.
+            num_slots (int): The number of slots of the range.
+
+        Returns:
+            None
+        """
+        mask = spectrum.empty_bitmap()
+        spectrum.set_range(mask, start, start + num_slots)
+        self.matrix[rows] |= mask
+
+    def release(self, rows: np.ndarray, start: int, num_slots: int) -> None:
+        """Mark a range of slots as free on the given rows.
+
+        Args:
+            rows (np.ndarray): The row indices of the ports.
+            start (int): The first slot of the range.
+            num_slots (int): The number of slots of the range.
+
+        Returns:
+            None
+        """
+        mask = spectrum.empty_bitmap()
+        spectrum.set_range(mask, start, start + num_slots)
+        self.matrix[rows] &= ~mask
+
+
+def provision(network, demands: List[Tuple[str, str, float]], policy: str = "first-fit",
+              ordering: str = "as-given", commit: bool = True) -> BatchResult:
+    """Route and assign spectrum to a batch of demands.
+
+    All demands are routed first, each terminal point pair only once. Spectrum is then assigned in the order
+    given by the ordering heuristic on a shared occupancy matrix. Demands between unknown or unconnected terminal
+    points are blocked.
+
+    Args:
+        network (Network): The network to provision the demands in.
+        demands (List[Tuple[str, str, float]]): The (terminal A, terminal B, bandwidth) demands.
+        policy (str, optional): The assignment policy. Defaults to "first-fit".
+        ordering (str, optional): The order of assignment, one of ORDERINGS. Defaults to "as-given".
+        commit (bool, optional): Add the assigned channels to the devices. Defaults to True.
+
+    Returns:
+        BatchResult: The allocations and the blocked demands.
+
+    Raises:
+        AssertionError: If a demand has an invalid width, before any channel is assigned.
+    """
+    assert ordering in ORDERINGS, f"Invalid ordering: {ordering}"
+
+    demands = [Demand(*demand) for demand in demands]
+    occupancy = OccupancyMatrix(network.port_graph.export()[0])
+
+    routes: Dict[Tuple[str, str], Optional[Tuple[NetworkPath, np.ndarray]]] = {}
+    for demand in demands:
+        key = (demand.tp_a, demand.tp_b)
+        if key not in routes:
+            try:
+                path = network.shortest_path(*key)
+                routes[key] = (path, occupancy.rows(path))
+            except (nx.NetworkXNoPath, nx.NodeNotFound, KeyError):
+                routes[key] = None
+
+    return assign_routes(demands, routes, occupancy, policy, ordering, commit)
+
+
+def assign_routes(demands: List[Demand], routes: Dict[Tuple[str, str], Optional[Tuple[NetworkPath, np.ndarray]]],
+                  occupancy: OccupancyMatrix, policy: str = "first-fit", ordering: str = "as-given",
+                  commit: bool = True, largest_free: Dict[Tuple[str, str], int] = None) -> BatchResult:
+    """Assign spectrum to routed demands one by one, in the order given by the ordering heuristic.
+
+    Args:
+        demands (List[Demand]): The demands.
+        routes (Dict[Tuple[str, str], Optional[Tuple[NetworkPath, np.ndarray]]]): The path and the occupancy rows
+            of every (terminal A, terminal B) pair, None for unroutable pairs.
+        occupancy (OccupancyMatrix): The occupancy of the ports, updated with the assigned channels.
+        policy (str, optional): The assignment policy. Defaults to "first-fit".
+        ordering (str, optional): The order of assignment, one of ORDERINGS. Defaults to "as-given".
+        commit (bool, optional): Add the assigned channels to the devices. Defaults to True.
+        largest_free (Dict[Tuple[str, str], int], optional): The largest free block of every pair's path before
+            the assignment. The occupancy only grows during the assignment, so demands wider than it are blocked
+            without a search. Defaults to None.
+
+    Returns:
+        BatchResult: The allocations and the blocked demands.
+
+    Raises:
+        AssertionError: If a demand has an invalid width, before any channel is assigned.
+    """
+    assert ordering in ORDERINGS, f"Invalid ordering: {ordering}"
+    widths = [width_to_slots(demand.bandwidth) for demand in demands]
+
+    def hop_count(demand: Demand) -> int:
+        route = routes[demand.tp_a, demand.tp_b]
+        return len(route[0].direction_1) if route is not None else 0
+
+    order = list(range(len(demands)))
+    if ordering == "longest-first":
+        order.sort(key=lambda i: -hop_count(demands[i]))
+    elif ordering == "widest-first":
+        order.sort(key=lambda i: -demands[i].bandwidth)
+
+    assigned: Dict[int, Allocation] = {}
+    for i in order:
+        demand = demands[i]
+        route = routes[demand.tp_a, demand.tp_b]
+        if route is None:
+            continue
+
+        path, rows = route
+        num_slots = widths[i]
+        if largest_free is not None and num_slots > largest_free[demand.tp_a, demand.tp_b]:
+            continue
+        start = occupancy.find(rows, num_slots, policy)
+        if start is None:
+            continue
+
+        occupancy.occupy(rows, start, num_slots)
+        channel = slots_to_channel(start, num_slots)
+        if commit:
+            path.add_channel(channel)
+        assigned[i] = Allocation(demand, path, channel)
+
+    result = BatchResult()
+    for i, demand in enumerate(demands):
+        if i in assigned:
+            result.allocations.append(assigned[i])
+        else:
+            result.blocked.append(demand)
+    return result
@@ -0,0 +1,621 @@
+import ssl
+import json
+import time
+import base64
+import asyncio
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from .path import NetworkPath
+from .channel import Channel
+
+RESTCONF_MODULE = "czechlight-roadm-device"
+DATA_RESOURCE = "/restconf/data"
+CONTENT_TYPE = "application/yang-data+json"
+PATCH_CONTENT_TYPE = "application/yang-patch+json"
+
+# Keys of the YANG lists in the pushed data, used to merge list entries
+LIST_KEYS = ("channel", "name")
+
+
+def media_channel_config(media_channel: dict) -> dict:
+    """Get the configuration of a generated media channel.
+
+    The `power` container is operational data (config false) and is left out, as are the `add` and `drop`
+    presence containers without a port.
+
+    Args:
+        media_channel (dict): The generated media channel.
+
+    Returns:
+        dict: The configured media channel.
+    """
+    media_channel = {key: value for key, value in media_channel.items() if key != "power"}
+    for direction in ("add", "drop"):
+        if media_channel.get(direction, {}).get("port") is None:
+            media_channel.pop(direction, None)
+    return media_channel
+
+
+def restconf_payload(device_config: dict, channel_plan: dict) -> dict:
+    """Build the RESTCONF payload of a device from its generated configuration.
+
+    Args:
+        device_config (dict): The media channel configuration of the device.
+        channel_plan (dict): The channel plan of the configured channels.
+
+    Returns:
+        dict: The module-qualified payload with the channel plan and the media channels.
+    """
+    return {
+        f"{RESTCONF_MODULE}:channel-plan": channel_plan["channel-plan"],
+        f"{RESTCONF_MODULE}:media-channels": [media_channel_config(media_channel)
+                                               for media_channel in device_config["media-channels"]],
+    }
+
+
+@dataclass
+class Response:
+    """An HTTP response.
+
+    Attributes:
+        status (int): The status code.
+        headers (Dict[str, str]): The headers with lowercase names.
+        body (bytes): The body.
+    """
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+async def read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+    """Read HTTP headers up to the empty line.
+
+    Args:
+        reader (asyncio.StreamReader): The connection reader.
+
+    Returns:
+        Dict[str, str]: The headers with lowercase names.
+    """
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    """Read an HTTP body with a known length or in the chunked transfer encoding.
+
+    Args:
+        reader (asyncio.StreamReader): The connection reader.
+        headers (Dict[str, str]): The headers of the message.
+
+    Returns:
+        bytes: The body.
+    """
+    if headers.get("transfer-encoding", "").lower() != "chunked":
+        return await reader.readexactly(int(headers.get("content-length", 0)))
+
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if size == 0:
+            await read_headers(reader)  # Trailers
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single device.
+
+    Attributes:
+        host (str): The host of the device.
+        port (int): The port of the device.
+        opened (int): The number of connections opened so far.
+    """
+
+    def __init__(self, url: str, size: int = 2, ssl_context: ssl.SSLContext = None):
+        """Initialize a ConnectionPool instance.
+
+        Args:
+            url (str): The base URL of the device, e.g. "https://10.0.0.1".
+            size (int, optional): The maximal number of concurrent connections. Defaults to 2.
+            ssl_context (ssl.SSLContext, optional): The TLS context for https URLs. Defaults to None (system
+                defaults).
+        """
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if secure else 80)
+        self.opened = 0
+        self._prefix = parts.path.rstrip("/")
+        self._ssl = (ssl_context or ssl.create_default_context()) if secure else None
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers: Dict[str, str] = None) -> Response:
+        """Send a request over an idle connection, opening a new one if there is none.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the resource.
+            body (bytes, optional): The request body. Defaults to b"".
+            headers (Dict[str, str], optional): Additional request headers. Defaults to None.
+
+        Returns:
+            Response: The response of the device.
+        """
+        async with self._slots:
+            if self._idle:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+                self.opened += 1
+
+            lines = [f"{method} {self._prefix}{path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                     f"Content-Length: {len(body)}", "Connection: keep-alive"]
+            lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+
+            try:
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+                await writer.drain()
+                status_line = await reader.readline()
+                if not status_line:
+                    raise ConnectionResetError("Connection closed by the device")
+                response_headers = await read_headers(reader)
+                response = Response(int(status_line.split()[1]), response_headers,
+                                    await read_body(reader, response_headers))
+            except BaseException:
+                writer.close()
+                raise
+
+            if response.headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return response
+
+    async def close(self) -> None:
+        """Close all idle connections.
+
+        Returns:
+            None
+        """
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+@dataclass
+class PushResult:
+    """Outcome of a configuration push to a single device.
+
+    Attributes:
+        device (str): The name of the device.
+        status (Optional[int]): The HTTP status of the last attempt, None if no response was received.
+        attempts (int): The number of attempts.
+        elapsed (float): The time spent on the device including retries, in seconds.
+        error (Optional[str]): The reason of the failure, None on success.
+    """
+    device: str
+    status: Optional[int]
+    attempts: int
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Check if the configuration was accepted.
+
+        Returns:
+            bool: True if the device responded with a success status, False otherwise.
+        """
+        return self.error is None
+
+
+class RestconfPusher:
+    """Concurrent RESTCONF configuration push to many devices.
+
+    Every device gets a single PATCH of the datastore resource with its channel plan and media channels. All
+    devices are configured in parallel over pooled keep-alive connections, so a path is configured in about one
+    round trip time instead of one per device. Failed attempts (connection errors, timeouts, malformed and 5xx
+    responses) are retried with exponential backoff.
+
+    Attributes:
+        addresses (Dict[str, str]): The base URL of every device, indexed by the device names.
+    """
+
+    def __init__(self, addresses: Dict[str, str], max_concurrency: int = 64, connections_per_device: int = 2,
+                 timeout: float = 10.0, retries: int = 2, backoff: float = 0.1, auth: Tuple[str, str] = None,
+                 ssl_context: ssl.SSLContext = None):
+        """Initialize a RestconfPusher instance.
+
+        Args:
+            addresses (Dict[str, str]): The base URL of every device, indexed by the device names.
+            max_concurrency (int, optional): The maximal number of requests in flight. Defaults to 64.
+            connections_per_device (int, optional): The size of the connection pool of a device. Defaults to 2.
+            timeout (float, optional): The timeout of a single attempt in seconds. Defaults to 10.0.
+            retries (int, optional): The number of retries after a failed attempt. Defaults to 2.
+            backoff (float, optional): The delay before the first retry in seconds. Defaults to 0.1.
+            auth (Tuple[str, str], optional): The user name and password for basic authentication.
+                Defaults to None.
+            ssl_context (ssl.SSLContext, optional): The TLS context for https URLs. Defaults to None.
+        """
+        self.addresses = addresses
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._connections_per_device = connections_per_device
+        self._ssl_context = ssl_context
+        self._max_concurrency = max_concurrency
+        self._concurrency: Optional[asyncio.Semaphore] = None
+        self._pools: Dict[str, ConnectionPool] = {}
+
+        self._headers = {"Content-Type": CONTENT_TYPE, "Accept": CONTENT_TYPE}
+        if auth is not None:
+            credentials = base64.b64encode(f"{auth[0]}:{auth[1]}".encode()).decode()
+            self._headers["Authorization"] = f"Basic {credentials}"
+
+    def pool(self, device: str) -> ConnectionPool:
+        """Get the connection pool of a device.
+
+        Args:
+            device (str): The name of the device.
+
+        Returns:
+            ConnectionPool: The connection pool.
+        """
+        if device not in self._pools:
+            self._pools[device] = ConnectionPool(self.addresses[device], self._connections_per_device,
+                                                 self._ssl_context)
+        return self._pools[device]
+
+    async def push(self, payloads: Dict[str, dict]) -> Dict[str, PushResult]:
+        """Push payloads to devices in parallel.
+
+        Args:
+            payloads (Dict[str, dict]): The RESTCONF payload of every device, indexed by the device names.
+
+        Returns:
+            Dict[str, PushResult]: The outcome of every push, indexed by the device names.
+        """
+        if self._concurrency is None:
+            self._concurrency = asyncio.Semaphore(self._max_concurrency)
+
+        results = await asyncio.gather(*(self._push_device(device, payload) for device, payload in payloads.items()))
+        return {result.device: result for result in results}
+
+    async def push_patches(self, patches: Dict[str, dict]) -> Dict[str, PushResult]:
+        """Push YANG Patch (RFC 8072) documents to devices in parallel.
+
+        Args:
+            patches (Dict[str, dict]): The YANG Patch of every device, indexed by the device names.
+
+        Returns:
+            Dict[str, PushResult]: The outcome of every push, indexed by the device names.
+        """
+        if self._concurrency is None:
+            self._concurrency = asyncio.Semaphore(self._max_concurrency)
+
+        results = await asyncio.gather(*(self._push_device(device, patch, PATCH_CONTENT_TYPE)
+                                         for device, patch in patches.items()))
+        return {result.device: result for result in results}
+
+    async def push_path(self, path: NetworkPath, channel: Channel) -> Dict[str, PushResult]:
+        """Push the configuration of a channel to all devices of a path.
+
+        Args:
+            path (NetworkPath): The path to configure.
+            channel (Channel): The channel to configure in the path.
+
+        Returns:
+            Dict[str, PushResult]: The outcome of every push, indexed by the device names.
+        """
+        channel_plan = channel.channel_plan
+        return await self.push({device: restconf_payload(config, channel_plan)
+                                for device, config in path.device_configurations(channel).items()})
+
+    async def _push_device(self, device: str, payload: dict, content_type: str = CONTENT_TYPE) -> PushResult:
+        """Push a payload to a single device, retrying failed attempts.
+
+        Args:
+            device (str): The name of the device.
+            payload (dict): The RESTCONF payload.
+            content_type (str, optional): The media type of the payload. Defaults to CONTENT_TYPE.
+
+        Returns:
+            PushResult: The outcome of the push.
+        """
+        body = json.dumps(payload).encode()
+        headers = {**self._headers, "Content-Type": content_type}
+        start = time.perf_counter()
+        status, error = None, None
+
+        for attempt in range(1, self.retries + 2):
+            try:
+                async with self._concurrency:
+                    response = await asyncio.wait_for(
+                        self.pool(device).request("PATCH", DATA_RESOURCE, body, headers), self.timeout)
+                status = response.status
+                if status < 300:
+                    return PushResult(device, status, attempt, time.perf_counter() - start)
+                error = f"HTTP {status}: {response.body.decode(errors='replace')}"
+                if status < 500:
+                    break
+            except (OSError, EOFError, asyncio.TimeoutError) as e:
+                status, error = None, f"{type(e).__name__}: {e}"
+            except (ValueError, IndexError) as e:
+                # A malformed status line or header, the connection was closed by the pool
+                status, error = None, f"Invalid response: {type(e).__name__}: {e}"
+
+            if attempt <= self.retries:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+        return PushResult(device, status, attempt, time.perf_counter() - start, error)
+
+    async def close(self) -> None:
+        """Close all pooled connections.
+
+        Returns:
+            None
+        """
+        for pool in self._pools.values():
+            await pool.close()
+
+    async def __aenter__(self) -> "RestconfPusher":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+def push_configuration(path: NetworkPath, channel: Channel, addresses: Dict[str, str], **options) \
+        -> Dict[str, PushResult]:
+    """Push the configuration of a channel to all devices of a path from synchronous code.
+
+    Args:
+        path (NetworkPath): The path to configure.
+        channel (Channel): The channel to configure in the path.
+        addresses (Dict[str, str]): The base URL of every device, indexed by the device names.
+        **options: Options of the RestconfPusher.
+
+    Returns:
+        Dict[str, PushResult]: The outcome of every push, indexed by the device names.
+    """
+
+    async def run():
+        async with RestconfPusher(addresses, **options) as pusher:
+            return await pusher.push_path(path, channel)
+
+    return asyncio.run(run())
+
+
+def _merge(target: dict, source: dict) -> None:
+    """Merge data into a datastore, matching list entries by their keys. The target is changed in place.
+
+    Args:
+        target (dict): The datastore.
+        source (dict): The merged data.
+
+    Returns:
+        None
+    """
+    for name, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(name), dict):
+            _merge(target[name], value)
+        elif isinstance(value, list) and isinstance(target.get(name), list):
+            for entry in value:
+                key = next((key for key in LIST_KEYS if isinstance(entry, dict) and key in entry), None)
+                existing = next((item for item in target[name]
+                                 if key is not None and isinstance(item, dict) and item.get(key) == entry[key]), None)
+                if existing is not None:
+                    _merge(existing, entry)
+                else:
+                    target[name].append(entry)
+        else:
+            target[name] = value
+
+
+class MockRestconfServer:
+    """Local stand-in for the RESTCONF server of a device, for tests and latency benchmarks.
+
+    The server merges PATCH and POST data into an in-memory datastore, replaces it on PUT and returns it on GET.
+    PATCH requests with the YANG Patch media type apply their edits in order. Every response is delayed by a
+    configurable latency, and the first requests can be made to fail.
+
+    Attributes:
+        datastore (dict): The configuration received so far.
+        requests (int): The number of requests served.
+        connections (int): The number of accepted connections.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, failures: int = 0):
+        """Initialize a MockRestconfServer instance.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The port to listen on. Defaults to 0 (any free port).
+            latency (float, optional): The delay of every response in seconds. Defaults to 0.0.
+            failures (int, optional): The number of first requests answered with 503. Defaults to 0.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failures = failures
+        self.datastore = {}
+        self.requests = 0
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        """Get the base URL of the server.
+
+        Returns:
+            str: The base URL.
+        """
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """Start listening.
+
+        Returns:
+            None
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop listening and close the server.
+
+        Returns:
+            None
+        """
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "MockRestconfServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests of a single keep-alive connection.
+
+        Args:
+            reader (asyncio.StreamReader): The connection reader.
+            writer (asyncio.StreamWriter): The connection writer.
+
+        Returns:
+            None
+        """
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = await read_headers(reader)
+                body = await read_body(reader, headers)
+
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                status, response_body = self._respond(method, target, body, headers.get("content-type", ""))
+                writer.write((f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                              f"Content-Type: {CONTENT_TYPE}\r\n"
+                              f"Content-Length: {len(response_body)}\r\n\r\n").encode("latin-1") + response_body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method: str, target: str, body: bytes, content_type: str = CONTENT_TYPE) -> Tuple[int, bytes]:
+        """Apply a request to the datastore.
+
+        Args:
+            method (str): The HTTP method.
+            target (str): The request target.
+            body (bytes): The request body.
+            content_type (str, optional): The media type of the body. Defaults to CONTENT_TYPE.
+
+        Returns:
+            Tuple[int, bytes]: The response status and body.
+        """
+        if self.failures > 0:
+            self.failures -= 1
+            return 503, b""
+        if target.rstrip("/") != DATA_RESOURCE:
+            return 404, b""
+
+        if method == "GET":
+            return 200, json.dumps(self.datastore).encode()
+        if method not in ("PATCH", "POST", "PUT"):
+            return 405, b""
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, b""
+
+        if method == "PATCH" and content_type == PATCH_CONTENT_TYPE:
+            return self._apply_patch(data["ietf-yang-patch:yang-patch"])
+        if method == "PUT":
+            self.datastore = data
+        else:
+            _merge(self.datastore, data)
+        return 204, b""
+
+    def _apply_patch(self, patch: dict) -> Tuple[int, bytes]:
+        """Apply the edits of a YANG Patch to the datastore.
+
+        Edits target list entries, e.g. "/module:container/list=key". The edits are applied to a copy of the
+        datastore, which replaces it only if all of them succeed.
+
+        Args:
+            patch (dict): The YANG Patch.
+
+        Returns:
+            Tuple[int, bytes]: The response status and the YANG Patch status.
+        """
+        datastore = json.loads(json.dumps(self.datastore))
+        for edit in patch["edit"]:
+            *containers, entry = edit["target"].strip("/").split("/")
+            name, _, key = entry.partition("=")
+            key = unquote(key)
+
+            parent = datastore
+            for container in containers:
+                parent = parent.setdefault(container, {})
+            entries = parent.setdefault(name, [])
+            index = next((i for i, item in enumerate(entries) if any(item.get(k) == key for k in LIST_KEYS)), None)
+
+            operation = edit["operation"]
+            if operation in ("delete", "remove"):
+                if index is not None:
+                    del entries[index]
+                elif operation == "delete":
+                    return self._patch_error(patch, edit, "data-missing")
+            elif operation in ("create", "merge", "replace"):
+                value = next(iter(edit["value"].values()))[0]
+                if index is None:
+                    entries.append(value)
+                elif operation == "create":
+                    return self._patch_error(patch, edit, "data-exists")
+                elif operation == "replace":
+                    entries[index] = value
+                else:
+                    _merge(entries[index], value)
+            else:
+                return self._patch_error(patch, edit, "operation-not-supported")
+
+        self.datastore = datastore
+        return 200, json.dumps({"ietf-yang-patch:yang-patch-status": {"patch-id": patch["patch-id"],
+                                                                       "ok": [None]}}).encode()
+
+    @staticmethod
+    def _patch_error(patch: dict, edit: dict, tag: str) -> Tuple[int, bytes]:
+        """Build the YANG Patch status of a failed edit.
+
+        Args:
+            patch (dict): The YANG Patch.
+            edit (dict): The failed edit.
+            tag (str): The error tag.
+
+        Returns:
+            Tuple[int, bytes]: The response status and the YANG Patch status.
+        """
+        status = {"patch-id": patch["patch-id"], "edit-status": {"edit": [{
+            "edit-id": edit["edit-id"], "errors": {"error": [{"error-type": "application", "error-tag": tag}]}}]}}
+        return 409, json.dumps({"ietf-yang-patch:yang-patch-status": status}).encode()
@@ -0,0 +1,301 @@
+import heapq
+import threading
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import networkx as nx
+
+from .device import DirectionalPort, TerminalPoint
+from .graph import PortGraph
+from .path import NetworkPath
+
+# Default number of candidate paths of a search, the number of all simple paths grows exponentially with the network
+MAX_CANDIDATES = 8
+
+
+def signal_flow(edge: Tuple[DirectionalPort, DirectionalPort]) -> Tuple[DirectionalPort, DirectionalPort]:
+    """Orient a port graph edge in the direction of the signal.
+
+    Device edges are always (TX, RX) pairs. Between two devices the signal flows from the TX port
+    to the RX port, inside a device it enters at the RX port and leaves at the TX port.
+
+    Args:
+        edge (Tuple[DirectionalPort, DirectionalPort]): The (TX, RX) edge.
+
+    Returns:
+        Tuple[DirectionalPort, DirectionalPort]: The edge ordered by the signal flow.
+    """
+    tx, rx = edge
+    return (tx, rx) if tx.device is not rx.device else (rx, tx)
+
+
+def mirror_path(path: List[int]) -> List[int]:
+    """Get the path in the opposite direction over the same links.
+
+    Args:
+        path (List[int]): The node IDs of the path to mirror.
+
+    Returns:
+        List[int]: The path traversed backwards, with swapped port directions.
+    """
+    return [node ^ 1 for node in reversed(path)]
+
+
+class CandidatePaths:
+    """Lazily generated k-shortest candidate paths between two terminal points.
+
+    The candidates are produced by Yen's algorithm over the port graph in the order of increasing hop count.
+    Generated candidates are kept, so iterating again does not repeat the search.
+
+    Attributes:
+        paths (List[NetworkPath]): The candidates generated so far.
+    """
+
+    def __init__(self, port_graph: PortGraph, source: Optional[int], target: Optional[int]):
+        """Initialize a CandidatePaths instance.
+
+        Args:
+            port_graph (PortGraph): The port graph. It must not change while candidates are generated.
+            source (Optional[int]): The TX node of the first terminal point, None if it is not in the graph.
+            target (Optional[int]): The RX node of the second terminal point, None if it is not in the graph.
+        """
+        self.paths = []
+        self._port_graph = port_graph
+        self._target = target
+        self._found: List[List[int]] = []
+        self._seen: Set[Tuple[int, ...]] = set()
+        self._spurs: List[Tuple[int, Tuple[int, ...]]] = []
+
+        if source is not None and target is not None:
+            self._push(port_graph.shortest_path(source, target))
+
+    def _push(self, path: Optional[List[int]]) -> None:
+        """Add a path to the heap of potential candidates unless it was seen before.
+
+        Args:
+            path (Optional[List[int]]): The node IDs of the path.
+
+        Returns:
+            None
+        """
+        if path is not None and tuple(path) not in self._seen:
+            self._seen.add(tuple(path))
+            heapq.heappush(self._spurs, (len(path), tuple(path)))
+
+    def _generate(self) -> bool:
+        """Generate the next candidate.
+
+        Returns:
+            bool: False if there are no more candidates.
+        """
+        if not self._spurs:
+            return False
+
+        _, path = heapq.heappop(self._spurs)
+        path = list(path)
+        self._found.append(path)
+        self.paths.append(NetworkPath(self._port_graph.ports(path), self._port_graph.ports(mirror_path(path))))
+
+        # Deviate from the new candidate at every node, avoiding the links taken by the candidates found so far
+        for i in range(len(path) - 1):
+            root = path[:i + 1]
+            blocked_successors = {found[i + 1] for found in self._found if found[:i + 1] == root}
+            spur = self._port_graph.shortest_path(path[i], self._target, blocked_nodes=root[:-1],
+                                                  blocked_successors=blocked_successors)
+            if spur is not None:
+                self._push(root[:-1] + spur)
+        return True
+
+    def __iter__(self) -> Iterator[NetworkPath]:
+        index = 0
+        while index < len(self.paths) or self._generate():
+            yield self.paths[index]
+            index += 1
+
+
+class RouteTable:
+    """Shortest routes between all pairs of terminal points.
+
+    Routes are computed with one breadth-first search over the port graph per source terminal point and stored
+    as arrays of node IDs. A topology change invalidates only the entries it can affect: a removed edge
+    invalidates the routes using it, an added edge the routes it could shorten. Invalid entries are computed
+    again on the next lookup, valid ones are answered with a dictionary lookup. The table grows and computes
+    routes under a lock, so it can be used from several threads.
+    """
+
+    def __init__(self, port_graph: PortGraph, devices: dict):
+        """Initialize a RouteTable instance.
+
+        Args:
+            port_graph (PortGraph): The port graph of the network.
+            devices (dict): The devices of the network, indexed by their names.
+        """
+        self._port_graph = port_graph
+        self._devices = devices
+
+        self._terminals: Dict[str, int] = {}
+        self._terminal_names: List[str] = []
+        self._length = np.zeros((0, 0))
+        self._valid = np.zeros((0, 0), dtype=bool)
+        self._routes: Dict[Tuple[int, int], np.ndarray] = {}
+        self._edge_routes: Dict[Tuple[int, int], Set[Tuple[int, int]]] = {}
+        self._lock = threading.RLock()
+
+    def precompute(self) -> None:
+        """Compute the routes between all pairs of terminal points of the network.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for name, device in self._devices.items():
+                if isinstance(device, TerminalPoint):
+                    self._terminal(name)
+            for source in range(len(self._terminals)):
+                if not self._valid[source].all():
+                    self._compute_source(source)
+
+    def route(self, tp_a: str, tp_b: str) -> Optional[np.ndarray]:
+        """Get the node IDs of the shortest route from one terminal point to another.
+
+        Args:
+            tp_a (str): The name of the source terminal point.
+            tp_b (str): The name of the target terminal point.
+
+        Returns:
+            Optional[np.ndarray]: The node IDs of the route, None if the target is not reachable.
+        """
+        with self._lock:
+            source, target = self._terminal(tp_a), self._terminal(tp_b)
+            if not self._valid[source, target]:
+                self._compute_source(source)
+            return self._routes.get((source, target))
+
+    def lookup(self, tp_a: str, tp_b: str) -> NetworkPath:
+        """Get the shortest path between two terminal points.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+
+        Returns:
+            NetworkPath: The shortest path in both directions.
+
+        Raises:
+            nx.NetworkXNoPath: If the terminal points are not connected.
+        """
+        direction_ab, direction_ba = self.route(tp_a, tp_b), self.route(tp_b, tp_a)
+        if direction_ab is None or direction_ba is None:
+            raise nx.NetworkXNoPath(f"No path between {tp_a} and {tp_b}")
+
+        return NetworkPath(self._port_graph.ports(direction_ab.tolist()),
+                           self._port_graph.ports(direction_ba.tolist()))
+
+    def update(self, removed_edges: List[Tuple[int, int]], added_edges: List[Tuple[int, int]]) -> None:
+        """Invalidate the routes affected by a change of the port graph.
+
+        Must be called after the removed edges are deleted from the graph and before the added edges are inserted.
+
+        Args:
+            removed_edges (List[Tuple[int, int]]): The removed edges.
+            added_edges (List[Tuple[int, int]]): The added edges.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if not self._valid.any():
+                return
+
+            for edge in removed_edges:
+                for source, target in self._edge_routes.pop(edge, ()):
+                    self._valid[source, target] = False
+
+            if added_edges:
+                # Any route over the new edges is at least as long as the distance from its source to the nearest
+                # new edge, plus one, plus the distance from the nearest new edge to its target
+                to_edges, _ = self._port_graph.bfs([u for u, _ in added_edges], reverse=True)
+                from_edges, _ = self._port_graph.bfs([v for _, v in added_edges])
+                to_distance = self._terminal_distances(to_edges, "TX")
+                from_distance = self._terminal_distances(from_edges, "RX")
+                self._valid &= to_distance[:, None] + 1 + from_distance[None, :] >= self._length
+
+    def _terminal(self, name: str) -> int:
+        """Get the index of a terminal point, registering it on first use.
+
+        Args:
+            name (str): The name of the terminal point.
+
+        Returns:
+            int: The index of the terminal point.
+        """
+        if name not in self._terminals:
+            if name not in self._devices:
+                raise KeyError(name)
+            self._terminals[name] = len(self._terminal_names)
+            self._terminal_names.append(name)
+            self._length = np.pad(self._length, ((0, 1), (0, 1)), constant_values=np.inf)
+            self._valid = np.pad(self._valid, ((0, 1), (0, 1)), constant_values=False)
+        return self._terminals[name]
+
+    def _terminal_node(self, name: str, direction: str) -> Optional[int]:
+        """Get the node ID of the client port of a terminal point.
+
+        Args:
+            name (str): The name of the terminal point.
+            direction (str): The direction of the port.
+
+        Returns:
+            Optional[int]: The node ID, None if the terminal point is not in the graph.
+        """
+        device = self._devices.get(name)
+        return None if device is None else self._port_graph.node_id(device, 'C', direction)
+
+    def _terminal_distances(self, distances: np.ndarray, direction: str) -> np.ndarray:
+        """Get the distances of the terminal point ports from a breadth-first search result.
+
+        Args:
+            distances (np.ndarray): The hop distance of every node, -1 if not reached.
+            direction (str): The direction of the ports.
+
+        Returns:
+            np.ndarray: The distance of every terminal point, np.inf if not reached.
+        """
+        nodes = [self._terminal_node(name, direction) for name in self._terminal_names]
+        result = np.array([distances[node] if node is not None else -1 for node in nodes], dtype=float)
+        result[result < 0] = np.inf
+        return result
+
+    def _compute_source(self, source: int) -> None:
+        """Compute the routes from a terminal point to all the others.
+
+        Args:
+            source (int): The index of the source terminal point.
+
+        Returns:
+            None
+        """
+        for target in range(len(self._terminals)):
+            route = self._routes.pop((source, target), None)
+            if route is not None:
+                for edge in zip(route[:-1].tolist(), route[1:].tolist()):
+                    self._edge_routes.get(edge, set()).discard((source, target))
+
+        self._length[source] = np.inf
+        self._valid[source] = True
+
+        start = self._terminal_node(self._terminal_names[source], "TX")
+        if start is None:
+            return
+
+        dist, parent = self._port_graph.bfs([start])
+        for name, target in self._terminals.items():
+            end = self._terminal_node(name, "RX")
+            if end is None or dist[end] < 0:
+                continue
+
+            route = np.array(self._port_graph.reconstruct(parent, end), dtype=np.int32)
+            self._routes[source, target] = route
+            self._length[source, target] = len(route) - 1
+            for edge in zip(route[:-1].tolist(), route[1:].tolist()):
+                self._edge_routes.setdefault(edge, set()).add((source, target))
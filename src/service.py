@@ -0,0 +1,728 @@
+import json
+import time
+import random
+import shutil
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import spectrum
+from .path import NetworkPath
+from .channel import Channel
+from .assignment import POLICIES, free_blocks, width_to_slots
+from .routing import MAX_CANDIDATES
+from .provisioning import OccupancyMatrix
+from .restconf import ConnectionPool, read_body, read_headers
+
+JSON_CONTENT_TYPE = "application/json"
+
+
+class ServiceError(Exception):
+    """A request the service cannot serve, answered with the status code and the message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Connection:
+    """A connection set up by the service.
+
+    Attributes:
+        id (int): The connection ID.
+        tp_a (str): The name of the first terminal point.
+        tp_b (str): The name of the second terminal point.
+        path (NetworkPath): The path of the connection.
+        channel (Channel): The channel of the connection.
+    """
+    id: int
+    tp_a: str
+    tp_b: str
+    path: NetworkPath
+    channel: Channel
+
+    def to_json(self) -> dict:
+        """Describe the connection for the API.
+
+        Returns:
+            dict: The connection with the channel frequencies in GHz and the device names of the path.
+        """
+        return {
+            "id": self.id,
+            "tp_a": self.tp_a,
+            "tp_b": self.tp_b,
+            "channel": {"name": self.channel.name, "lower-frequency": self.channel.lower_frequency,
+                        "upper-frequency": self.channel.upper_frequency},
+            "path": device_names(self.path),
+        }
+
+
+def device_names(path: NetworkPath) -> List[str]:
+    """Get the names of the devices of a path in the first direction.
+
+    Args:
+        path (NetworkPath): The path.
+
+    Returns:
+        List[str]: The device names in the order of the signal, terminal points included.
+    """
+    return list(dict.fromkeys(port.device.name for port in path.direction_1))
+
+
+def route_json(tp_a: str, tp_b: str, path: NetworkPath) -> dict:
+    """Describe a route between two terminal points for the API.
+
+    Args:
+        tp_a (str): The name of the first terminal point.
+        tp_b (str): The name of the second terminal point.
+        path (NetworkPath): The path of the route.
+
+    Returns:
+        dict: The device names of the route in both directions.
+    """
+    return {"tp_a": tp_a, "tp_b": tp_b, "direction_1": device_names(path),
+            "direction_2": list(dict.fromkeys(port.device.name for port in path.direction_2))}
+
+
+@dataclass(frozen=True)
+class OccupancySnapshot:
+    """Immutable state of the network published after every batch of writes.
+
+    Attributes:
+        version (int): The number of write batches applied before the snapshot.
+        index (Dict[str, int]): Row of each device, indexed by the device name. Shared by all snapshots.
+        bitmaps (np.ndarray): The read-only (devices, words) matrix of the occupancy bitmaps.
+        port_bitmaps (np.ndarray): The read-only (nodes, words) matrix of the occupancy bitmaps of the directional
+            ports, with one row per port graph node.
+        connections (Dict[int, dict]): The API description of every connection, indexed by the connection IDs.
+    """
+    version: int
+    index: Dict[str, int]
+    bitmaps: np.ndarray
+    port_bitmaps: np.ndarray
+    connections: Dict[int, dict]
+
+
+class ControllerService:
+    """Long-running JSON-over-HTTP service setting up and tearing down connections in a network.
+
+    Setups and teardowns are put on a single allocation queue. A writer task takes all queued requests at once,
+    applies them one by one in a worker thread, so the event loop keeps serving reads, and publishes a new
+    `OccupancySnapshot`. Reads are answered from the latest snapshot, which is never modified, so their latency
+    does not depend on the provisioning load. Every batch copies the bitmaps of the previous snapshot once and
+    updates only the rows of the devices and ports it changed.
+
+    The topology must not change while the service runs.
+
+    Endpoints:
+        - POST /connections with {"tp_a", "tp_b", "bandwidth"}: set up a connection (201, 409 if blocked).
+        - DELETE /connections/<id>: tear a connection down (204).
+        - GET /connections and GET /connections/<id>: the connections.
+        - GET /routes/<tp_a>/<tp_b>: the shortest route between two terminal points.
+        - GET /occupancy/<device>: the occupied slot ranges of a device.
+        - GET /occupancy/<tp_a>/<tp_b>: the free slot ranges along the shortest route.
+        - GET /status: the snapshot version and the number of connections and queued writes.
+
+    Attributes:
+        network (Network): The network.
+        snapshot (OccupancySnapshot): The latest published state.
+    """
+
+    def __init__(self, network, host: str = "127.0.0.1", port: int = 0, policy: str = "first-fit",
+                 k: Optional[int] = MAX_CANDIDATES, config_directory: str = None):
+        """Initialize a ControllerService instance.
+
+        Args:
+            network (Network): The network to serve.
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The port to listen on. Defaults to 0 (any free port).
+            policy (str, optional): The spectrum assignment policy. Defaults to "first-fit".
+            k (Optional[int], optional): The maximal number of candidate paths of a setup, None for all simple
+                paths. Defaults to MAX_CANDIDATES.
+            config_directory (str, optional): Write the configuration of every connection to a subdirectory named
+                after its ID, removed on teardown. Defaults to None (no configuration files).
+        """
+        assert policy in POLICIES, f"Invalid policy: {policy}"
+        self.network = network
+        self.host = host
+        self.port = port
+        self.policy = policy
+        self.k = k
+        self.config_directory = config_directory
+
+        self._connections: Dict[int, Connection] = {}
+        self._next_id = 1
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+        devices = list(network.devices.values())
+        bitmaps = np.stack([device.occupancy_bitmap for device in devices]) if devices \
+            else np.zeros((0, spectrum.NUM_WORDS), dtype=np.uint64)
+        bitmaps.flags.writeable = False
+
+        # The service does not change the topology, so the port graph nodes stay the rows of the port bitmaps
+        self._ports = OccupancyMatrix(network.port_graph.export()[0])
+        port_bitmaps = self._ports.matrix
+        port_bitmaps.flags.writeable = False
+        self.snapshot = OccupancySnapshot(0, {device.name: row for row, device in enumerate(devices)}, bitmaps,
+                                          port_bitmaps, {})
+
+    @property
+    def url(self) -> str:
+        """Get the base URL of the service.
+
+        Returns:
+            str: The base URL.
+        """
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """Start the writer and listen for requests.
+
+        Returns:
+            None
+        """
+        # Route queries are then dictionary lookups which never search the graph in the event loop, and the CSR
+        # arrays the writer thread searches exist before any read
+        self.network.precompute_routes()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="allocation")
+        self._writer = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop listening, close the client connections, finish the queued writes and stop the writer.
+
+        Returns:
+            None
+        """
+        self._server.close()
+        clients = list(self._clients.values())
+        for writer in self._clients:
+            writer.close()
+        await asyncio.gather(*clients, return_exceptions=True)
+        await self._server.wait_closed()
+        await self._queue.join()
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._executor.shutdown()
+
+    async def __aenter__(self) -> "ControllerService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def serve_forever(self) -> None:
+        """Start the service and serve until cancelled.
+
+        Returns:
+            None
+        """
+        async with self:
+            await self._server.serve_forever()
+
+    async def setup(self, tp_a: str, tp_b: str, bandwidth: float) -> dict:
+        """Queue the setup of a connection and wait until it is applied.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+            bandwidth (float): The requested channel width in GHz.
+
+        Returns:
+            dict: The description of the new connection.
+
+        Raises:
+            ServiceError: If the bandwidth or the terminal point pair is invalid (400), a terminal point does not
+                exist (404), there is no path with free spectrum (409) or the configuration cannot be written (500).
+        """
+        return await self._submit(self._setup, tp_a, tp_b, bandwidth)
+
+    async def teardown(self, connection_id: int) -> None:
+        """Queue the teardown of a connection and wait until it is applied.
+
+        Args:
+            connection_id (int): The connection ID.
+
+        Returns:
+            None
+
+        Raises:
+            ServiceError: If the connection does not exist (404).
+        """
+        await self._submit(self._teardown, connection_id)
+
+    async def _submit(self, operation, *args):
+        """Put a write on the allocation queue and wait for its result.
+
+        Args:
+            operation (Callable): The write, called in the writer thread.
+            *args: The arguments of the write.
+
+        Returns:
+            Any: The result of the write.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, args, future))
+        return await future
+
+    async def _write_loop(self) -> None:
+        """Apply the queued writes in batches and publish a snapshot after every batch.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                results, snapshot = await loop.run_in_executor(self._executor, self._apply, batch)
+                self.snapshot = snapshot
+            except Exception as error:
+                # The writer keeps running, so the waiting clients and `stop` are not left hanging
+                results = [(None, error)] * len(batch)
+            for (_, _, future), (result, error) in zip(batch, results):
+                if future.done():
+                    pass  # The client went away
+                elif error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+                self._queue.task_done()
+
+    def _apply(self, batch: list) -> Tuple[List[tuple], OccupancySnapshot]:
+        """Apply a batch of writes and build the next snapshot. Runs in the writer thread.
+
+        Args:
+            batch (list): The (operation, arguments, future) writes.
+
+        Returns:
+            Tuple[List[tuple], OccupancySnapshot]: The (result, exception) of every write and the new snapshot.
+        """
+        changed, results = set(), []
+        for operation, args, _ in batch:
+            try:
+                result, devices = operation(*args)
+                changed.update(devices)
+                results.append((result, None))
+            except Exception as error:
+                results.append((None, error))
+
+        previous = self.snapshot
+        bitmaps, port_bitmaps = previous.bitmaps, previous.port_bitmaps
+        if changed:
+            rows = [previous.index[device.name] for device in changed]
+            bitmaps = bitmaps.copy()
+            bitmaps[rows] = np.stack([device.occupancy_bitmap for device in changed])
+            bitmaps.flags.writeable = False
+
+            self._ports.matrix = port_bitmaps.copy()
+            self._ports.refresh(changed)
+            port_bitmaps = self._ports.matrix
+            port_bitmaps.flags.writeable = False
+
+        connections = {connection_id: connection.to_json() if connection_id not in previous.connections
+                       else previous.connections[connection_id]
+                       for connection_id, connection in self._connections.items()}
+        return results, OccupancySnapshot(previous.version + 1, previous.index, bitmaps, port_bitmaps, connections)
+
+    def _setup(self, tp_a: str, tp_b: str, bandwidth: float) -> Tuple[dict, list]:
+        """Set up a connection. Runs in the writer thread.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+            bandwidth (float): The requested channel width in GHz.
+
+        Returns:
+            Tuple[dict, list]: The description of the connection and the changed devices.
+        """
+        for name in (tp_a, tp_b):
+            if name not in self.network.devices:
+                raise ServiceError(404, f"Unknown terminal point: {name}")
+        if tp_a == tp_b:
+            raise ServiceError(400, f"A connection needs two different terminal points, got {tp_a} twice")
+        try:
+            num_slots = width_to_slots(bandwidth)
+        except AssertionError as error:
+            raise ServiceError(400, str(error))
+
+        # Every candidate path starts and ends on the same terminal ports, a search would only try them all in vain
+        if not self._terminals_free(tp_a, tp_b, num_slots):
+            raise ServiceError(409, f"No path with {bandwidth} GHz free between {tp_a} and {tp_b}")
+
+        found = self.network.find_path_with_spectrum(tp_a, tp_b, bandwidth, self.policy, self.k)
+        if found is None:
+            raise ServiceError(409, f"No path with {bandwidth} GHz free between {tp_a} and {tp_b}")
+
+        path, channel = found
+
+        # The configuration is written before anything is allocated, so a failed write leaves no trace
+        if self.config_directory is not None:
+            directory = os.path.join(self.config_directory, str(self._next_id))
+            try:
+                path.generate_configuration(channel, directory)
+            except OSError as error:
+                shutil.rmtree(directory, ignore_errors=True)
+                raise ServiceError(500, f"Cannot write the configuration: {error}")
+
+        path.add_channel(channel)
+        connection = Connection(self._next_id, tp_a, tp_b, path, channel)
+        self._connections[connection.id] = connection
+        self._next_id += 1
+        return connection.to_json(), path.devices
+
+    def _terminals_free(self, tp_a: str, tp_b: str, num_slots: int) -> bool:
+        """Check that the links of two terminal points to their add/drops have a free range of slots in common.
+        Runs in the writer thread.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+            num_slots (int): The number of contiguous slots requested.
+
+        Returns:
+            bool: True if the ports of both links, in both directions, share a free range wide enough.
+        """
+        bitmap = np.zeros(spectrum.NUM_WORDS, dtype=np.uint64)
+        for name in (tp_a, tp_b):
+            terminal = self.network.devices[name]
+            neighbor = terminal.links.get('C')
+            if neighbor is None:
+                return False
+            bitmap |= terminal.port_bitmap([('C', "TX"), ('C', "RX")])
+            bitmap |= neighbor.device.port_bitmap([(neighbor.device_port, "TX"), (neighbor.device_port, "RX")])
+        _, lengths = free_blocks(spectrum.to_slots(bitmap))
+        return bool(np.any(lengths >= num_slots))
+
+    def _teardown(self, connection_id: int) -> Tuple[None, list]:
+        """Tear a connection down. Runs in the writer thread.
+
+        Args:
+            connection_id (int): The connection ID.
+
+        Returns:
+            Tuple[None, list]: No result and the changed devices.
+        """
+        connection = self._connections.pop(connection_id, None)
+        if connection is None:
+            raise ServiceError(404, f"Unknown connection: {connection_id}")
+
+        connection.path.remove_channel(connection.channel)
+        if self.config_directory is not None:
+            shutil.rmtree(os.path.join(self.config_directory, str(connection_id)), ignore_errors=True)
+        return None, connection.path.devices
+
+    def route(self, tp_a: str, tp_b: str) -> dict:
+        """Get the shortest route between two terminal points.
+
+        The routes are precomputed when the service starts. The route table is used only by the event loop, the
+        writer thread searches candidate paths instead.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+
+        Returns:
+            dict: The device names of the route in both directions.
+
+        Raises:
+            ServiceError: If a terminal point does not exist or they are not connected (404).
+        """
+        return route_json(tp_a, tp_b, self._route_path(tp_a, tp_b))
+
+    def _route_path(self, tp_a: str, tp_b: str) -> NetworkPath:
+        """Get the shortest route between two terminal points as a path.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+
+        Returns:
+            NetworkPath: The path of the route.
+
+        Raises:
+            ServiceError: If a terminal point does not exist or they are not connected (404).
+        """
+        route_table = self.network.route_table
+        try:
+            forward, backward = route_table.route(tp_a, tp_b), route_table.route(tp_b, tp_a)
+        except KeyError as error:
+            raise ServiceError(404, f"Unknown terminal point: {error.args[0]}")
+        if forward is None or backward is None:
+            raise ServiceError(404, f"No route between {tp_a} and {tp_b}")
+
+        port_graph = self.network.port_graph
+        return NetworkPath(port_graph.ports(forward.tolist()), port_graph.ports(backward.tolist()))
+
+    def device_occupancy(self, device: str, snapshot: OccupancySnapshot = None) -> dict:
+        """Get the occupied slot ranges of a device from a snapshot.
+
+        Args:
+            device (str): The name of the device.
+            snapshot (OccupancySnapshot, optional): The snapshot. Defaults to None (the latest one).
+
+        Returns:
+            dict: The snapshot version and the [first slot, stop slot) occupied ranges.
+
+        Raises:
+            ServiceError: If the device does not exist (404).
+        """
+        snapshot = snapshot or self.snapshot
+        if device not in snapshot.index:
+            raise ServiceError(404, f"Unknown device: {device}")
+
+        starts, lengths = free_blocks(~spectrum.to_slots(snapshot.bitmaps[snapshot.index[device]]))
+        return {"device": device, "version": snapshot.version,
+                "occupied": [[start, start + length] for start, length in zip(starts.tolist(), lengths.tolist())]}
+
+    def path_occupancy(self, tp_a: str, tp_b: str, snapshot: OccupancySnapshot = None) -> dict:
+        """Get the free slot ranges along the shortest route between two terminal points from a snapshot.
+
+        Only the directional ports occupied by a channel on the route are taken into account.
+
+        Args:
+            tp_a (str): The name of the first terminal point.
+            tp_b (str): The name of the second terminal point.
+            snapshot (OccupancySnapshot, optional): The snapshot. Defaults to None (the latest one).
+
+        Returns:
+            dict: The snapshot version, the route and the [first slot, stop slot) free ranges.
+        """
+        snapshot = snapshot or self.snapshot
+        path = self._route_path(tp_a, tp_b)
+        route = route_json(tp_a, tp_b, path)
+        bitmap = np.bitwise_or.reduce(snapshot.port_bitmaps[self._ports.rows(path)], axis=0)
+        starts, lengths = free_blocks(spectrum.to_slots(bitmap))
+        return {"version": snapshot.version, "route": route,
+                "free": [[start, start + length] for start, length in zip(starts.tolist(), lengths.tolist())]}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests of a single keep-alive connection.
+
+        Args:
+            reader (asyncio.StreamReader): The connection reader.
+            writer (asyncio.StreamWriter): The connection writer.
+
+        Returns:
+            None
+        """
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = await read_headers(reader)
+                body = await read_body(reader, headers)
+
+                try:
+                    status, data = await self._respond(method, target.split("?")[0].strip("/").split("/"), body)
+                except ServiceError as error:
+                    status, data = error.status, {"error": str(error)}
+                except Exception as error:
+                    status, data = 500, {"error": repr(error)}
+                response_body = b"" if data is None else json.dumps(data).encode()
+                writer.write((f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                              f"Content-Type: {JSON_CONTENT_TYPE}\r\n"
+                              f"Content-Length: {len(response_body)}\r\n\r\n").encode("latin-1") + response_body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _respond(self, method: str, parts: List[str], body: bytes) -> Tuple[int, Optional[object]]:
+        """Route a request to its handler.
+
+        Args:
+            method (str): The HTTP method.
+            parts (List[str]): The segments of the request path.
+            body (bytes): The request body.
+
+        Returns:
+            Tuple[int, Optional[object]]: The response status and the JSON data, None for an empty body.
+
+        Raises:
+            ServiceError: If the request is invalid or cannot be served.
+        """
+        resource, arguments = parts[0], parts[1:]
+        if resource == "connections" and method == "POST" and not arguments:
+            try:
+                request = json.loads(body)
+                tp_a, tp_b, bandwidth = request["tp_a"], request["tp_b"], float(request["bandwidth"])
+            except (ValueError, KeyError, TypeError):
+                raise ServiceError(400, "Expected {\"tp_a\", \"tp_b\", \"bandwidth\"}")
+            return 201, await self.setup(tp_a, tp_b, bandwidth)
+
+        if resource == "connections" and method == "DELETE" and len(arguments) == 1:
+            await self.teardown(_parse_id(arguments[0]))
+            return 204, None
+
+        if method != "GET":
+            raise ServiceError(405, f"{method} is not allowed")
+
+        snapshot = self.snapshot
+        if resource == "connections" and not arguments:
+            return 200, list(snapshot.connections.values())
+        if resource == "connections" and len(arguments) == 1:
+            connection = snapshot.connections.get(_parse_id(arguments[0]))
+            if connection is None:
+                raise ServiceError(404, f"Unknown connection: {arguments[0]}")
+            return 200, connection
+        if resource == "routes" and len(arguments) == 2:
+            return 200, self.route(*arguments)
+        if resource == "occupancy" and len(arguments) == 1:
+            return 200, self.device_occupancy(arguments[0], snapshot)
+        if resource == "occupancy" and len(arguments) == 2:
+            return 200, self.path_occupancy(*arguments, snapshot)
+        if resource == "status" and not arguments:
+            return 200, {"version": snapshot.version, "connections": len(snapshot.connections),
+                         "queued": self._queue.qsize()}
+        raise ServiceError(404, f"Unknown resource: /{'/'.join(parts)}")
+
+
+def _parse_id(value: str) -> int:
+    """Parse a connection ID from a request path.
+
+    Args:
+        value (str): The path segment.
+
+    Returns:
+        int: The connection ID.
+
+    Raises:
+        ServiceError: If the segment is not an integer (400).
+    """
+    try:
+        return int(value)
+    except ValueError:
+        raise ServiceError(400, f"Invalid connection ID: {value}")
+
+
+@dataclass
+class LoadReport:
+    """Throughput and latency measured by the load generator.
+
+    Attributes:
+        elapsed (float): The duration of the run in seconds.
+        latencies (Dict[str, List[float]]): The latency of every request in seconds, indexed by the request kind
+            ("setup", "teardown", "route" or "occupancy").
+        errors (Dict[str, int]): The number of failed requests of every kind, blocked setups included.
+    """
+    elapsed: float
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def requests_per_second(self) -> float:
+        """Get the throughput of all requests.
+
+        Returns:
+            float: The number of requests per second.
+        """
+        return sum(len(latencies) for latencies in self.latencies.values()) / self.elapsed
+
+    def percentile(self, kind: str, q: float) -> float:
+        """Get a latency percentile of a kind of requests.
+
+        Args:
+            kind (str): The request kind.
+            q (float): The percentile, from 0 to 100.
+
+        Returns:
+            float: The latency in seconds, NaN if no request of the kind was sent.
+        """
+        latencies = self.latencies.get(kind)
+        return float(np.percentile(latencies, q)) if latencies else float("nan")
+
+    def summary(self) -> str:
+        """Format the report as a table.
+
+        Returns:
+            str: One line per request kind with the count, errors, p50 and p99 latency in milliseconds.
+        """
+        lines = [f"{self.requests_per_second:.0f} requests/s over {self.elapsed:.2f} s"]
+        for kind in sorted(self.latencies):
+            lines.append(f"{kind:<10} {len(self.latencies[kind]):>8} requests {self.errors.get(kind, 0):>6} errors "
+                         f"p50 {1e3 * self.percentile(kind, 50):8.3f} ms p99 {1e3 * self.percentile(kind, 99):8.3f} ms")
+        return "\n".join(lines)
+
+
+async def generate_load(url: str, terminals: List[str], requests: int = 10000, concurrency: int = 32,
+                        write_ratio: float = 0.1, bandwidths: List[float] = None, seed: int = None) -> LoadReport:
+    """Send a mix of connection setups, teardowns and queries to a service and measure the latency.
+
+    Every client keeps its own connections: a write sets up a connection between two random terminal points, or
+    tears down one of the client's connections if it holds more than a few. A read asks for a route or the path
+    occupancy of two random terminal points.
+
+    Args:
+        url (str): The base URL of the service.
+        terminals (List[str]): The names of the terminal points to connect.
+        requests (int, optional): The total number of requests. Defaults to 10000.
+        concurrency (int, optional): The number of concurrent clients. Defaults to 32.
+        write_ratio (float, optional): The share of setups and teardowns. Defaults to 0.1.
+        bandwidths (List[float], optional): The bandwidths of the setups in GHz. Defaults to None (50 GHz).
+        seed (int, optional): Seed of the random generator. Defaults to None.
+
+    Returns:
+        LoadReport: The latencies and errors of the requests.
+    """
+    assert len(terminals) >= 2, "At least two terminal points are needed"
+    bandwidths = bandwidths or [50]
+    generator = random.Random(seed)
+    pool = ConnectionPool(url, size=concurrency)
+    report = LoadReport(0.0)
+    remaining = [requests]
+
+    async def send(kind: str, method: str, target: str, body: dict = None) -> Optional[dict]:
+        start = time.perf_counter()
+        response = await pool.request(method, target, b"" if body is None else json.dumps(body).encode(),
+                                      {"Content-Type": JSON_CONTENT_TYPE})
+        report.latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        if response.status >= 300:
+            report.errors[kind] = report.errors.get(kind, 0) + 1
+            return None
+        return json.loads(response.body) if response.body else {}
+
+    async def client() -> None:
+        connections = []
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            tp_a, tp_b = generator.sample(terminals, 2)
+            if generator.random() >= write_ratio:
+                resource = "routes" if generator.random() < 0.5 else "occupancy"
+                await send("route" if resource == "routes" else "occupancy", "GET", f"/{resource}/{tp_a}/{tp_b}")
+            elif len(connections) > 4 or (connections and generator.random() < 0.5):
+                await send("teardown", "DELETE", f"/connections/{connections.pop(0)}")
+            else:
+                connection = await send("setup", "POST", "/connections",
+                                        {"tp_a": tp_a, "tp_b": tp_b, "bandwidth": generator.choice(bandwidths)})
+                if connection is not None:
+                    connections.append(connection["id"])
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    finally:
+        report.elapsed = time.perf_counter() - start
+        await pool.close()
+    return report
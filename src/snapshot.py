@@ -0,0 +1,251 @@
+import gc
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from . import spectrum
+from .channel import Channel, SPECTRUM
+from .network import Network
+from .utils import write_atomic
+from .intervals import IntervalIndex
+from .device import CzechLightAddDrop, CzechLightLineDegree, Device, NeighborInfo, TerminalPoint
+
+SNAPSHOT_FORMAT = 2
+OCCUPANCY_FILE = "occupancy.npy"
+TOPOLOGY_FILE = "topology.npz"
+
+# Device classes indexed by their codes in the snapshot
+DEVICE_CLASSES = (TerminalPoint, CzechLightLineDegree, CzechLightAddDrop)
+
+
+def save_snapshot(network: Network, directory: str) -> None:
+    """Save the full state of a network: devices, links, channels, power parameters and the port graph.
+
+    The snapshot is a directory with two files. `occupancy.npy` holds the occupancy bitmaps of all devices as a
+    (devices, words) uint64 matrix which can be memory-mapped, `topology.npz` holds everything else as integer and
+    float arrays, with the ports referenced by their index in the port list of their device. Both files are
+    written to temporary files first and renamed, so a reader never sees a partially written file.
+
+    Args:
+        network (Network): The network.
+        directory (str): The directory of the snapshot.
+
+    Returns:
+        None
+    """
+    devices = list(network.devices.values())
+    rows = {id(device): row for row, device in enumerate(devices)}
+    ports = [{port: i for i, port in enumerate(device.links)} for device in devices]
+
+    def port_index(device: Device, port: str) -> Tuple[int, int]:
+        row = rows[id(device)]
+        return row, ports[row][port]
+
+    links, link_loss, gains, gain_values = [], [], [], []
+    for row, device in enumerate(devices):
+        for port, info in device.links.items():
+            if info is not None:
+                links.append((row, ports[row][port], *port_index(info.device, info.device_port)))
+                link_loss.append(info.loss)
+        for (port, direction), gain in device.gains.items():
+            gains.append((row, ports[row][port], direction == "RX"))
+            gain_values.append(gain)
+
+    channels = [(row, channel.start_slot, channel.num_slots)
+                for row, device in enumerate(devices) for channel in device.intervals]
+    port_channels = [(row, ports[row][port], direction == "RX", channel.start_slot, channel.num_slots)
+                     for row, device in enumerate(devices) for (port, direction), index in device.port_intervals.items()
+                     for channel in index]
+
+    # Ports of removed devices keep their node IDs in the port graph, the snapshot renumbers the remaining ones
+    graph_ports, edges = network.port_graph.export()
+    kept = [i for i, (device, _) in enumerate(graph_ports) if rows.get(id(device)) is not None]
+    renumber = np.full(len(graph_ports), -1, dtype=np.int64)
+    renumber[kept] = np.arange(len(kept))
+    edges = 2 * renumber[edges >> 1] + (edges & 1)
+    edges = edges[(edges >= 0).all(axis=1)]
+
+    topology = {
+        "format": np.array(SNAPSHOT_FORMAT),
+        "num_slots": np.array(SPECTRUM["num_slots"]),
+        "names": np.array([device.name for device in devices], dtype=str),
+        "types": np.array([DEVICE_CLASSES.index(type(device)) for device in devices], dtype=np.int8),
+        "express_ports": np.array([getattr(device, "num_express_ports", 0) for device in devices], dtype=np.int32),
+        "client_ports": np.array([getattr(device, "num_client_ports", 0) for device in devices], dtype=np.int32),
+        "insertion_loss": np.array([device.insertion_loss for device in devices], dtype=float),
+        "links": np.array(links, dtype=np.int32).reshape(-1, 4),
+        "link_loss": np.array(link_loss, dtype=float),
+        "gains": np.array(gains, dtype=np.int32).reshape(-1, 3),
+        "gain_values": np.array(gain_values, dtype=float),
+        "channels": np.array(channels, dtype=np.int32).reshape(-1, 3),
+        "port_channels": np.array(port_channels, dtype=np.int32).reshape(-1, 5),
+        "graph_ports": np.array([port_index(*graph_ports[i]) for i in kept], dtype=np.int32).reshape(-1, 2),
+        "graph_edges": edges.astype(np.int32),
+    }
+    occupancy = np.stack([device.occupancy_bitmap for device in devices]) if devices \
+        else np.zeros((0, spectrum.NUM_WORDS), dtype=np.uint64)
+
+    os.makedirs(directory, exist_ok=True)
+    write_atomic(os.path.join(directory, TOPOLOGY_FILE), lambda f: np.savez(f, **topology))
+    write_atomic(os.path.join(directory, OCCUPANCY_FILE), lambda f: np.save(f, occupancy))
+
+
+def load_occupancy(directory: str, mmap_mode: str = "r") -> Tuple[List[str], np.ndarray]:
+    """Map the occupancy bitmaps of a snapshot without building the network.
+
+    Processes mapping the same snapshot read-only share its pages, so analysis processes need no copy of the
+    occupancy.
+
+    Args:
+        directory (str): The directory of the snapshot.
+        mmap_mode (str, optional): The memory-map mode, "r" for read-only or "c" for copy-on-write. Defaults to "r".
+
+    Returns:
+        Tuple[List[str], np.ndarray]: The device names and the (devices, words) matrix of their bitmaps, see
+            `spectrum.to_slots` to unpack it.
+    """
+    assert mmap_mode in ("r", "c"), f"Invalid memory-map mode: {mmap_mode}"
+    with np.load(os.path.join(directory, TOPOLOGY_FILE)) as topology:
+        _check_format(topology)
+        names = topology["names"].tolist()
+    return names, np.load(os.path.join(directory, OCCUPANCY_FILE), mmap_mode=mmap_mode)
+
+
+def load_snapshot(directory: str, mmap_mode: str = "c") -> Network:
+    """Restore a network from a snapshot.
+
+    The devices are created with their links, channels and power parameters set directly and the port graph
+    is restored from its arrays instead of being derived from the devices. The occupancy bitmap of every device
+    is a view of the memory-mapped occupancy matrix. With the default copy-on-write mode the network can be
+    changed without touching the snapshot, with the read-only mode it can only be analyzed and the processes
+    share the mapped pages.
+
+    Args:
+        directory (str): The directory of the snapshot.
+        mmap_mode (str, optional): The memory-map mode of the occupancy matrix, "c" for copy-on-write or "r" for
+            read-only. Defaults to "c".
+
+    Returns:
+        Network: The restored network.
+    """
+    assert mmap_mode in ("r", "c"), f"Invalid memory-map mode: {mmap_mode}"
+    with np.load(os.path.join(directory, TOPOLOGY_FILE)) as snapshot:
+        _check_format(snapshot)
+        topology = {key: snapshot[key] for key in snapshot.files}
+    occupancy = np.load(os.path.join(directory, OCCUPANCY_FILE), mmap_mode=mmap_mode)
+
+    # The restore creates a large number of long-lived objects at once, collecting them midway only wastes time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _restore_network(topology, occupancy)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _restore_network(topology: Dict[str, np.ndarray], occupancy: np.ndarray) -> Network:
+    """Build a network from the arrays of a snapshot.
+
+    Args:
+        topology (Dict[str, np.ndarray]): The topology arrays.
+        occupancy (np.ndarray): The (devices, words) matrix of the occupancy bitmaps.
+
+    Returns:
+        Network: The restored network.
+    """
+    devices = [_create_device(*spec) for spec in zip(topology["names"].tolist(), topology["types"].tolist(),
+                                                     topology["express_ports"].tolist(),
+                                                     topology["client_ports"].tolist())]
+    ports = [list(device.links) for device in devices]
+
+    # Rows of a plain array view are much cheaper to create than rows of the memmap subclass
+    bitmaps = np.asarray(occupancy)
+    for row, (device, insertion_loss) in enumerate(zip(devices, topology["insertion_loss"].tolist())):
+        device.insertion_loss = insertion_loss
+        device.occupancy_bitmap = bitmaps[row]
+    for row, port, neighbor, neighbor_port, loss in zip(*_columns(topology["links"]), topology["link_loss"].tolist()):
+        devices[row].links[ports[row][port]] = NeighborInfo(devices[neighbor], ports[neighbor][neighbor_port], loss)
+    for row, port, rx, gain in zip(*_columns(topology["gains"]), topology["gain_values"].tolist()):
+        devices[row].gains[(ports[row][port], "RX" if rx else "TX")] = gain
+
+    # The channels are stored grouped by device, the occupancy bitmaps already contain them
+    channels = topology["channels"]
+    counts = np.bincount(channels[:, 0], minlength=len(devices)).tolist()
+    channel_list = Channel.from_arrays(channels[:, 1], channels[:, 2])
+    device_bitmaps = spectrum.range_bitmaps(channels[:, 0], channels[:, 1], channels[:, 1] + channels[:, 2],
+                                            len(devices))
+    start = 0
+    for device, count, device_bitmap in zip(devices, counts, device_bitmaps):
+        device.intervals = IntervalIndex(channel_list[start:start + count])
+        device.device_bitmap = device_bitmap
+        start += count
+
+    # The channels routed through the ports are stored grouped by device and port
+    port_channels = topology["port_channels"]
+    keys, key_rows = np.unique(port_channels[:, :3], axis=0, return_inverse=True)
+    key_rows = key_rows.reshape(-1)
+    port_bitmaps = spectrum.range_bitmaps(key_rows, port_channels[:, 3], port_channels[:, 3] + port_channels[:, 4],
+                                          len(keys))
+    order = np.argsort(key_rows, kind="stable")
+    counts = np.bincount(key_rows, minlength=len(keys)).tolist()
+    channel_list = Channel.from_arrays(port_channels[order, 3], port_channels[order, 4])
+    start = 0
+    for (row, port, rx), count, port_bitmap in zip(keys.tolist(), counts, port_bitmaps):
+        key = (ports[row][port], "RX" if rx else "TX")
+        devices[row].port_intervals[key] = IntervalIndex(channel_list[start:start + count])
+        devices[row].port_bitmaps[key] = port_bitmap
+        start += count
+
+    network = Network()
+    network.devices.update((device.name, device) for device in devices)
+    graph_ports = [(devices[row], ports[row][port]) for row, port in zip(*_columns(topology["graph_ports"]))]
+    network.port_graph.restore(graph_ports, topology["graph_edges"].astype(np.int64))
+    network.version += 1
+    return network
+
+
+def _columns(array: np.ndarray) -> List[list]:
+    """Convert the columns of a 2D array to lists, avoiding a list object per row.
+
+    Args:
+        array (np.ndarray): The array.
+
+    Returns:
+        List[list]: The columns.
+    """
+    return [column.tolist() for column in array.T]
+
+
+def _check_format(topology) -> None:
+    """Check that a snapshot can be loaded by this version.
+
+    Args:
+        topology (NpzFile): The topology arrays of the snapshot.
+
+    Returns:
+        None
+    """
+    assert int(topology["format"]) == SNAPSHOT_FORMAT, f"Unsupported snapshot format: {int(topology['format'])}"
+    assert int(topology["num_slots"]) == SPECTRUM["num_slots"], "The snapshot has a different spectrum grid"
+
+
+def _create_device(name: str, code: int, num_express_ports: int, num_client_ports: int) -> Device:
+    """Create a device without channels from its snapshot entry.
+
+    Args:
+        name (str): The name of the device.
+        code (int): The index of the device class in `DEVICE_CLASSES`.
+        num_express_ports (int): The number of express ports.
+        num_client_ports (int): The number of client ports.
+
+    Returns:
+        Device: The new device.
+    """
+    device_class = DEVICE_CLASSES[code]
+    if device_class is TerminalPoint:
+        return TerminalPoint(name)
+    if device_class is CzechLightLineDegree:
+        return CzechLightLineDegree(name, num_express_ports=num_express_ports)
+    return CzechLightAddDrop(name, num_express_ports=num_express_ports, num_client_ports=num_client_ports)
@@ -0,0 +1,111 @@
+import numpy as np
+
+from .channel import SPECTRUM
+
+WORD_BITS = 64
+NUM_WORDS = -(-SPECTRUM["num_slots"] // WORD_BITS)
+
+# Index of the grid slot containing each 1 GHz step of the spectrum
+_GHZ_TO_SLOT = (np.arange(SPECTRUM["bandwidth"]) / SPECTRUM["slot_width"]).astype(int)
+
+
+def empty_bitmap() -> np.ndarray:
+    """Create an occupancy bitmap with all slots free.
+
+    Bit ``i % 64`` of word ``i // 64`` represents the grid slot ``i``.
+
+    Returns:
+        np.ndarray: An array of ``NUM_WORDS`` zeroed uint64 words.
+    """
+    return np.zeros(NUM_WORDS, dtype=np.uint64)
+
+
+def _word_masks(start: int, stop: int):
+    """Yield the words touched by a slot range together with the mask of the range within each word.
+
+    Args:
+        start (int): The first slot of the range.
+        stop (int): The slot after the last one of the range.
+
+    Yields:
+        Tuple[int, np.uint64]: The word index and the bit mask of the range in that word.
+    """
+    first, last = start // WORD_BITS, (stop - 1) // WORD_BITS
+    for word in range(first, last + 1):
+        low = start - word * WORD_BITS if word == first else 0
+        high = stop - word * WORD_BITS if word == last else WORD_BITS
+        yield word, np.uint64(((1 << (high - low)) - 1) << low)
+
+
+def set_range(bitmap: np.ndarray, start: int, stop: int) -> None:
+    """Mark a range of slots as occupied. The bitmap is changed in place.
+
+    Args:
+        bitmap (np.ndarray): The occupancy bitmap.
+        start (int): The first slot of the range.
+        stop (int): The slot after the last one of the range.
+
+    Returns:
+        None
+    """
+    for word, mask in _word_masks(start, stop):
+        bitmap[word] |= mask
+
+
+def clear_range(bitmap: np.ndarray, start: int, stop: int) -> None:
+    """Mark a range of slots as free. The bitmap is changed in place.
+
+    Args:
+        bitmap (np.ndarray): The occupancy bitmap.
+        start (int): The first slot of the range.
+        stop (int): The slot after the last one of the range.
+
+    Returns:
+        None
+    """
+    for word, mask in _word_masks(start, stop):
+        bitmap[word] &= ~mask
+
+
+def range_bitmaps(rows: np.ndarray, starts: np.ndarray, stops: np.ndarray, num_rows: int) -> np.ndarray:
+    """Build a matrix of bitmaps from slot ranges, all at once.
+
+    Args:
+        rows (np.ndarray): The row of every range.
+        starts (np.ndarray): The first slot of every range.
+        stops (np.ndarray): The slot after the last one of every range.
+        num_rows (int): The number of bitmaps.
+
+    Returns:
+        np.ndarray: The (rows, words) matrix of the bitmaps, with the slots of the ranges of every row occupied.
+    """
+    steps = np.zeros((num_rows, NUM_WORDS * WORD_BITS + 1), dtype=np.int16)
+    np.add.at(steps, (rows, starts), 1)
+    np.add.at(steps, (rows, stops), -1)
+    occupied = np.cumsum(steps, axis=1, dtype=np.int16)[:, :-1] > 0
+    return np.packbits(occupied, axis=1, bitorder="little").view("<u8").astype(np.uint64)
+
+
+def to_slots(bitmap: np.ndarray) -> np.ndarray:
+    """Unpack a bitmap into a boolean array with one element per grid slot.
+
+    Args:
+        bitmap (np.ndarray): The occupancy bitmap, or a matrix of bitmaps with one bitmap per row.
+
+    Returns:
+        np.ndarray: The occupancy of each grid slot, one row per bitmap for a matrix.
+    """
+    bits = np.unpackbits(bitmap.astype("<u8").view(np.uint8), axis=-1, bitorder="little")
+    return bits[..., :SPECTRUM["num_slots"]].astype(bool)
+
+
+def to_spectrum(bitmap: np.ndarray) -> np.ndarray:
+    """Unpack a bitmap into a boolean array with one element per 1 GHz of the spectrum.
+
+    Args:
+        bitmap (np.ndarray): The occupancy bitmap.
+
+    Returns:
+        np.ndarray: The occupancy of each GHz of the spectrum.
+    """
+    return to_slots(bitmap)[_GHZ_TO_SLOT]
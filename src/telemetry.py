@@ -0,0 +1,461 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from . import spectrum
+from .channel import Channel, SPECTRUM
+
+# Operational data of czechlight-roadm-device, named after their YANG paths. The media channel powers are reported
+# per channel, the others per device.
+METRICS = ("aggregate-power/common-in", "aggregate-power/common-out", "line/osc/tx-power", "line/osc/rx-power",
+           "media-channels/power/common-in", "media-channels/power/common-out", "media-channels/power/leaf-in",
+           "media-channels/power/leaf-out")
+SCAN_PORTS = ("common-in", "common-out")
+
+# A streamed sample. The device is the index of the device name in `TelemetryStore.devices`, the metric the index
+# in METRICS, the slot the first grid slot of the media channel or -1 for device metrics. Powers are in dBm.
+SAMPLE_DTYPE = np.dtype([("time", "<f8"), ("device", "<i4"), ("metric", "<i2"), ("slot", "<i2"), ("value", "<f8")])
+
+
+class SeriesRing:
+    """Fixed-size ring buffers of many time series in two (series, capacity) matrices.
+
+    Samples are appended in batches: the batch is grouped by series with one sort, and every sample is written to
+    its ring position with a single fancy-indexed assignment, so no Python object is created per sample. Series
+    are identified by integer keys and allocated on first use, the matrices grow by doubling.
+    """
+
+    def __init__(self, capacity: int, dtype: type = np.float32):
+        """Initialize a SeriesRing instance.
+
+        Args:
+            capacity (int): The number of most recent samples kept per series.
+            dtype (type, optional): The value type. Defaults to np.float32.
+        """
+        assert capacity > 0, "The capacity must be positive"
+        self.capacity = capacity
+        self._index: Dict[int, int] = {}
+        self.times = np.zeros((16, capacity))
+        self.values = np.zeros((16, capacity), dtype=dtype)
+        self.counts = np.zeros(16, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def series(self, keys: Iterable[int], create: bool = False) -> np.ndarray:
+        """Get the rows of series.
+
+        Args:
+            keys (Iterable[int]): The series keys.
+            create (bool, optional): Allocate the unknown series. Defaults to False.
+
+        Returns:
+            np.ndarray: The row of every series, -1 for unknown series when not creating them.
+        """
+        rows = []
+        for key in keys:
+            row = self._index.get(key)
+            if row is None and create:
+                row = self._index[key] = len(self._index)
+            rows.append(-1 if row is None else row)
+
+        if len(self._index) > len(self.counts):
+            size = max(len(self._index), 2 * len(self.counts))
+            grow = size - len(self.counts)
+            self.times = np.concatenate((self.times, np.zeros((grow, self.capacity))))
+            self.values = np.concatenate((self.values, np.zeros((grow, self.capacity), dtype=self.values.dtype)))
+            self.counts = np.concatenate((self.counts, np.zeros(grow, dtype=np.int64)))
+        return np.array(rows, dtype=np.int64)
+
+    def append(self, keys: np.ndarray, times: np.ndarray, values: np.ndarray) -> None:
+        """Append a batch of samples.
+
+        The samples of every series must be in the order of their times. Only the last `capacity` samples of a
+        series in the batch are kept.
+
+        Args:
+            keys (np.ndarray): The series key of every sample.
+            times (np.ndarray): The time of every sample.
+            values (np.ndarray): The value of every sample.
+
+        Returns:
+            None
+        """
+        order = np.argsort(keys, kind="stable")
+        keys, times, values = keys[order], times[order], values[order]
+        unique, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+        rows = self.series(unique.tolist(), create=True)
+
+        rank = np.arange(len(keys)) - np.repeat(starts, counts)
+        sample_rows = np.repeat(rows, counts)
+        keep = rank >= np.repeat(counts, counts) - self.capacity
+        positions = (self.counts[sample_rows] + rank) % self.capacity
+
+        self.times[sample_rows[keep], positions[keep]] = times[keep]
+        self.values[sample_rows[keep], positions[keep]] = values[keep]
+        self.counts[rows] += counts
+
+    def latest(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the most recent sample of series.
+
+        Args:
+            rows (np.ndarray): The series rows, -1 for unknown series.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The time and the value of the last sample of every series, NaN for
+                series without samples.
+        """
+        counts = np.where(rows >= 0, self.counts[rows], 0)
+        positions = (counts - 1) % self.capacity
+        empty = counts == 0
+        return (np.where(empty, np.nan, self.times[rows, positions]),
+                np.where(empty, np.nan, self.values[rows, positions]))
+
+    def window(self, rows: np.ndarray, start: float = -np.inf, stop: float = np.inf) -> "WindowStats":
+        """Aggregate the samples of series in a time window.
+
+        Args:
+            rows (np.ndarray): The series rows, -1 for unknown series.
+            start (float, optional): The first time of the window. Defaults to -inf.
+            stop (float, optional): The time after the window. Defaults to inf.
+
+        Returns:
+            WindowStats: The statistics of every series.
+        """
+        counts = np.where(rows >= 0, self.counts[rows], 0)
+        times, values = self.times[rows], self.values[rows].astype(float)
+        valid = (np.arange(self.capacity) < counts[:, None]) & (times >= start) & (times < stop)
+
+        count = valid.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(valid, values, 0.0).sum(axis=1) / count
+        minimum = np.where(valid, values, np.inf).min(axis=1, initial=np.inf)
+        maximum = np.where(valid, values, -np.inf).max(axis=1, initial=-np.inf)
+        empty = count == 0
+        return WindowStats(count, np.where(empty, np.nan, mean), np.where(empty, np.nan, minimum),
+                           np.where(empty, np.nan, maximum))
+
+
+@dataclass
+class WindowStats:
+    """Statistics of series in a time window, one element per series.
+
+    Attributes:
+        count (np.ndarray): The number of samples.
+        mean (np.ndarray): The mean value, NaN without samples.
+        min (np.ndarray): The minimal value, NaN without samples.
+        max (np.ndarray): The maximal value, NaN without samples.
+    """
+    count: np.ndarray
+    mean: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+
+
+@dataclass
+class SpectrumMismatch:
+    """Difference between the measured spectrum of a device and its planned occupancy.
+
+    Attributes:
+        device (str): The name of the device.
+        time (float): The time of the compared scan.
+        unexpected (np.ndarray): The grid slots with power above the threshold but no planned channel.
+        missing (np.ndarray): The grid slots of planned channels with power below the threshold.
+    """
+    device: str
+    time: float
+    unexpected: np.ndarray
+    missing: np.ndarray
+
+    @property
+    def ok(self) -> bool:
+        """Check if the measured spectrum matches the plan.
+
+        Returns:
+            bool: True if no slot differs, False otherwise.
+        """
+        return len(self.unexpected) == 0 and len(self.missing) == 0
+
+
+def resample_scan(lowest_frequency: float, step: float, powers: np.ndarray) -> np.ndarray:
+    """Average a spectrum scan over the grid slots.
+
+    The powers of the scan points falling into a slot are averaged in mW.
+
+    Args:
+        lowest_frequency (float): The frequency of the first scan point in GHz.
+        step (float): The distance of the scan points in GHz.
+        powers (np.ndarray): The power of every scan point in dBm.
+
+    Returns:
+        np.ndarray: The power of every grid slot in dBm, NaN for slots without scan points.
+    """
+    powers = np.asarray(powers, dtype=float)
+    frequencies = lowest_frequency + step * np.arange(len(powers))
+    slots = np.floor((frequencies - SPECTRUM["lower_bound"]) / SPECTRUM["slot_width"]).astype(np.int64)
+    inside = (slots >= 0) & (slots < SPECTRUM["num_slots"])
+
+    total = np.bincount(slots[inside], weights=10 ** (powers[inside] / 10), minlength=SPECTRUM["num_slots"])
+    count = np.bincount(slots[inside], minlength=SPECTRUM["num_slots"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, 10 * np.log10(total / count), np.nan)
+
+
+class TelemetryStore:
+    """Streamed operational data of the devices in fixed-size NumPy ring buffers.
+
+    Scalar samples (aggregate powers, OSC powers and media channel powers) are ingested as arrays of SAMPLE_DTYPE
+    records. Spectrum scans are resampled to the grid slots and kept per device and port as rows of a
+    (capacity, slots) matrix. The queries take many devices at once and return arrays.
+
+    Attributes:
+        devices (List[str]): The device names, the device field of a sample is an index into this list.
+        samples (SeriesRing): The scalar series.
+    """
+
+    def __init__(self, devices: Iterable[str], capacity: int = 1024, scan_capacity: int = 16):
+        """Initialize a TelemetryStore instance.
+
+        Args:
+            devices (Iterable[str]): The device names, e.g. `network.devices`.
+            capacity (int, optional): The number of samples kept per series. Defaults to 1024.
+            scan_capacity (int, optional): The number of spectrum scans kept per device port. Defaults to 16.
+        """
+        self.devices: List[str] = list(devices)
+        self._device_index = {name: i for i, name in enumerate(self.devices)}
+        self.samples = SeriesRing(capacity)
+        self.scan_capacity = scan_capacity
+        self._scans: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, List[int]]] = {}
+
+    @staticmethod
+    def _keys(devices: np.ndarray, metrics: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """Combine the device, metric and slot of samples into series keys.
+
+        Args:
+            devices (np.ndarray): The device indices.
+            metrics (np.ndarray): The metric indices.
+            slots (np.ndarray): The channel slots, -1 for device metrics.
+
+        Returns:
+            np.ndarray: The series keys.
+        """
+        return ((devices.astype(np.int64) * len(METRICS) + metrics) * (SPECTRUM["num_slots"] + 1)) + slots + 1
+
+    def ingest(self, samples: np.ndarray) -> int:
+        """Append a batch of samples.
+
+        Args:
+            samples (np.ndarray): The samples as SAMPLE_DTYPE records, in the order of their times.
+
+        Returns:
+            int: The number of samples ingested.
+        """
+        assert samples.dtype == SAMPLE_DTYPE, "The samples must be SAMPLE_DTYPE records"
+        if len(samples) == 0:
+            return 0
+        keys = self._keys(samples["device"], samples["metric"], samples["slot"])
+        self.samples.append(keys, samples["time"], samples["value"])
+        return len(samples)
+
+    def ingest_file(self, filename: str, chunk_size: int = 1 << 20) -> int:
+        """Ingest samples from a .npy file of SAMPLE_DTYPE records, mapped and read in chunks.
+
+        Args:
+            filename (str): The path of the file.
+            chunk_size (int, optional): The number of samples per batch. Defaults to 2^20.
+
+        Returns:
+            int: The number of samples ingested.
+        """
+        records = np.load(filename, mmap_mode="r")
+        return sum(self.ingest(np.asarray(records[start:start + chunk_size]))
+                   for start in range(0, len(records), chunk_size))
+
+    def ingest_scan(self, device: str, port: str, time: float, lowest_frequency: float, step: float,
+                    powers: np.ndarray) -> None:
+        """Append a spectrum scan, the spectral-scan-result of the device at a port.
+
+        Args:
+            device (str): The name of the device.
+            port (str): The scanned port, one of SCAN_PORTS.
+            time (float): The time of the scan.
+            lowest_frequency (float): The frequency of the first scan point in GHz.
+            step (float): The distance of the scan points in GHz.
+            powers (np.ndarray): The `p` list, the power of every scan point in dBm.
+
+        Returns:
+            None
+        """
+        assert port in SCAN_PORTS, f"Invalid scan port: {port}"
+        key = (device, port)
+        if key not in self._scans:
+            self._scans[key] = (np.zeros(self.scan_capacity),
+                                np.full((self.scan_capacity, SPECTRUM["num_slots"]), np.nan, dtype=np.float32), [0])
+        times, scans, count = self._scans[key]
+        position = count[0] % self.scan_capacity
+        times[position] = time
+        scans[position] = resample_scan(lowest_frequency, step, powers)
+        count[0] += 1
+
+    def _rows(self, metric: str, devices: Iterable[str], channel: Optional[Channel]) -> np.ndarray:
+        """Get the series rows of a metric of devices.
+
+        Args:
+            metric (str): The metric, one of METRICS.
+            devices (Iterable[str]): The device names.
+            channel (Optional[Channel]): The media channel of channel metrics, None for device metrics.
+
+        Returns:
+            np.ndarray: The series rows, -1 for series without samples.
+        """
+        assert metric in METRICS, f"Unknown metric: {metric}"
+        indices = np.array([self._device_index[name] for name in devices], dtype=np.int64)
+        keys = self._keys(indices, METRICS.index(metric), -1 if channel is None else channel.start_slot)
+        return self.samples.series(keys.tolist())
+
+    def latest(self, metric: str, devices: Iterable[str], channel: Channel = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the most recent value of a metric of devices.
+
+        Args:
+            metric (str): The metric, one of METRICS.
+            devices (Iterable[str]): The device names.
+            channel (Channel, optional): The media channel of channel metrics. Defaults to None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The time and the value of every device, NaN without samples.
+        """
+        return self.samples.latest(self._rows(metric, devices, channel))
+
+    def window(self, metric: str, devices: Iterable[str], start: float = -np.inf, stop: float = np.inf,
+               channel: Channel = None) -> WindowStats:
+        """Get the mean, minimum and maximum of a metric of devices in a time window.
+
+        Args:
+            metric (str): The metric, one of METRICS.
+            devices (Iterable[str]): The device names.
+            start (float, optional): The first time of the window. Defaults to -inf.
+            stop (float, optional): The time after the window. Defaults to inf.
+            channel (Channel, optional): The media channel of channel metrics. Defaults to None.
+
+        Returns:
+            WindowStats: The statistics of every device.
+        """
+        return self.samples.window(self._rows(metric, devices, channel), start, stop)
+
+    def latest_scan(self, device: str, port: str = "common-out") -> Tuple[float, Optional[np.ndarray]]:
+        """Get the most recent spectrum scan of a device port.
+
+        Args:
+            device (str): The name of the device.
+            port (str, optional): The scanned port. Defaults to "common-out".
+
+        Returns:
+            Tuple[float, Optional[np.ndarray]]: The time of the scan and the power of every grid slot in dBm,
+                NaN and None without a scan.
+        """
+        times, scans, count = self._scans.get((device, port), (None, None, [0]))
+        if count[0] == 0:
+            return np.nan, None
+        position = (count[0] - 1) % self.scan_capacity
+        return float(times[position]), scans[position]
+
+    def compare_spectrum(self, devices: Iterable, port: str = "common-out",
+                         threshold: float = -30.0) -> List[SpectrumMismatch]:
+        """Compare the latest spectrum scans of devices with their planned occupancy.
+
+        The comparison is done on the 6.25 GHz grid slots of the occupancy bitmaps, for all devices at once. Slots
+        without scan points are not compared.
+
+        Args:
+            devices (Iterable[Device]): The devices.
+            port (str, optional): The scanned port. Defaults to "common-out".
+            threshold (float, optional): The power in dBm above which a slot is lit. Defaults to -30.0.
+
+        Returns:
+            List[SpectrumMismatch]: The differences of every device with a scan.
+        """
+        devices = list(devices)
+        scanned = [(device, *self.latest_scan(device.name, port)) for device in devices]
+        scanned = [(device, time, scan) for device, time, scan in scanned if scan is not None]
+        if not scanned:
+            return []
+
+        measured = np.stack([scan for _, _, scan in scanned])
+        planned = spectrum.to_slots(np.stack([device.occupancy_bitmap for device, _, _ in scanned]))
+        known = ~np.isnan(measured)
+        with np.errstate(invalid="ignore"):
+            lit = measured > threshold
+        unexpected = known & lit & ~planned
+        missing = known & ~lit & planned
+        return [SpectrumMismatch(device.name, time, np.flatnonzero(unexpected[i]), np.flatnonzero(missing[i]))
+                for i, (device, time, _) in enumerate(scanned)]
+
+
+class StubFeed:
+    """Local source of synthetic telemetry consistent with the planned channels of a network.
+
+    Every device reports its aggregate and OSC powers, and the media channel powers of its channels. The scans
+    show the planned channels at the launch power and a noise floor elsewhere, all with Gaussian noise.
+    """
+
+    def __init__(self, network, launch_power: float = 0.0, noise_floor: float = -60.0, noise: float = 0.5,
+                 seed: int = None):
+        """Initialize a StubFeed instance.
+
+        Args:
+            network (Network): The network to report on.
+            launch_power (float, optional): The power of the channels in dBm. Defaults to 0.0.
+            noise_floor (float, optional): The power of the dark spectrum in dBm. Defaults to -60.0.
+            noise (float, optional): The standard deviation of the noise in dB. Defaults to 0.5.
+            seed (int, optional): Seed of the random generator. Defaults to None.
+        """
+        self.devices = list(network.devices.values())
+        self.launch_power = launch_power
+        self.noise_floor = noise_floor
+        self.noise = noise
+        self._random = np.random.default_rng(seed)
+
+    def samples(self, time: float) -> np.ndarray:
+        """Generate one round of scalar samples of all devices.
+
+        Args:
+            time (float): The time of the samples.
+
+        Returns:
+            np.ndarray: The SAMPLE_DTYPE records, with devices indexed in the order of `network.devices`.
+        """
+        channel_metrics = np.arange(4, 8)
+        count = len(self.devices)
+        devices = [np.repeat(np.arange(count), 4)]
+        metrics = [np.tile(np.arange(4), count)]
+        slots = [np.full(4 * count, -1)]
+        for i, device in enumerate(self.devices):
+            starts = np.array([channel.start_slot for channel in device.channels], dtype=np.int64)
+            devices.append(np.full(4 * len(starts), i))
+            metrics.append(np.tile(channel_metrics, len(starts)))
+            slots.append(starts.repeat(4))
+
+        records = np.empty(sum(len(part) for part in devices), dtype=SAMPLE_DTYPE)
+        records["time"] = time
+        records["device"] = np.concatenate(devices)
+        records["metric"] = np.concatenate(metrics)
+        records["slot"] = np.concatenate(slots)
+        records["value"] = self.launch_power + self._random.normal(0.0, self.noise, len(records))
+        return records
+
+    def scan(self, device, step: float = 3.125) -> Tuple[float, float, np.ndarray]:
+        """Generate a spectrum scan of a device.
+
+        Args:
+            device (Device): The device.
+            step (float, optional): The distance of the scan points in GHz. Defaults to 3.125.
+
+        Returns:
+            Tuple[float, float, np.ndarray]: The lowest frequency, the step and the scan point powers in dBm.
+        """
+        frequencies = SPECTRUM["lower_bound"] + step * (np.arange(int(SPECTRUM["bandwidth"] / step)) + 0.5)
+        slots = ((frequencies - SPECTRUM["lower_bound"]) / SPECTRUM["slot_width"]).astype(np.int64)
+        lit = spectrum.to_slots(device.occupancy_bitmap)[slots]
+        powers = np.where(lit, self.launch_power, self.noise_floor)
+        return float(frequencies[0]), step, powers + self._random.normal(0.0, self.noise, len(powers))
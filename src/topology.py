@@ -0,0 +1,266 @@
+import os
+import json
+from typing import Dict, List, Tuple
+
+import yaml
+import numpy as np
+import networkx as nx
+
+from .network import Network
+from .channel import Channel, create_random_channels
+from .device import CzechLightAddDrop, CzechLightLineDegree, Device, TerminalPoint
+
+DEVICE_PROFILES = os.path.join(os.path.dirname(__file__), os.pardir, "config", "devices.yaml")
+
+# Device types of the topology files and their default profiles in devices.yaml
+DEVICE_TYPES = {
+    "line_degree": "default",
+    "add_drop": "coherent",
+    "terminal_point": None,
+}
+
+
+def _read(filename: str) -> dict:
+    """Read a YAML or JSON file, chosen by the file extension.
+
+    Args:
+        filename (str): The path of the file.
+
+    Returns:
+        dict: The content of the file.
+    """
+    with open(filename) as f:
+        return json.load(f) if filename.endswith(".json") else yaml.safe_load(f)
+
+
+def load_profiles(filename: str = DEVICE_PROFILES) -> Dict[str, Dict[str, dict]]:
+    """Load the port profiles of the device types.
+
+    Args:
+        filename (str, optional): The profiles file. Defaults to config/devices.yaml.
+
+    Returns:
+        Dict[str, Dict[str, dict]]: The port counts of every profile, indexed by the device type and profile name.
+    """
+    return _read(filename)
+
+
+def create_device(spec: dict, profiles: Dict[str, Dict[str, dict]]) -> Device:
+    """Create a device from its topology file entry.
+
+    The port counts are taken from the profile of the device type, explicit `intra_ports` and `client_ports`
+    of the entry take precedence.
+
+    Args:
+        spec (dict): The entry with the `name`, `type` and optional `profile`, port counts, `channels` given as
+            [lower, upper] frequency pairs, `port_channels` routed through single ports given as lists of such
+            pairs indexed by "PORT:DIRECTION" keys, `insertion_loss` in dB and amplifier `gains` in dB indexed by
+            "PORT:DIRECTION" keys.
+        profiles (Dict[str, Dict[str, dict]]): The port profiles of the device types.
+
+    Returns:
+        Device: The new device.
+    """
+    device_type = spec["type"]
+    assert device_type in DEVICE_TYPES, f"Invalid device type: {device_type}"
+    if device_type == "terminal_point":
+        return _set_power_parameters(TerminalPoint(spec["name"]), spec)
+
+    profile = spec.get("profile", DEVICE_TYPES[device_type])
+    assert profile in profiles[device_type], f"Invalid {device_type} profile: {profile}"
+    ports = dict(profiles[device_type][profile])
+    ports.update({key: spec[key] for key in ("intra_ports", "client_ports") if key in spec})
+    channels = [Channel(lower, upper) for lower, upper in spec.get("channels", [])]
+
+    if device_type == "line_degree":
+        assert ports["line_ports"] == 1, "Line degrees have a single line port"
+        device = CzechLightLineDegree(spec["name"], channels, num_express_ports=ports["intra_ports"])
+    else:
+        device = CzechLightAddDrop(spec["name"], channels, num_express_ports=ports["intra_ports"],
+                                   num_client_ports=ports["client_ports"])
+
+    # A channel is added once with all its ports, as the ports it reaches inside the device are stored as well
+    routed: Dict[Channel, List[Tuple[str, str]]] = {}
+    for key, port_channels in spec.get("port_channels", {}).items():
+        for lower, upper in port_channels:
+            routed.setdefault(Channel(lower, upper), []).append(_port_key(device, key))
+    for channel, channel_ports in routed.items():
+        device.add_channels([channel], channel_ports)
+    return _set_power_parameters(device, spec)
+
+
+def _set_power_parameters(device: Device, spec: dict) -> Device:
+    """Set the insertion loss and the amplifier gains of a device from its topology file entry.
+
+    Args:
+        device (Device): The device.
+        spec (dict): The topology file entry of the device.
+
+    Returns:
+        Device: The device.
+    """
+    device.insertion_loss = spec.get("insertion_loss", 0.0)
+    for key, gain in spec.get("gains", {}).items():
+        device.gains[_port_key(device, key)] = gain
+    return device
+
+
+def _port_key(device: Device, key: str) -> Tuple[str, str]:
+    """Parse a "PORT:DIRECTION" key of a topology file entry.
+
+    Args:
+        device (Device): The device of the port.
+        key (str): The key.
+
+    Returns:
+        Tuple[str, str]: The port and the direction.
+    """
+    port, direction = key.split(":")
+    assert port in device.links, f"Invalid port {port} of {device.name}"
+    assert direction in ("TX", "RX"), f"Invalid direction: {direction}"
+    return port, direction
+
+
+def load_topology(filename: str, profiles_file: str = DEVICE_PROFILES) -> Network:
+    """Build a network from a YAML or JSON topology file.
+
+    The file contains a list of `devices` (see `create_device`) and a list of `links`, each given as
+    [device A, port A, device B, port B] with an optional span loss in dB as the fifth element. All devices and all
+    links are inserted in bulk.
+
+    Args:
+        filename (str): The topology file.
+        profiles_file (str, optional): The port profiles file. Defaults to config/devices.yaml.
+
+    Returns:
+        Network: The network.
+    """
+    topology = _read(filename)
+    profiles = load_profiles(profiles_file)
+
+    network = Network()
+    network.add_devices(create_device(spec, profiles) for spec in topology.get("devices", []))
+    network.add_bidi_links(tuple(link) for link in topology.get("links", []))
+    return network
+
+
+def topology_dict(network: Network) -> dict:
+    """Describe a network in the format of the topology files.
+
+    Args:
+        network (Network): The network.
+
+    Returns:
+        dict: The devices and the links of the network.
+    """
+    devices = []
+    for device in network.devices.values():
+        spec = {"name": device.name}
+        if isinstance(device, TerminalPoint):
+            spec["type"] = "terminal_point"
+        elif isinstance(device, CzechLightLineDegree):
+            spec.update(type="line_degree", intra_ports=device.num_express_ports)
+        else:
+            spec.update(type="add_drop", intra_ports=device.num_express_ports, client_ports=device.num_client_ports)
+        if device.intervals.channels:
+            spec["channels"] = [[channel.lower_frequency, channel.upper_frequency] for channel in device.intervals]
+        if device.port_intervals:
+            spec["port_channels"] = {f"{port}:{direction}": [[channel.lower_frequency, channel.upper_frequency]
+                                                             for channel in index]
+                                     for (port, direction), index in device.port_intervals.items()}
+        if device.insertion_loss:
+            spec["insertion_loss"] = device.insertion_loss
+        if device.gains:
+            spec["gains"] = {f"{port}:{direction}": gain for (port, direction), gain in device.gains.items()}
+        devices.append(spec)
+
+    links, seen = [], set()
+    for device in network.devices.values():
+        for port, info in device.links.items():
+            if info is not None and (info.device.name, info.device_port) not in seen:
+                seen.add((device.name, port))
+                link = [device.name, port, info.device.name, info.device_port]
+                links.append(link + [info.loss] if info.loss else link)
+
+    return {"devices": devices, "links": links}
+
+
+def save_topology(network: Network, filename: str) -> None:
+    """Save a network to a YAML or JSON topology file, chosen by the file extension.
+
+    Args:
+        network (Network): The network.
+        filename (str): The topology file.
+
+    Returns:
+        None
+    """
+    topology = topology_dict(network)
+    with open(filename, "w") as f:
+        if filename.endswith(".json"):
+            json.dump(topology, f)
+        else:
+            yaml.safe_dump(topology, f, sort_keys=False, default_flow_style=None)
+
+
+def generate_mesh(num_sites: int, degree: int, add_drops: int = 1, terminals: int = 1, channels: int = 4,
+                  bandwidths: List[int] = None, seed: int = None) -> Network:
+    """Generate a mesh network of ROADM sites.
+
+    Every site has `degree` line degrees, fully interconnected through their express ports, and `add_drops`
+    add/drop devices connected to every line degree, each with `terminals` terminal points. The line ports
+    connect the sites into a random `degree`-regular graph. Every line degree and add/drop device is
+    pre-populated with random channels.
+
+    Devices are named after their site index, e.g. "LN2_S17", "AD1_S17" and "TP1_1_S17".
+
+    Args:
+        num_sites (int): The number of sites.
+        degree (int): The number of line degrees of every site.
+        add_drops (int, optional): The number of add/drop devices of every site. Defaults to 1.
+        terminals (int, optional): The number of terminal points of every add/drop device. Defaults to 1.
+        channels (int, optional): The number of random channels of every device. Defaults to 4.
+        bandwidths (List[int], optional): The bandwidths of the random channels in GHz. Defaults to None (50 GHz).
+        seed (int, optional): Seed of the random generator. Defaults to None.
+
+    Returns:
+        Network: The generated network.
+    """
+    assert num_sites > degree and num_sites * degree % 2 == 0, \
+        "The sites must form a regular graph: more sites than degrees and an even number of line ports"
+    assert degree - 1 + add_drops <= 8 and degree <= 8, "Line degrees and add/drop devices have 8 express ports"
+
+    rng = np.random.default_rng(seed)
+    site_graph = nx.random_regular_graph(degree, num_sites, seed=int(rng.integers(2 ** 32)))
+
+    devices: List[Device] = []
+    links: List[Tuple[str, str, str, str]] = []
+    for site in range(num_sites):
+        degrees = [f"LN{i}_S{site}" for i in range(1, degree + 1)]
+        devices += [CzechLightLineDegree(name, create_random_channels(channels, bandwidths, rng, disjoint=True))
+                    for name in degrees]
+
+        for i in range(degree):
+            for j in range(i + 1, degree):
+                links.append((degrees[i], f"E{j}", degrees[j], f"E{i + 1}"))
+
+        for a in range(1, add_drops + 1):
+            add_drop = f"AD{a}_S{site}"
+            add_drop_channels = create_random_channels(channels, bandwidths, rng, disjoint=True)
+            devices.append(CzechLightAddDrop(add_drop, add_drop_channels, num_client_ports=max(terminals, 8)))
+            links += [(name, f"E{degree - 1 + a}", add_drop, f"E{i}") for i, name in enumerate(degrees, start=1)]
+
+            for t in range(1, terminals + 1):
+                devices.append(TerminalPoint(f"TP{a}_{t}_S{site}"))
+                links.append((add_drop, f"C{t}", f"TP{a}_{t}_S{site}", "C"))
+
+    free_degree = [1] * num_sites
+    for site_a, site_b in site_graph.edges:
+        links.append((f"LN{free_degree[site_a]}_S{site_a}", "LINE", f"LN{free_degree[site_b]}_S{site_b}", "LINE"))
+        free_degree[site_a] += 1
+        free_degree[site_b] += 1
+
+    network = Network()
+    network.add_devices(devices)
+    network.add_bidi_links(links)
+    return network
@@ -0,0 +1,328 @@
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .path import NetworkPath
+from .device import Device
+from .channel import Channel
+from .intervals import ChannelConflictError
+from .assignment import assign_channel
+from .restconf import PushResult
+
+RESERVED, COMMITTED, ROLLED_BACK, EXPIRED = "reserved", "committed", "rolled-back", "expired"
+
+
+class ReservationExpiredError(RuntimeError):
+    """Raised when a transaction is committed after its reservation expired."""
+
+
+class PushFailedError(RuntimeError):
+    """Raised when some devices did not accept the configuration of a reserved channel."""
+
+
+class Transaction:
+    """A channel reserved on all directional ports of a path, waiting to be committed or rolled back.
+
+    The channel occupies the ports from the reservation on, so other reservations and assignments see it. A
+    transaction which is neither committed nor rolled back before its deadline expires and its spectrum is freed.
+
+    Used as a context manager, the transaction is committed when the block succeeds and rolled back when it raises.
+    A configuration push reports rejected devices in its results instead of raising, `check_push` turns them into an
+    exception, so the block rolls the reservation back.
+
+    Attributes:
+        channel (Channel): The reserved channel.
+        devices (List[Device]): The devices holding the reservation, in the locking order.
+        ports (Dict[Device, List[Tuple[str, str]]]): The (port, direction) pairs holding the reservation on each
+            device.
+        deadline (float): The clock time the reservation expires at.
+        state (str): "reserved", "committed", "rolled-back" or "expired".
+    """
+
+    def __init__(self, manager: "ReservationManager", channel: Channel, ports: Dict[Device, List[Tuple[str, str]]],
+                 deadline: float):
+        """Initialize a Transaction instance.
+
+        Args:
+            manager (ReservationManager): The manager of the reservation.
+            channel (Channel): The reserved channel.
+            ports (Dict[Device, List[Tuple[str, str]]]): The (port, direction) pairs holding the reservation,
+                indexed by their devices.
+            deadline (float): The clock time the reservation expires at.
+        """
+        self.channel = channel
+        self.devices = sorted(ports, key=lambda device: device.name)
+        self.ports = ports
+        self.deadline = deadline
+        self.state = RESERVED
+        self._manager = manager
+
+        # Devices still holding the channel, an expired reservation is released device by device
+        self._held = set(ports)
+
+    def commit(self) -> None:
+        """Make the reservation permanent.
+
+        Returns:
+            None
+
+        Raises:
+            ReservationExpiredError: If the reservation expired, its spectrum is freed on all devices.
+        """
+        self._manager.finish(self, commit=True)
+
+    def rollback(self) -> None:
+        """Free the reserved spectrum on all devices. Does nothing if the transaction is already finished.
+
+        Returns:
+            None
+        """
+        self._manager.finish(self, commit=False)
+
+    def check_push(self, results: Dict[str, PushResult]) -> None:
+        """Check that every device accepted the pushed configuration of the channel.
+
+        Args:
+            results (Dict[str, PushResult]): The push results, indexed by the device names.
+
+        Returns:
+            None
+
+        Raises:
+            PushFailedError: If any push failed, the transaction is then rolled back by its context manager.
+        """
+        failed = [f"{device}: {result.error}" for device, result in results.items() if not result.ok]
+        if failed:
+            raise PushFailedError(f"The configuration of {self.channel} was rejected by " + ", ".join(failed))
+
+    def __enter__(self) -> "Transaction":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def __repr__(self) -> str:
+        return f"Transaction({self.channel}, {len(self.devices)} devices, {self.state})"
+
+
+class ReservationManager:
+    """Reserve channels atomically on all directional ports of a path, with per-device locks.
+
+    Every device has its own lock, and a reservation locks only the devices of its path, always in the order of
+    their names, so reservations on disjoint paths run in parallel threads and overlapping ones cannot deadlock.
+    Expired reservations are released lazily on a device whenever a later reservation locks it, or all at once by
+    `expire`.
+    """
+
+    def __init__(self, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """Initialize a ReservationManager instance.
+
+        Args:
+            ttl (float, optional): The default time to live of a reservation in seconds. Defaults to 30.0.
+            clock (Callable[[], float], optional): The clock of the deadlines. Defaults to time.monotonic.
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._locks: Dict[Device, threading.Lock] = {}
+
+        # Uncommitted transactions holding a channel on every device, only accessed under the lock of the device
+        self._pending: Dict[Device, Dict[int, Transaction]] = {}
+
+    def lock(self, device: Device) -> threading.Lock:
+        """Get the lock of a device.
+
+        Args:
+            device (Device): The device.
+
+        Returns:
+            threading.Lock: The lock, created on first use.
+        """
+        lock = self._locks.get(device)
+        if lock is None:
+            # setdefault is atomic, two threads creating the lock at once get the same one
+            lock = self._locks.setdefault(device, threading.Lock())
+        return lock
+
+    def _acquire(self, devices: List[Device]) -> None:
+        """Lock devices in the order of the list.
+
+        Args:
+            devices (List[Device]): The devices, sorted by their names.
+
+        Returns:
+            None
+        """
+        for device in devices:
+            self.lock(device).acquire()
+
+    def _release(self, devices: List[Device]) -> None:
+        """Unlock devices.
+
+        Args:
+            devices (List[Device]): The devices.
+
+        Returns:
+            None
+        """
+        for device in reversed(devices):
+            self.lock(device).release()
+
+    def reserve(self, path: NetworkPath, channel: Channel, ttl: float = None) -> Transaction:
+        """Reserve a channel on every directional port of a path, or on none of them.
+
+        Args:
+            path (NetworkPath): The path.
+            channel (Channel): The channel.
+            ttl (float, optional): The time to live of the reservation in seconds. Defaults to None (the default
+                of the manager).
+
+        Returns:
+            Transaction: The reservation.
+
+        Raises:
+            ChannelConflictError: If the channel overlaps a channel or a live reservation on any of the ports.
+        """
+        ports = path.device_ports
+        devices = sorted(ports, key=lambda device: device.name)
+        self._acquire(devices)
+        try:
+            self._check(ports, channel)
+            return self._hold(ports, channel, ttl)
+        finally:
+            self._release(devices)
+
+    def reserve_spectrum(self, path: NetworkPath, bandwidth: float, policy: str = "first-fit",
+                         ttl: float = None) -> Optional[Transaction]:
+        """Assign a free channel on a path and reserve it in one step.
+
+        Args:
+            path (NetworkPath): The path.
+            bandwidth (float): The requested channel width in GHz.
+            policy (str, optional): The spectrum assignment policy. Defaults to "first-fit".
+            ttl (float, optional): The time to live of the reservation in seconds. Defaults to None (the default
+                of the manager).
+
+        Returns:
+            Optional[Transaction]: The reservation, None if the path has no free range wide enough.
+        """
+        ports = path.device_ports
+        devices = sorted(ports, key=lambda device: device.name)
+        self._acquire(devices)
+        try:
+            for device in devices:
+                self._expire_device(device)
+            channel = assign_channel(path, bandwidth, policy)
+            return None if channel is None else self._hold(ports, channel, ttl)
+        finally:
+            self._release(devices)
+
+    def _check(self, ports: Dict[Device, List[Tuple[str, str]]], channel: Channel) -> None:
+        """Check that a channel is free on ports of locked devices, releasing the expired reservations in its way.
+
+        Args:
+            ports (Dict[Device, List[Tuple[str, str]]]): The (port, direction) pairs, indexed by the locked devices.
+            channel (Channel): The channel.
+
+        Returns:
+            None
+
+        Raises:
+            ChannelConflictError: If the channel overlaps a channel or a live reservation on any of the ports.
+        """
+        for device, device_ports in ports.items():
+            if not device.is_free(*channel.slot_range, device_ports):
+                self._expire_device(device)
+                conflicts = device.overlapping(*channel.slot_range, device_ports)
+                if conflicts:
+                    raise ChannelConflictError(f"{channel} overlaps {conflicts[0]} on {device.name}")
+
+    def _hold(self, ports: Dict[Device, List[Tuple[str, str]]], channel: Channel, ttl: Optional[float]) \
+            -> Transaction:
+        """Occupy a free channel on ports of locked devices and register the transaction.
+
+        Args:
+            ports (Dict[Device, List[Tuple[str, str]]]): The (port, direction) pairs, indexed by the locked devices.
+            channel (Channel): The channel.
+            ttl (Optional[float]): The time to live in seconds, None for the default.
+
+        Returns:
+            Transaction: The reservation.
+        """
+        transaction = Transaction(self, channel, ports, self.clock() + (self.ttl if ttl is None else ttl))
+        for device, device_ports in ports.items():
+            device.add_channels([channel], device_ports)
+            self._pending.setdefault(device, {})[id(transaction)] = transaction
+        return transaction
+
+    def _expire_device(self, device: Device) -> None:
+        """Release the expired reservations of a locked device.
+
+        Args:
+            device (Device): The locked device.
+
+        Returns:
+            None
+        """
+        now = self.clock()
+        pending = self._pending.get(device, {})
+        for key, transaction in list(pending.items()):
+            if transaction.deadline < now:
+                del pending[key]
+                device.remove_channels([transaction.channel], transaction.ports[device])
+                transaction._held.discard(device)
+                transaction.state = EXPIRED
+
+    def finish(self, transaction: Transaction, commit: bool) -> None:
+        """Commit or roll back a transaction.
+
+        Args:
+            transaction (Transaction): The transaction.
+            commit (bool): Commit the transaction, otherwise roll it back.
+
+        Returns:
+            None
+
+        Raises:
+            ReservationExpiredError: If a transaction to commit has expired.
+        """
+        self._acquire(transaction.devices)
+        try:
+            if transaction.state in (COMMITTED, ROLLED_BACK):
+                assert not commit or transaction.state == COMMITTED, "The transaction was rolled back"
+                return
+
+            expired = transaction.state == EXPIRED or transaction.deadline < self.clock()
+            for device in transaction.devices:
+                self._pending.get(device, {}).pop(id(transaction), None)
+            if not commit or expired:
+                for device in transaction.devices:
+                    if device in transaction._held:
+                        device.remove_channels([transaction.channel], transaction.ports[device])
+                transaction._held.clear()
+
+            if not commit:
+                transaction.state = ROLLED_BACK
+            elif expired:
+                transaction.state = EXPIRED
+                raise ReservationExpiredError(f"The reservation of {transaction.channel} expired")
+            else:
+                transaction.state = COMMITTED
+        finally:
+            self._release(transaction.devices)
+
+    def expire(self) -> int:
+        """Release all expired reservations.
+
+        Returns:
+            int: The number of expired transactions released.
+        """
+        now = self.clock()
+        expired = {id(transaction): transaction for pending in list(self._pending.values())
+                   for transaction in list(pending.values()) if transaction.deadline < now}
+        for transaction in expired.values():
+            self.finish(transaction, commit=False)
+            transaction.state = EXPIRED
+        return len(expired)
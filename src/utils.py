@@ -1,4 +1,6 @@
-from typing import List
+import os
+import tempfile
+from typing import BinaryIO, Callable, List
 from .device import DirectionalPort
 
 
@@ -14,3 +16,23 @@ def condense_path(path: List[DirectionalPort]) -> List[str]:
 
     return [node.device.name for i, node in enumerate(path) if
             i == 0 or node.device != path[i - 1].device]
+
+
+def write_atomic(filename: str, write: Callable[[BinaryIO], None]) -> None:
+    """Write a file atomically, through a temporary file in the same directory.
+
+    Args:
+        filename (str): The path of the file.
+        write (Callable[[BinaryIO], None]): Writes the content to an open binary file.
+
+    Returns:
+        None
+    """
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(filename) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(temporary, filename)
+    except BaseException:
+        os.unlink(temporary)
+        raise